@@ -1,8 +1,14 @@
 from flask import Flask, render_template, Response, stream_with_context, send_from_directory, request, jsonify, make_response
 import os
+import io
+import csv
+import json
 import shutil
+import zlib
 import traceback
+from urllib.parse import urlencode
 import db
+import export_excel
 
 
 # Limpieza caché
@@ -16,6 +22,11 @@ app = Flask(__name__)
 try: db.init_db()
 except: pass
 
+@app.teardown_appcontext
+def close_db_connection(exc):
+    # Each request reuses one SQLite connection for all its db.* calls
+    db.close_connection()
+
 # --- AUTHENTICATION ---
 from functools import wraps
 
@@ -71,14 +82,31 @@ def public_dashboard():
 
 
 
+# --- NAVEGACIÓN FILTRADA ---
+NAV_FILTER_ARGS = ('estado', 'diff', 'depto')
+
+def navigation(jrv, level):
+    """
+    Prev/next JRV for the comparison page. Optional query-string filters
+    (?estado=PENDIENTE, ?diff=1, ?depto=ATLANTIDA) restrict the walk to this level's
+    matching JRVs; they are carried over to the prev/next links.
+    """
+    estado = request.args.get('estado') or None
+    only_diff = request.args.get('diff') == '1'
+    depto = request.args.get('depto') or None
+    nav = db.get_jrv_navigation(jrv, level=level if (estado or only_diff or depto) else None,
+                                estado=estado, only_diff=only_diff, depto=depto)
+    nav['query'] = urlencode({k: request.args[k] for k in NAV_FILTER_ARGS if request.args.get(k)})
+    return nav
+
 @app.route('/comparison/<jrv>')
 @requires_auth
 def comparison(jrv):
     level = request.args.get('level', 'PRESIDENTE')
     try:
         comp_data = db.get_comparison_data(jrv, nivel=level)
-        nav = db.get_jrv_navigation(jrv)
-        return render_template('comparison.html', jrv=jrv, comp_data=comp_data, prev_jrv=nav['prev'], next_jrv=nav['next'], level=level, readonly=False)
+        nav = navigation(jrv, level)
+        return render_template('comparison.html', jrv=jrv, comp_data=comp_data, prev_jrv=nav['prev'], next_jrv=nav['next'], nav_query=nav['query'], level=level, readonly=False)
     except Exception as e:
         return f"Error comparacion: {str(e)}", 500
 
@@ -87,9 +115,9 @@ def public_comparison(jrv):
     level = request.args.get('level', 'PRESIDENTE')
     try:
         comp_data = db.get_comparison_data(jrv, nivel=level)
-        nav = db.get_jrv_navigation(jrv)
+        nav = navigation(jrv, level)
         # Pass readonly=True to disable editing features
-        return render_template('comparison.html', jrv=jrv, comp_data=comp_data, prev_jrv=nav['prev'], next_jrv=nav['next'], level=level, readonly=True)
+        return render_template('comparison.html', jrv=jrv, comp_data=comp_data, prev_jrv=nav['prev'], next_jrv=nav['next'], nav_query=nav['query'], level=level, readonly=True)
     except Exception as e:
         return f"Error comparacion publica: {str(e)}", 500
 
@@ -253,6 +281,125 @@ def api_summary_table(level):
         traceback.print_exc()
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/summary_table/<level>/stream')
+def api_summary_table_stream(level):
+    """
+    Full summary table streamed row by row in JRV order: ?format=ndjson (default, one JSON
+    row per line, same shape as /api/summary_table data) or ?format=csv.
+    """
+    fmt = request.args.get('format', 'ndjson')
+    if fmt not in ('ndjson', 'csv'):
+        return jsonify({'error': f"Invalid format: {fmt}"}), 400
+    try:
+        sorted_parties, _ = db.summary_columns(level)
+    except Exception as e:
+        traceback.print_exc()
+        return jsonify({'error': str(e)}), 500
+
+    def generate():
+        # Private connection: the cursor stays open for the whole response
+        conn = db.get_db_connection()
+        try:
+            rows = db.iter_summary_rows(level, sorted_parties, conn=conn)
+            if fmt == 'ndjson':
+                for row in rows:
+                    yield json.dumps(row, ensure_ascii=False) + '\n'
+            else:
+                buf = io.StringIO()
+                writer = csv.writer(buf)
+                writer.writerow(db.summary_flat_header(sorted_parties))
+                for row in rows:
+                    writer.writerow(db.summary_flat_row(row))
+                    yield buf.getvalue()
+                    buf.seek(0)
+                    buf.truncate()
+                yield buf.getvalue()
+        finally:
+            conn.close()
+
+    if fmt == 'csv':
+        resp = Response(stream_with_context(generate()), mimetype='text/csv')
+        resp.headers['Content-Disposition'] = f'attachment; filename=resumen_{level}.csv'
+        return resp
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+def gzip_stream(chunks):
+    """ Compresses a text generator on the fly (gzip framing). """
+    z = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = z.compress(chunk.encode('utf-8'))
+        if data: yield data
+    yield z.flush()
+
+@app.route('/api/export.csv')
+@app.route('/api/export/<level>.csv')
+def api_export_csv(level=None):
+    """
+    CSV export of every acta (or one level), streamed from the cursor.
+    ?gzip=1 compresses the response (Content-Encoding: gzip) if the client accepts it.
+    """
+    def generate():
+        # Private connection: the cursor stays open for the whole response
+        conn = db.get_db_connection()
+        try:
+            yield from db.iter_export_csv(level, conn=conn)
+        finally:
+            conn.close()
+
+    body = generate()
+    headers = {'Content-Disposition': f"attachment; filename={'export_' + level if level else 'export'}.csv"}
+    if request.args.get('gzip') == '1' and 'gzip' in request.accept_encodings:
+        body = gzip_stream(body)
+        headers['Content-Encoding'] = 'gzip'
+        headers['Vary'] = 'Accept-Encoding'
+    return Response(stream_with_context(body), mimetype='text/csv', headers=headers)
+
+@app.route('/api/export.xlsx')
+def api_export_xlsx():
+    """ Workbook with one sheet per level (cached in cache/ until the data changes). """
+    try:
+        path = export_excel.get_cached_workbook()
+        return send_from_directory(os.path.dirname(path), os.path.basename(path), as_attachment=True,
+                                   download_name=export_excel.DOWNLOAD_NAME)
+    except Exception as e:
+        traceback.print_exc()
+        return jsonify({'error': str(e)}), 500
+
+def int_arg(name, default=None):
+    """ Integer query-string argument; a non-numeric value is a ValueError (400), not the default. """
+    value = request.args.get(name, '')
+    if value == '': return default
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError(f"Invalid {name}: {value}")
+
+@app.route('/api/summary/<level>')
+def api_summary_page(level):
+    """
+    Paginated summary table: ?page=1&per_page=100&sort=jrv|diff|participation|party_diff&order=asc|desc
+    plus optional filters ?estado=, ?party=, ?min_diff=, ?depto=.
+    """
+    args = request.args
+    try:
+        data = db.get_summary_page(
+            level,
+            page=int_arg('page', 1),
+            per_page=int_arg('per_page', 100),
+            sort=args.get('sort', 'jrv'),
+            order=args.get('order', 'asc'),
+            estado=args.get('estado') or None,
+            party=args.get('party') or None,
+            min_diff=int_arg('min_diff'),
+            depto=args.get('depto') or None,
+        )
+        return jsonify(data)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        traceback.print_exc()
+        return jsonify({'error': str(e)}), 500
+
 if __name__ == '__main__':
     print("-------------------------------------------------------")
     print("FRENAEL AUDITORÍA 2025 v5.0 (Optimized)")
@@ -0,0 +1,447 @@
+"""
+Benchmarks sobre una base de datos sintética de tamaño nacional (~19,000 JRVs).
+
+Uso:
+    python benchmark.py status [--jrvs 19000] [--legacy-sample 300]
+    python benchmark.py global [--jrvs 19000]
+    python benchmark.py plans [--jrvs 19000]
+    python benchmark.py columnar [--jrvs 19000] [--format auto|parquet|npz]
+
+`plans` es una prueba de regresión: termina con código 1 si alguna consulta
+crítica deja de usar su índice.
+
+La base sintética se crea en un archivo temporal; auditoria.db no se toca.
+"""
+import argparse
+import csv
+import os
+import random
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+
+import db
+import export_columnar
+
+LEVELS = ['PRESIDENTE', 'DIPUTADOS', 'ALCALDE']
+PRES_CANDIDATES = [
+    'DC', 'LIBRE', 'PINU', 'LIBERAL', 'NACIONAL',
+    'PARTIDO NACIONAL DE HONDURAS (NASRY JUAN ASFURA ZABLAH)',
+]
+ALC_CANDIDATES = ['DC', 'Libre', 'PINU', 'Liberal', 'Nacional']
+DIP_PARTIES = ['DC', 'LIBRE', 'PINU', 'LIBERAL', 'NACIONAL']
+DIP_SEATS = 9
+
+
+def build_synthetic_db(path, n_jrvs, seed=2025, trep_ratio=1.0):
+    """
+    Crea una BD con n_jrvs JRVs y 3 niveles. Todas tienen ESCRUTINIO; solo una
+    fracción trep_ratio tiene acta FRENAEL (TREP), como en una muestra de observación.
+    """
+    rnd = random.Random(seed)
+    if os.path.exists(path): os.remove(path)
+
+    old_name = db.DB_NAME
+    db.DB_NAME = path
+    try:
+        db.init_db()
+    finally:
+        db.DB_NAME = old_name
+
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA synchronous=OFF")
+    acta_rows = []
+    result_rows = []
+    resumen_rows = []
+    acta_id = 0
+    for jrv in range(1, n_jrvs + 1):
+        origenes = ('ESCRUTINIO', 'TREP') if trep_ratio >= 1 or rnd.random() < trep_ratio else ('ESCRUTINIO',)
+        for nivel in LEVELS:
+            base_votes = None
+            for origen in origenes:
+                acta_id += 1
+                if nivel == 'PRESIDENTE':
+                    estado = 'OFICIAL' if origen == 'ESCRUTINIO' else rnd.choice(['PENDIENTE', 'VALIDADO'])
+                else:
+                    estado = 'PENDIENTE'
+                acta_rows.append((acta_id, str(jrv), origen, nivel, f"data/ACTAS/{origen}/{jrv}-{nivel}.jpg", '2025', '[]', estado))
+
+                if nivel == 'PRESIDENTE': keys = PRES_CANDIDATES[:5]
+                elif nivel == 'ALCALDE': keys = ALC_CANDIDATES
+                else: keys = [f"{p} - DIP {i}" for p in DIP_PARTIES for i in range(1, DIP_SEATS + 1)]
+
+                if base_votes is None:
+                    base_votes = [rnd.randint(0, 120) for _ in keys]
+                # TREP differs from the official count in roughly one of every ten actas
+                votes = [v + (rnd.randint(-5, 5) if rnd.random() < 0.1 else 0) for v in base_votes]
+                votes = [max(v, 0) for v in votes]
+                for k, v in zip(keys, votes):
+                    result_rows.append((acta_id, k, v))
+
+                blancos, nulos = rnd.randint(0, 10), rnd.randint(0, 10)
+                validos = sum(votes)
+                resumen_rows.append((acta_id, validos, blancos, nulos, validos + blancos + nulos))
+
+    conn.executemany("INSERT INTO actas (id, jrv, origen, nivel, filepath, year_detected, debug_data, estado) VALUES (?, ?, ?, ?, ?, ?, ?, ?)", acta_rows)
+    conn.executemany("INSERT INTO resultados (acta_id, candidato, votos) VALUES (?, ?, ?)", result_rows)
+    conn.executemany("INSERT INTO resumenes (acta_id, votos_validos, votos_blancos, votos_nulos, gran_total) VALUES (?, ?, ?, ?, ?)", resumen_rows)
+    conn.commit()
+    conn.close()
+
+    db.DB_NAME = path
+    try:
+        count, t = timed(db.rebuild_comparaciones)
+        print(f"rebuild_comparaciones: {count} (jrv, nivel) en {t:.1f}s")
+    finally:
+        db.DB_NAME = old_name
+    return path
+
+
+def timed(fn, *args, **kwargs):
+    t0 = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - t0
+
+
+# --- Legacy reference implementations (kept only to measure against) ---
+# Frozen copies of the baseline code: they must not call the refactored db.* functions,
+# otherwise the equality checks would compare the new code with itself.
+
+LEGACY_IGNORED_KEYS = ["RESULTADOS", "VOTOS", "TOTAL", "VALIDOS", "NULOS", "BLANCOS", "GRAN TOTAL", "COLUMNS"]
+LEGACY_SORT_ORDER = ["DC", "LIBRE", "PINU", "LIBERAL", "NACIONAL"]
+
+
+def legacy_normalize(name):
+    """normalize() nested in the former get_comparison_data()."""
+    suffix = ""
+    if " - DIP " in name:
+        parts = name.split(" - DIP ")
+        name = parts[0]
+        suffix = " - DIP " + parts[1]
+    if '(' in name: name = name.split('(')[0].strip()
+
+    p_upper = name.upper().strip()
+    normalized_name = name
+    if 'NACIONAL' in p_upper: normalized_name = 'Nacional'
+    elif 'LIBERAL' in p_upper and 'LIBRE' not in p_upper: normalized_name = 'Liberal'
+    elif 'LIBRE' in p_upper or 'LIBERTAD' in p_upper or 'REFUNDACION' in p_upper: normalized_name = 'Libre'
+    elif 'SALVADOR' in p_upper or 'PSH' in p_upper: normalized_name = 'PSH'
+    elif 'INNOVACION' in p_upper or 'PINU' in p_upper or 'SOCIAL' in p_upper: normalized_name = 'PINU'
+    elif 'DEMOCRATA' in p_upper or ' DC' in p_upper or p_upper == 'DC': normalized_name = 'DC'
+    return normalized_name + suffix
+
+
+def legacy_presidente_comparison(conn, trep_id, esc_id):
+    """
+    votos / resumen / all_candidates of the former get_comparison_data(jrv, 'PRESIDENTE')
+    when both actas exist. The baseline read resultados without ORDER BY, which without the
+    covering index returned insertion order; ORDER BY id keeps that (last duplicate wins).
+    """
+    comp = {}
+    found_candidates = set()
+    for side, acta_id in (('trep', trep_id), ('esc', esc_id)):
+        resumen = conn.execute("SELECT * FROM resumenes WHERE acta_id = ?", (acta_id,)).fetchone()
+        votos = {}
+        for row in conn.execute("SELECT candidato, votos FROM resultados WHERE acta_id = ? ORDER BY id", (acta_id,)):
+            if any(x in row['candidato'].upper() for x in LEGACY_IGNORED_KEYS): continue
+            final_key = legacy_normalize(row['candidato'].upper())
+            if 'DIP' in final_key: continue
+            votos[final_key] = row['votos']
+            found_candidates.add(final_key)
+        comp[side] = {'votos': votos, 'resumen': dict(resumen) if resumen else
+                      {'votos_validos': 0, 'votos_blancos': 0, 'votos_nulos': 0, 'gran_total': 0}}
+
+    sorted_candidates = []
+    for oficial in LEGACY_SORT_ORDER:
+        match = None
+        for fc in list(found_candidates):
+            if fc == oficial: match = fc; break
+            if fc.upper() == oficial.upper(): match = fc; break
+        if match:
+            to_add = match
+            found_candidates.remove(match)
+        else:
+            to_add = oficial
+        sorted_candidates.append(to_add)
+        for side in ('trep', 'esc'):
+            if to_add not in comp[side]['votos']: comp[side]['votos'][to_add] = 0
+    sorted_candidates.extend(sorted(found_candidates))
+    comp['all_candidates'] = sorted_candidates
+    return comp
+
+
+def legacy_jrv_status(jrv):
+    """Per-JRV logic of the former get_all_jrvs_status() (one comparison per JRV)."""
+    conn = db.get_connection()
+    trep = conn.execute("SELECT id, estado FROM actas WHERE jrv=? AND origen='TREP' AND nivel='PRESIDENTE'", (jrv,)).fetchone()
+    esc = conn.execute("SELECT id FROM actas WHERE jrv=? AND origen='ESCRUTINIO' AND nivel='PRESIDENTE'", (jrv,)).fetchone()
+
+    diff = 0
+    winner = "Sin Datos"
+    diff_nacional = diff_liberal = diff_libre = 0
+    if trep and esc:
+        comp = legacy_presidente_comparison(conn, trep['id'], esc['id'])
+        for k in comp['all_candidates']:
+            v_trep = comp['trep']['votos'].get(k, 0)
+            v_esc = comp['esc']['votos'].get(k, 0)
+            diff += abs(v_trep - v_esc)
+            d_signed = v_esc - v_trep
+            name = k.upper()
+            if "NACIONAL" in name: diff_nacional += d_signed
+            elif "LIBERAL" in name: diff_liberal += d_signed
+            elif "LIBRE" in name or "REFUNDACION" in name: diff_libre += d_signed
+        r_trep = comp['trep']['resumen']
+        r_esc = comp['esc']['resumen']
+        diff += abs(r_trep['votos_blancos'] - r_esc['votos_blancos'])
+        diff += abs(r_trep['votos_nulos'] - r_esc['votos_nulos'])
+        diff += abs(r_trep['gran_total'] - r_esc['gran_total'])
+
+        votos_fuente = comp['esc']['votos'] if comp['esc']['votos'] else comp['trep']['votos']
+        top = sorted(votos_fuente.items(), key=lambda item: item[1], reverse=True)
+        if top:
+            name = top[0][0].split('(')[0].strip()
+            if "NACIONAL" in name: winner = "P. NACIONAL"
+            elif "LIBERAL" in name: winner = "P. LIBERAL"
+            elif "LIBRE" in name: winner = "LIBRE"
+            elif "DEMOCRATA" in name or "DC" in name: winner = "DC"
+            elif "INNOVACION" in name or "PINU" in name: winner = "PINU"
+            else: winner = name
+
+    return {
+        'jrv': jrv,
+        'has_trep': trep is not None,
+        'has_esc': esc is not None,
+        'estado': trep['estado'] if trep else 'FALTANTE',
+        'diff': diff,
+        'winner': winner,
+        'diff_nacional': diff_nacional,
+        'diff_liberal': diff_liberal,
+        'diff_libre': diff_libre
+    }
+
+
+def legacy_global_stats_level(level):
+    """Six queries per level of the former get_global_stats() (correlated EXISTS); returns its trep/esc dicts."""
+    conn = db.get_connection()
+    valid_trep = """EXISTS (SELECT 1 FROM actas t JOIN resumenes res ON res.acta_id = t.id
+                    WHERE t.jrv = a.jrv AND t.nivel = a.nivel AND t.origen = 'TREP' AND res.gran_total > 0)"""
+    rows = {
+        'trep': conn.execute("""SELECT r.candidato, SUM(r.votos) as total FROM resultados r JOIN actas a ON r.acta_id = a.id
+            JOIN resumenes res ON res.acta_id = a.id WHERE a.nivel = ? AND a.origen = 'TREP' AND res.gran_total > 0
+            GROUP BY r.candidato""", (level,)).fetchall(),
+        'esc': conn.execute(f"""SELECT r.candidato, SUM(r.votos) as total FROM resultados r JOIN actas a ON r.acta_id = a.id
+            WHERE a.nivel = ? AND a.origen = 'ESCRUTINIO' AND {valid_trep} GROUP BY r.candidato""", (level,)).fetchall(),
+    }
+    stats = {'trep': {}, 'esc': {}}
+    stats['trep']['actas'] = conn.execute("""SELECT COUNT(DISTINCT a.id) FROM actas a JOIN resumenes res ON res.acta_id = a.id
+        WHERE a.nivel = ? AND a.origen = 'TREP' AND res.gran_total > 0""", (level,)).fetchone()[0]
+    stats['esc']['actas'] = conn.execute(f"""SELECT COUNT(DISTINCT a.id) FROM actas a JOIN resultados r ON r.acta_id = a.id
+        WHERE a.nivel = ? AND a.origen = 'ESCRUTINIO' AND {valid_trep}""", (level,)).fetchone()[0]
+    stats['trep']['total_inventory'] = conn.execute("SELECT COUNT(*) FROM actas WHERE nivel = ? AND origen = 'TREP'", (level,)).fetchone()[0]
+    stats['esc']['total_inventory'] = conn.execute("""SELECT COUNT(*) FROM actas a WHERE a.nivel = ? AND a.origen = 'ESCRUTINIO'
+        AND EXISTS (SELECT 1 FROM actas t WHERE t.jrv = a.jrv AND t.nivel = a.nivel AND t.origen = 'TREP')""", (level,)).fetchone()[0]
+    for side in ('trep', 'esc'):
+        stats[side]['total'] = 0
+        for row in rows[side]:
+            stats[side]['total'] += row['total']
+            name = db.map_party_name(row['candidato'].upper())
+            if name: stats[side][name] = stats[side].get(name, 0) + row['total']
+    return stats
+
+
+# --- Benchmarks ---
+
+def bench_status(args):
+    status, t_new = timed(db.get_all_jrvs_status)
+    print(f"get_all_jrvs_status (jrv_comparacion): {len(status)} JRVs en {t_new:.2f}s")
+
+    sample = status[:args.legacy_sample]
+    legacy, t_legacy = timed(lambda: [legacy_jrv_status(s['jrv']) for s in sample])
+    per_jrv = t_legacy / max(len(sample), 1)
+    projected = per_jrv * len(status)
+    print(f"Legacy per-JRV loop (solo la parte de estado; cota inferior): {len(sample)} JRVs en {t_legacy:.2f}s -> proyectado {projected:.1f}s para {len(status)}")
+    if t_new > 0: print(f"Speedup: ~{projected / t_new:.0f}x")
+
+    mismatches = [s['jrv'] for s, l in zip(sample, legacy) if s != l]
+    print("Resultados idénticos en la muestra." if not mismatches else f"DIFERENCIAS en JRVs: {mismatches[:10]}")
+
+
+def bench_global(args):
+    db.get_global_stats()  # warm the page cache so both versions read from memory
+    stats, t_new = timed(db.get_global_stats)
+    print(f"get_global_stats (votos por nivel/origen + 1 conteo agrupado): {t_new:.2f}s")
+
+    legacy, t_legacy = timed(lambda: {level: legacy_global_stats_level(level) for level in LEVELS})
+    print(f"Legacy (6 consultas x nivel, EXISTS correlacionado): {t_legacy:.2f}s")
+    if t_new > 0: print(f"Speedup: ~{t_legacy / t_new:.1f}x")
+
+    mismatches = [(level, side) for level in LEVELS for side in ('trep', 'esc') if stats[level][side] != legacy[level][side]]
+    print("Resultados idénticos." if not mismatches else f"DIFERENCIAS en: {mismatches}")
+
+
+# (label, call, fragment, index the plan must use, ORDER BY may sort)
+# Each check runs the real db.* function with a trace callback and EXPLAINs every statement
+# it executed that contains `fragment` (bound values come expanded in the traced SQL), so it
+# checks the SQL db.py actually runs. `call(conn, sample)` gets an acta from plan_sample().
+# "resultados por acta" sorts by id (insertion order, last duplicate wins); that only sorts
+# the few rows of one acta, so the check covers the index lookup.
+QUERY_PLAN_CHECKS = [
+    ("resultados por acta", lambda c, s: db.get_comparison_data(s['jrv'], s['nivel'], conn=c),
+     "SELECT candidato, votos FROM resultados WHERE acta_id", 'idx_resultados_acta_candidato', True),
+    ("recalculate_grand_total", lambda c, s: db.recalculate_grand_total(s['id'], conn=c),
+     "COALESCE(SUM(r.votos), 0)", 'idx_resultados_acta_candidato', False),
+    ("update_result_vote", lambda c, s: db.update_result_vote(s['id'], s['candidato'], 1, conn=c),
+     "SELECT id FROM resultados WHERE acta_id", 'idx_resultados_acta_candidato', False),
+    ("delete_result_row", lambda c, s: db.delete_result_row(s['id'], s['candidato'], conn=c),
+     "DELETE FROM resultados WHERE acta_id", 'idx_resultados_acta_candidato', False),
+    ("delete por acta", lambda c, s: db.delete_acta_record(s['jrv'], s['nivel'], 'TREP', conn=c),
+     "DELETE FROM resultados WHERE acta_id", 'idx_resultados_acta_candidato', False),
+    ("get_global_stats votos", lambda c, s: db.get_global_stats(conn=c),
+     "GROUP BY r.candidato", 'idx_resultados_acta_candidato', False),
+    ("get_global_stats conteo", lambda c, s: db.get_global_stats(conn=c),
+     "GROUP BY a.nivel, a.origen", 'idx_resultados_acta_candidato', False),
+    ("get_next_pending_jrv", lambda c, s: db.get_next_pending_jrv(s['jrv'], s['nivel'], conn=c),
+     "estado = 'PENDIENTE'", 'idx_actas_nivel_origen_estado_jrv', False),
+    ("get_all_jrvs_status", lambda c, s: db.get_all_jrvs_status(conn=c),
+     "FROM jrv_comparacion j", 'idx_comparacion_jrv_num', False),
+    ("get_jrv_navigation", lambda c, s: db.get_jrv_navigation(s['jrv'], conn=c),
+     "(c.jrv_num, c.jrv)", 'idx_actas_jrv_num', False),
+    ("get_jrv_navigation estado", lambda c, s: db.get_jrv_navigation(s['jrv'], s['nivel'], 'PENDIENTE', conn=c),
+     "(c.jrv_num, c.jrv)", 'idx_comparacion_nivel_estado_jrv', False),
+    ("get_summary_table", lambda c, s: db.get_summary_table(s['nivel'], conn=c),
+     "CROSS JOIN jrv_comparacion_partidos", 'idx_comparacion_nivel_jrv', False),
+    ("columnas del resumen", lambda c, s: db.summary_columns(s['nivel'], conn=c),
+     "SELECT DISTINCT partido", 'idx_comparacion_partidos_partido_diff', False),
+    ("get_summary_page estado", lambda c, s: db.get_summary_page(s['nivel'], estado='PENDIENTE', conn=c),
+     "AS participation FROM", 'idx_comparacion_nivel_estado_jrv', False),
+    ("get_summary_page partido", lambda c, s: db.get_summary_page(s['nivel'], sort='party_diff', order='desc',
+                                                                  party='LIBRE', min_diff=1, conn=c),
+     "AS participation FROM", 'idx_comparacion_partidos_partido_diff', False),
+]
+
+
+def plan_sample(conn):
+    """A PRESIDENTE TREP acta with results, used as the arguments of every check."""
+    row = conn.execute("""
+        SELECT a.id, a.jrv, a.nivel, r.candidato FROM actas a JOIN resultados r ON r.acta_id = a.id
+        WHERE a.nivel = 'PRESIDENTE' AND a.origen = 'TREP' ORDER BY a.id, r.id LIMIT 1""").fetchone()
+    return dict(row) if row else None
+
+
+def traced_statements(conn, call, sample):
+    """SQL executed by call(conn, sample); writes are rolled back."""
+    statements = []
+    conn.execute("BEGIN")
+    conn.set_trace_callback(statements.append)
+    try:
+        call(conn, sample)
+    finally:
+        conn.set_trace_callback(None)
+        conn.rollback()
+    return statements
+
+
+def check_query_plans(conn):
+    """
+    Returns [(label, plan)] for every check whose statements do not use the expected index
+    (or sort where they should not), or that no longer run a statement with its fragment.
+    """
+    sample = plan_sample(conn)
+    if sample is None: return [("datos", "la BD no tiene actas PRESIDENTE TREP con resultados")]
+    failures = []
+    for label, call, fragment, index, sorts in QUERY_PLAN_CHECKS:
+        statements = [sql for sql in traced_statements(conn, call, sample) if fragment in sql]
+        if not statements:
+            failures.append((label, f"ninguna consulta ejecutada contiene {fragment!r}"))
+        for sql in statements:
+            plan = " | ".join(row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + sql))
+            if index not in plan or (not sorts and "USE TEMP B-TREE FOR ORDER BY" in plan):
+                failures.append((label, plan))
+    return failures
+
+
+def bench_plans(args):
+    conn = db.get_connection()
+    print(f"Esquema versión {db.get_schema_version(conn)}")
+    failures = check_query_plans(conn)
+    for label, call, fragment, index, sorts in QUERY_PLAN_CHECKS:
+        print(f"{'FALLA' if any(f[0] == label for f in failures) else 'ok   '} {label} -> {index}")
+    for label, plan in failures:
+        print(f"  {label}: {plan}")
+    if failures: sys.exit(1)
+
+
+def load_export_csv(path):
+    """Loads the CSV export into columns, as an analysis script would (pandas if installed)."""
+    try:
+        import pandas
+    except ImportError:
+        pandas = None
+    if pandas is not None:
+        return pandas.read_csv(path, encoding='utf-8-sig')
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        reader = csv.reader(f)
+        next(reader, None)
+        rows = [(jrv, origen, nombre, int(votos) if votos else None) for jrv, origen, nombre, votos in reader]
+    return list(zip(*rows))
+
+
+def bench_columnar(args):
+    out_dir = tempfile.mkdtemp(prefix='export_')
+    try:
+        csv_path = os.path.join(out_dir, 'export.csv')
+        def write_csv():
+            with open(csv_path, 'w', newline='', encoding='utf-8') as f:
+                for chunk in db.iter_export_csv():
+                    f.write(chunk)
+        _, t_csv = timed(write_csv)
+        print(f"CSV (export_db_csv): {os.path.getsize(csv_path) / 1e6:.1f} MB escrito en {t_csv:.2f}s")
+
+        fmt = export_columnar.resolve_format(args.format)
+        paths, t_col = timed(export_columnar.export_columnar, out_dir, fmt)
+        size = sum(os.path.getsize(p) for p in paths.values())
+        print(f"Columnar ({fmt}): {size / 1e6:.1f} MB escrito en {t_col:.2f}s")
+
+        _, t_load_csv = timed(load_export_csv, csv_path)
+        print(f"Carga CSV: {t_load_csv:.2f}s")
+        _, t_load_col = timed(lambda: {table: export_columnar.read_columnar(path) for table, path in paths.items()})
+        print(f"Carga columnar ({', '.join(paths)}): {t_load_col:.2f}s")
+        if t_load_col > 0: print(f"Speedup de carga: ~{t_load_csv / t_load_col:.1f}x")
+    finally:
+        shutil.rmtree(out_dir, ignore_errors=True)
+
+
+BENCHMARKS = {
+    'status': bench_status,
+    'global': bench_global,
+    'plans': bench_plans,
+    'columnar': bench_columnar,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks sobre BD sintética")
+    parser.add_argument('benchmark', choices=sorted(BENCHMARKS))
+    parser.add_argument('--jrvs', type=int, default=19000, help="Número de JRVs sintéticas")
+    parser.add_argument('--legacy-sample', type=int, default=300, help="JRVs a medir con la implementación anterior")
+    parser.add_argument('--trep-ratio', type=float, default=1.0, help="Fracción de JRVs con acta FRENAEL (TREP)")
+    parser.add_argument('--db', help="Reutilizar una BD sintética existente en esta ruta")
+    parser.add_argument('--format', choices=export_columnar.FORMATS, default='auto', help="Formato de la exportación columnar")
+    args = parser.parse_args()
+
+    suffix = f"_trep{args.trep_ratio:g}" if args.trep_ratio < 1 else ""
+    path = args.db or os.path.join(tempfile.gettempdir(), f"bench_{args.jrvs}{suffix}.db")
+    if not args.db or not os.path.exists(path):
+        print(f"Creando BD sintética con {args.jrvs} JRVs en {path}...")
+        _, t = timed(build_synthetic_db, path, args.jrvs, trep_ratio=args.trep_ratio)
+        print(f"BD creada en {t:.1f}s")
+
+    db.DB_NAME = path
+    db.init_db()
+    BENCHMARKS[args.benchmark](args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,20 @@
+import sys
+import db
+import processor
+
+def check_alcalde_json():
+    """
+    Lista las JRVs cuyo JSON de ALCALDE en disco ya no coincide con la BD
+    (archivo modificado después de importar, o voto corregido en la app).
+    """
+    db.init_db()
+    drift = processor.find_alcalde_json_drift()
+    for d in drift:
+        print(f"JRV {d['jrv']} {d['origen']} {d['campo']}: json={d['json']} db={d['db']}")
+    jrvs = sorted({d['jrv'] for d in drift}, key=int)
+    print(f"{len(jrvs)} JRVs con diferencias." if jrvs else "JSON de ALCALDE y BD coinciden.")
+    return drift
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1: db.DB_NAME = sys.argv[1]
+    sys.exit(1 if check_alcalde_json() else 0)
@@ -3,9 +3,15 @@ import json
 import csv
 import io
 import os
+import itertools
+import collections
+import functools
+import threading
+from contextlib import contextmanager
+
+from file_cache import load_cached, file_signature
 
 # Usar ruta absoluta basada en la ubicación de este archivo
-import os
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 DB_NAME = os.path.join(BASE_DIR, "auditoria.db")
 
@@ -48,13 +54,77 @@ def map_party_name(text):
     
     return "OTROS" # Fallback for truly unknown, but we want to avoid if possible
 
+@functools.lru_cache(maxsize=None)
+def candidate_party(candidato):
+    """ map_party_name() of a stored candidate key, computed once per distinct key. """
+    return map_party_name(candidato.upper())
+
+# --- CONNECTION LAYER ---
+# SQLite tuning: WAL lets readers work while an auditor writes, and busy_timeout
+# waits for the write lock instead of failing with "database is locked".
+BUSY_TIMEOUT_MS = 10000
+PRAGMAS = [
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA cache_size=-65536",      # 64 MB page cache
+    "PRAGMA mmap_size=268435456",    # 256 MB memory-mapped I/O
+    "PRAGMA temp_store=MEMORY",
+    f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}",
+]
+
+_local = threading.local()
+
 def get_db_connection():
-    conn = sqlite3.connect(DB_NAME)
+    """ New private connection with the tuned pragmas. The caller must close it. """
+    conn = sqlite3.connect(DB_NAME, timeout=BUSY_TIMEOUT_MS / 1000)
     conn.row_factory = sqlite3.Row
+    for pragma in PRAGMAS:
+        conn.execute(pragma)
     return conn
 
-def init_db():
-    conn = get_db_connection()
+def get_connection(conn=None):
+    """
+    Connection used by the db.* functions: the one passed by the caller if any,
+    otherwise a connection reused by the current thread (do not close it).
+    """
+    if conn is not None: return conn
+    cached = getattr(_local, 'conn', None)
+    if cached is None or _local.db_name != DB_NAME:
+        if cached is not None: cached.close()
+        _local.conn = get_db_connection()
+        _local.db_name = DB_NAME
+    return _local.conn
+
+def close_connection():
+    """ Closes this thread's shared connection (e.g. at the end of a request). """
+    cached = getattr(_local, 'conn', None)
+    if cached is not None:
+        cached.close()
+        _local.conn = None
+
+@contextmanager
+def transaction(conn=None):
+    """
+    Runs a block of writes atomically. If the connection is already inside a
+    transaction (a caller batching several db.* calls) the block joins it and
+    the outermost owner commits.
+    """
+    conn = get_connection(conn)
+    if conn.in_transaction:
+        yield conn
+        return
+    # IMMEDIATE takes the write lock up front, so a read-then-write block waits
+    # on busy_timeout instead of failing when another writer got there first
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        yield conn
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+
+def init_db(conn=None):
+    conn = get_connection(conn)
     cursor = conn.cursor()
     cursor.execute('''CREATE TABLE IF NOT EXISTS actas (
         id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -98,35 +168,169 @@ def init_db():
     cursor.execute('CREATE UNIQUE INDEX IF NOT EXISTS idx_jrv_origen_nivel ON actas(jrv, origen, nivel)')
 
     conn.commit()
-    conn.close()
+
+    migrate(conn=conn)
+
+# --- MIGRACIONES DE ESQUEMA ---
+# Each step runs once, in order, inside its own transaction; the applied version is
+# kept in PRAGMA user_version. Steps return True when the derived comparison tables
+# must be rebuilt afterwards (the rebuild always runs with the final schema).
+
+def _migration_comparaciones(conn):
+    """ Derived comparison tables (see rebuild_comparaciones). """
+    conn.execute('''CREATE TABLE IF NOT EXISTS jrv_comparacion (
+        jrv TEXT NOT NULL,
+        nivel TEXT NOT NULL,
+        trep_id INTEGER,
+        esc_id INTEGER,
+        estado TEXT,
+        diff INTEGER DEFAULT 0,
+        diff_nacional INTEGER DEFAULT 0,
+        diff_liberal INTEGER DEFAULT 0,
+        diff_libre INTEGER DEFAULT 0,
+        winner TEXT,
+        trep_gran_total INTEGER DEFAULT 0,
+        esc_gran_total INTEGER DEFAULT 0,
+        has_trep_data INTEGER DEFAULT 0,
+        PRIMARY KEY (jrv, nivel)
+    )''')
+    conn.execute('''CREATE TABLE IF NOT EXISTS jrv_comparacion_partidos (
+        jrv TEXT NOT NULL,
+        nivel TEXT NOT NULL,
+        partido TEXT NOT NULL,
+        trep INTEGER DEFAULT 0,
+        esc INTEGER DEFAULT 0,
+        diff INTEGER DEFAULT 0,
+        PRIMARY KEY (jrv, nivel, partido)
+    )''')
+    return True
+
+def _migration_indices(conn):
+    """
+    Indexes for the hot paths: results by acta (covering candidato/votos), and
+    an integer copy of the JRV so pending/ordered lookups walk an index instead
+    of sorting on CAST(jrv AS INTEGER).
+    """
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_resultados_acta_candidato ON resultados(acta_id, candidato, votos)")
+
+    columns = [c['name'] for c in conn.execute("PRAGMA table_info(actas)")]
+    if 'jrv_num' not in columns:
+        conn.execute("ALTER TABLE actas ADD COLUMN jrv_num INTEGER")
+    conn.execute("UPDATE actas SET jrv_num = CAST(jrv AS INTEGER)")
+    # Keeps jrv_num in sync for every writer, including the import scripts
+    conn.execute('''CREATE TRIGGER IF NOT EXISTS trg_actas_jrv_num_insert AFTER INSERT ON actas
+        WHEN NEW.jrv_num IS NULL OR NEW.jrv_num IS NOT CAST(NEW.jrv AS INTEGER)
+        BEGIN UPDATE actas SET jrv_num = CAST(NEW.jrv AS INTEGER) WHERE id = NEW.id; END''')
+    conn.execute('''CREATE TRIGGER IF NOT EXISTS trg_actas_jrv_num_update AFTER UPDATE OF jrv, jrv_num ON actas
+        WHEN NEW.jrv_num IS NOT CAST(NEW.jrv AS INTEGER)
+        BEGIN UPDATE actas SET jrv_num = CAST(NEW.jrv AS INTEGER) WHERE id = NEW.id; END''')
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_actas_nivel_origen_estado_jrv ON actas(nivel, origen, estado, jrv_num)")
+    return False
+
+def _migration_jrv_num_comparacion(conn):
+    """ jrv_num on the derived table, so dashboard/summary ordering reads an index. """
+    columns = [c['name'] for c in conn.execute("PRAGMA table_info(jrv_comparacion)")]
+    if 'jrv_num' not in columns:
+        conn.execute("ALTER TABLE jrv_comparacion ADD COLUMN jrv_num INTEGER")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_comparacion_nivel_jrv ON jrv_comparacion(nivel, jrv_num, jrv)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_comparacion_jrv_num ON jrv_comparacion(jrv_num, jrv)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_actas_jrv_num ON actas(jrv_num, jrv)")
+    return True
+
+def _migration_ubicacion(conn):
+    """ jrv_ubicacion: JRV_totales.csv in SQL (department filters). Filled by sync_jrv_ubicacion. """
+    conn.execute('''CREATE TABLE IF NOT EXISTS jrv_ubicacion (
+        jrv TEXT PRIMARY KEY,
+        jrv_num INTEGER,
+        depto TEXT,
+        muni TEXT,
+        centro TEXT,
+        votantes INTEGER
+    )''')
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_ubicacion_depto_jrv ON jrv_ubicacion(depto, jrv_num, jrv)")
+    return False
+
+def _migration_source_files(conn):
+    """ source_files: manifest of the JSONs/images already imported (incremental re-import). """
+    conn.execute('''CREATE TABLE IF NOT EXISTS source_files (
+        path TEXT PRIMARY KEY,
+        jrv TEXT,
+        size INTEGER,
+        mtime_ns INTEGER,
+        hash TEXT
+    )''')
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_source_files_jrv ON source_files(jrv)")
+    return False
+
+def _migration_indices_resumen(conn):
+    """
+    Indexes for the paginated summary table: estado filter in JRV order, and sorting by diff.
+    (nivel, partido, abs(diff)) also serves the summary columns, so the older (nivel, partido) index goes.
+    """
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_comparacion_nivel_estado_jrv ON jrv_comparacion(nivel, estado, jrv_num, jrv)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_comparacion_nivel_diff ON jrv_comparacion(nivel, diff)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_comparacion_partidos_partido_diff ON jrv_comparacion_partidos(nivel, partido, abs(diff))")
+    conn.execute("DROP INDEX IF EXISTS idx_comparacion_partidos_nivel")
+    return False
+
+SCHEMA_MIGRATIONS = [
+    (1, _migration_comparaciones),
+    (2, _migration_indices),
+    (3, _migration_jrv_num_comparacion),
+    (4, _migration_ubicacion),
+    (5, _migration_source_files),
+    (6, _migration_indices_resumen),
+]
+SCHEMA_VERSION = SCHEMA_MIGRATIONS[-1][0]
+
+def get_schema_version(conn=None):
+    conn = get_connection(conn)
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+def migrate(conn=None):
+    """ Applies the pending schema migrations. Returns the versions applied. """
+    conn = get_connection(conn)
+    applied = []
+    needs_rebuild = False
+    for version, step in SCHEMA_MIGRATIONS:
+        if version <= get_schema_version(conn): continue
+        with transaction(conn):
+            needs_rebuild = step(conn) or needs_rebuild
+            conn.execute(f"PRAGMA user_version = {version}")
+        applied.append(version)
+
+    if needs_rebuild:
+        rebuild_comparaciones(conn=conn)
+    return applied
 
 # --- FUNCIONES DE ESCRITURA Y VERIFICACIÓN ---
 
 # --- FUNCIONES DE ESCRITURA Y VERIFICACIÓN ---
 
-def check_acta_exists(jrv, origen, nivel='PRESIDENTE'):
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT id FROM actas WHERE jrv = ? AND origen = ? AND nivel = ?", (jrv, origen, nivel))
-    exists = cursor.fetchone()
-    conn.close()
+def check_acta_exists(jrv, origen, nivel='PRESIDENTE', conn=None):
+    conn = get_connection(conn)
+    exists = conn.execute("SELECT id FROM actas WHERE jrv = ? AND origen = ? AND nivel = ?", (jrv, origen, nivel)).fetchone()
     return exists is not None
 
-def update_acta_path(jrv, origen, new_path, nivel='PRESIDENTE'):
-    conn = get_db_connection()
-    cursor = conn.execute("UPDATE actas SET filepath = ? WHERE jrv = ? AND origen = ? AND nivel = ? AND filepath != ?", (new_path, jrv, origen, nivel, new_path))
-    changes = cursor.rowcount
-    conn.commit()
-    conn.close()
+def update_acta_path(jrv, origen, new_path, nivel='PRESIDENTE', conn=None):
+    with transaction(conn) as conn:
+        cursor = conn.execute("UPDATE actas SET filepath = ? WHERE jrv = ? AND origen = ? AND nivel = ? AND filepath != ?", (new_path, jrv, origen, nivel, new_path))
+        changes = cursor.rowcount
     return changes > 0
 
-def update_acta_rotation(acta_id, rotation):
-    conn = get_db_connection()
-    cursor = conn.cursor()
+def update_acta_paths(changes, conn=None):
+    """ Batched update_acta_path: changes = [(new_path, acta_id)]. Returns the number of actas updated. """
+    if not changes: return 0
+    with transaction(conn) as conn:
+        conn.executemany("UPDATE actas SET filepath = ? WHERE id = ?", changes)
+    return len(changes)
+
+def update_acta_rotation(acta_id, rotation, conn=None):
     try:
-        # Get current debug_data
-        row = cursor.execute("SELECT debug_data FROM actas WHERE id = ?", (acta_id,)).fetchone()
-        if row:
+        with transaction(conn) as conn:
+            # Get current debug_data
+            row = conn.execute("SELECT debug_data FROM actas WHERE id = ?", (acta_id,)).fetchone()
+            if not row: return False
             # Use index 0 to be safe against Row/Tuple differences
             current_data = row[0]
             try:
@@ -138,20 +342,15 @@ def update_acta_rotation(acta_id, rotation):
             data_json['rotation'] = rotation
             
             # Write back
-            cursor.execute("UPDATE actas SET debug_data = ? WHERE id = ?", (json.dumps(data_json), acta_id))
-            conn.commit()
+            conn.execute("UPDATE actas SET debug_data = ? WHERE id = ?", (json.dumps(data_json), acta_id))
             return True
-        return False
     except Exception as e:
         print(f"Error updating rotation: {e}")
         return False
-    finally:
-        conn.close()
 
-def save_acta_result(jrv, origen, filepath, consensus_data, nivel='PRESIDENTE'):
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    try:
+def save_acta_result(jrv, origen, filepath, consensus_data, nivel='PRESIDENTE', conn=None):
+    with transaction(conn) as conn:
+        cursor = conn.cursor()
         # Estado handling: depends on logic. For Presidente: OFICIAL is 'OFICIAL'. 
         # For Alcalde/Diputados: Logic is reversed (FRENAEL is Reference).
         # We will keep 'OFICIAL' status for the Reference source.
@@ -192,7 +391,7 @@ def save_acta_result(jrv, origen, filepath, consensus_data, nivel='PRESIDENTE'):
             cursor.execute('DELETE FROM resultados WHERE acta_id = ?', (acta_id,))
             cursor.execute('DELETE FROM resumenes WHERE acta_id = ?', (acta_id,))
         else:
-            cursor.execute('INSERT INTO actas (jrv, origen, nivel, filepath, year_detected, estado, debug_data) VALUES (?, ?, ?, ?, ?, ?, ?)',
+            cursor.execute('INSERT INTO actas (jrv, origen, nivel, filepath, year_detected, estado, debug_data, jrv_num) VALUES (?, ?, ?, ?, ?, ?, ?, CAST(?1 AS INTEGER))',
                            (jrv, origen, nivel, filepath, consensus_data.get('year', '2025'), estado, raw_matrix_json))
             acta_id = cursor.lastrowid
 
@@ -203,12 +402,80 @@ def save_acta_result(jrv, origen, filepath, consensus_data, nivel='PRESIDENTE'):
         resumen = consensus_data.get('resumen', {})
         cursor.execute('''INSERT INTO resumenes (acta_id, votos_validos, votos_blancos, votos_nulos, gran_total) VALUES (?, ?, ?, ?, ?)''', 
                        (acta_id, resumen.get('votos_validos', 0), resumen.get('votos_blancos', 0), resumen.get('votos_nulos', 0), resumen.get('gran_total', 0)))
-        conn.commit()
-    except Exception as e:
-        conn.rollback()
-        raise e
-    finally:
-        conn.close()
+        refresh_comparacion(jrv, nivel, conn=conn)
+
+SQL_UPSERT_ACTA = """
+    INSERT INTO actas (jrv, origen, nivel, filepath, year_detected, estado, debug_data, jrv_num)
+    VALUES (?, ?, ?, ?, ?, ?, ?, CAST(?1 AS INTEGER))
+    ON CONFLICT(jrv, origen, nivel) DO UPDATE SET
+        filepath = excluded.filepath, year_detected = excluded.year_detected,
+        debug_data = excluded.debug_data, estado = excluded.estado
+"""
+
+def save_actas_bulk(items, conn=None):
+    """
+    Bulk save_acta_result() for imports. items: [(jrv, origen, nivel, filepath, consensus_data)].
+    One transaction (or the caller's), executemany for the acta upserts, resultados and
+    resumenes, then the derived comparison of every (jrv, nivel) touched.
+    Returns the number of actas written.
+    """
+    # Same acta twice in a batch: the last one wins, as with consecutive save_acta_result calls
+    actas = {}
+    for jrv, origen, nivel, filepath, consensus_data in items:
+        actas[(str(jrv), origen, nivel)] = (filepath, consensus_data)
+    if not actas: return 0
+
+    with transaction(conn) as conn:
+        acta_rows = []
+        for (jrv, origen, nivel), (filepath, consensus_data) in actas.items():
+            estado = 'OFICIAL' if (origen == 'ESCRUTINIO' and nivel == 'PRESIDENTE') else 'PENDIENTE'
+            acta_rows.append((jrv, origen, nivel, filepath, consensus_data.get('year', '2025'), estado,
+                              json.dumps(consensus_data.get('raw_matrix', []))))
+        conn.executemany(SQL_UPSERT_ACTA, acta_rows)
+
+        # Resolve every id in a few IN (...) queries
+        ids = {}
+        jrvs = list({key[0] for key in actas})
+        for i in range(0, len(jrvs), 500):
+            chunk = jrvs[i:i + 500]
+            for r in conn.execute(f"SELECT id, jrv, origen, nivel FROM actas WHERE jrv IN ({','.join('?' * len(chunk))})", chunk):
+                ids[(r['jrv'], r['origen'], r['nivel'])] = r['id']
+        acta_ids = [(ids[key],) for key in actas]
+
+        conn.executemany("DELETE FROM resultados WHERE acta_id = ?", acta_ids)
+        conn.executemany("DELETE FROM resumenes WHERE acta_id = ?", acta_ids)
+
+        result_rows, resumen_rows = [], []
+        for key, (filepath, consensus_data) in actas.items():
+            acta_id = ids[key]
+            result_rows.extend((acta_id, candidato, votos) for candidato, votos in consensus_data.get('resultados', {}).items())
+            resumen = consensus_data.get('resumen', {})
+            resumen_rows.append((acta_id, resumen.get('votos_validos', 0), resumen.get('votos_blancos', 0),
+                                 resumen.get('votos_nulos', 0), resumen.get('gran_total', 0)))
+        conn.executemany('INSERT INTO resultados (acta_id, candidato, votos) VALUES (?, ?, ?)', result_rows)
+        conn.executemany('INSERT INTO resumenes (acta_id, votos_validos, votos_blancos, votos_nulos, gran_total) VALUES (?, ?, ?, ?, ?)', resumen_rows)
+
+        for jrv, nivel in dict.fromkeys((key[0], key[2]) for key in actas):
+            refresh_comparacion(jrv, nivel, conn=conn)
+    return len(actas)
+
+def get_source_manifest(conn=None):
+    """ {path: {jrv, size, mtime_ns, hash}} of every file recorded in source_files. """
+    conn = get_connection(conn)
+    return {r['path']: {'jrv': r['jrv'], 'size': r['size'], 'mtime_ns': r['mtime_ns'], 'hash': r['hash']}
+            for r in conn.execute("SELECT path, jrv, size, mtime_ns, hash FROM source_files")}
+
+def save_source_files(manifest_by_jrv, conn=None):
+    """
+    Replaces the source_files rows of each JRV. manifest_by_jrv: {jrv: [(path, size, mtime_ns, hash)]};
+    an empty list forgets the JRV (its files are gone).
+    """
+    if not manifest_by_jrv: return
+    with transaction(conn) as conn:
+        conn.executemany("DELETE FROM source_files WHERE jrv = ?", [(str(jrv),) for jrv in manifest_by_jrv])
+        conn.executemany("INSERT OR REPLACE INTO source_files (path, jrv, size, mtime_ns, hash) VALUES (?, ?, ?, ?, ?)",
+                         [(path, str(jrv), size, mtime_ns, digest)
+                          for jrv, rows in manifest_by_jrv.items() for path, size, mtime_ns, digest in rows])
 
 # --- FUNCIONES DE LECTURA ---
 
@@ -229,98 +496,303 @@ NORM_MAP = {
     'CANDIDATURA INDEPENDIENTE': 'Independiente'
 }
 
-def get_formulario_info(jrv):
+# --- JRV METADATA INDEX (CSV files loaded once, reloaded when they change) ---
+
+JRV_TOTALES_PATH = os.path.join(BASE_DIR, 'data', 'JRV_totales.csv')
+FORM_CIERRE_PATH = os.path.join(BASE_DIR, 'data', 'formulario_cierre.csv')
+FORM_APERTURA_PATH = os.path.join(BASE_DIR, 'data', 'formulario_apertura.csv')
+DIPUTADOS_OFICIAL_PATH = os.path.join(BASE_DIR, 'data', 'diputados_oficial.json')
+ALCALDE_JSON_DIR = os.path.join(BASE_DIR, 'data', 'JSON')
+
+def load_jrv_totales_index(path):
+    """ { jrv: {depto, muni, centro, votantes_registro} } from JRV_totales.csv (first row wins) """
+    index = {}
+    try:
+        with open(path, mode='r', encoding='utf-8', errors='replace') as f:
+            # Headers: NUMERO_JRV,NOMBRE_DEPARTAMENTO,NOMBRE_MUNICIPIO,NOMBRE_CENTRO,Votantes
+            for row in csv.DictReader(f):
+                jrv = row.get('NUMERO_JRV', '').strip()
+                if not jrv or jrv in index: continue
+                index[jrv] = {
+                    "depto": row.get('NOMBRE_DEPARTAMENTO', ''),
+                    "muni": row.get('NOMBRE_MUNICIPIO', ''),
+                    "centro": row.get('NOMBRE_CENTRO', ''),
+                    "votantes_registro": row.get('Votantes', '0')
+                }
+    except Exception as e:
+        print(f"Error reading JRV_totales.csv: {e}")
+    return index
+
+def load_formulario_index(path):
+    """ { jrv: {observador, depto, muni, centro, votantes_registro, jrv[, ganador_pres]} } from a form CSV """
+    index = {}
+    is_cierre = "cierre" in path
+    try:
+        with open(path, mode='r', encoding='latin-1', errors='replace') as f:
+            reader = csv.DictReader(f)
+            for row in reader:
+                def get_val(fragment):
+                    for k in row.keys():
+                        if fragment in k: return row[k]
+                    return "N/A"
+
+                # JRV comes from 'jrv_existe'; if empty, from any JRV / mesa column
+                row_jrv = row.get('jrv_existe', '').strip()
+                if row_jrv:
+                    keys = [row_jrv]
+                else:
+                    keys = [(row[k] or '').strip() for k in row.keys()
+                            if k and ('jrv' in k.lower() or ' mesa ' in k.lower())]
+
+                for key in keys:
+                    if not key or key in index: continue
+                    data = {
+                        "observador": get_val("Nombre de observador"),
+                        "depto": row.get("Departamento", "N/A"), # Fallback
+                        "muni": row.get("Municipio", "N/A"), # Fallback
+                        "centro": get_val("centro de votaci"), # Fallback
+                        "votantes_registro": get_val("votantes_registro"), # Fallback
+                        "jrv": key
+                    }
+                    # Only Closure has winner
+                    if is_cierre:
+                        data["ganador_pres"] = get_val("gan? a nivel presidencial")
+                    index[key] = data
+    except Exception as e:
+        print(f"Error reading {path}: {e}")
+    return index
+
+def get_jrv_totales(jrv):
+    """ O(1) lookup in JRV_totales.csv. Returns a copy (callers may modify it). """
+    info = load_cached(JRV_TOTALES_PATH, load_jrv_totales_index, {}).get(str(jrv).strip())
+    return dict(info) if info else {}
+
+def load_registered_voters_index(path):
+    """ { jrv: registered voters (int) }, derived from the JRV_totales index """
+    index = load_cached(path, load_jrv_totales_index, {})
+    return {j: int(info['votantes_registro']) for j, info in index.items() if info['votantes_registro'].isdigit()}
+
+_ubicacion_synced = {}  # DB_NAME -> JRV_totales.csv signature mirrored in jrv_ubicacion
+
+def sync_jrv_ubicacion(conn=None, force=False):
     """
-    Reads data/formulario_cierre.csv and returns info for the specific JRV.
+    Mirrors JRV_totales.csv into the jrv_ubicacion table so department filters can
+    run in SQL. Rewrites the table only when the CSV changed (or force=True).
     """
-    import csv
-    import os
-    
-    base_dir = os.path.dirname(__file__)
-    
-    
-    # --- Helper to read form data (apertura/cierre) ---
-    def read_csv_info(path):
-        if not os.path.exists(path): return {}
-        try:
-            with open(path, mode='r', encoding='latin-1', errors='replace') as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    # Find JRV
-                    row_jrv = row.get('jrv_existe', '').strip()
-                    if not row_jrv:
-                         for k in row.keys():
-                             if 'jrv' in k.lower() or ' mesa ' in k.lower():
-                                 if row[k].strip() == str(jrv):
-                                     row_jrv = str(jrv)
-                                     break
-                    
-                    if row_jrv == str(jrv):
-                        def get_val(fragment):
-                            for k in row.keys():
-                                if fragment in k: return row[k]
-                            return "N/A"
-
-                        # Common fields
-                        data = {
-                            "observador": get_val("Nombre de observador"),
-                            "depto": row.get("Departamento", "N/A"), # Fallback
-                            "muni": row.get("Municipio", "N/A"), # Fallback
-                            "centro": get_val("centro de votaci"), # Fallback
-                            "votantes_registro": get_val("votantes_registro"), # Fallback
-                            "jrv": row_jrv
-                        }
-                        
-                        # Only Closure has winner
-                        if "cierre" in path:
-                             data["ganador_pres"] = get_val("gan? a nivel presidencial")
-
-                        return data
-        except Exception as e:
-            print(f"Error reading {path}: {e}")
-        return {}
+    signature = file_signature(JRV_TOTALES_PATH)
+    if not force and _ubicacion_synced.get(DB_NAME) == signature: return False
+
+    index = load_cached(JRV_TOTALES_PATH, load_jrv_totales_index, {})
+    rows = [(jrv, info['depto'].strip().upper(), info['muni'], info['centro'],
+             int(info['votantes_registro']) if info['votantes_registro'].isdigit() else None)
+            for jrv, info in index.items()]
+    with transaction(conn) as conn:
+        conn.execute("DELETE FROM jrv_ubicacion")
+        conn.executemany("INSERT INTO jrv_ubicacion (jrv, jrv_num, depto, muni, centro, votantes) VALUES (?, CAST(?1 AS INTEGER), ?, ?, ?, ?)", rows)
+    _ubicacion_synced[DB_NAME] = signature
+    return True
+
+def get_registered_voters():
+    """ { jrv: registered voters (int) } for every JRV in JRV_totales.csv (shared, do not modify) """
+    return load_cached(JRV_TOTALES_PATH, load_registered_voters_index, {})
 
-    # --- Helper to read JRV Totals (Primary Source for Location/Voters) ---
-    def read_jrv_totales():
-        path = os.path.join(base_dir, 'data', 'JRV_totales.csv')
-        if not os.path.exists(path): return {}
-        try:
-            with open(path, mode='r', encoding='utf-8', errors='replace') as f: # Likely UTF-8 or latin-1
-                 # Using csv.reader or DictReader. Let's assume headers are clean based on Get-Content
-                 reader = csv.DictReader(f)
-                 # Headers: NUMERO_JRV,NOMBRE_DEPARTAMENTO,NOMBRE_MUNICIPIO,NOMBRE_CENTRO,Votantes
-                 for row in reader:
-                     if row.get('NUMERO_JRV', '').strip() == str(jrv):
-                         return {
-                             "depto": row.get('NOMBRE_DEPARTAMENTO', ''),
-                             "muni": row.get('NOMBRE_MUNICIPIO', ''),
-                             "centro": row.get('NOMBRE_CENTRO', ''),
-                             "votantes_registro": row.get('Votantes', '0')
-                         }
-        except Exception as e:
-            print(f"Error reading JRV_totales.csv: {e}")
-        return {}
+def get_formulario_info(jrv):
+    """
+    Header info for a JRV: location/voters from JRV_totales.csv plus
+    observer/winner from formulario_cierre.csv (or formulario_apertura.csv).
+    """
+    jrv_key = str(jrv)
 
     # 1. Get Primary Info (Totals)
-    primary_info = read_jrv_totales()
-    
+    primary_info = get_jrv_totales(jrv_key)
+
     # 2. Get Supplementary Info (Observer/Winner) - Try Closure first, then Apertura
-    form_info = read_csv_info(os.path.join(base_dir, 'data', 'formulario_cierre.csv'))
+    form_info = load_cached(FORM_CIERRE_PATH, load_formulario_index, {}).get(jrv_key)
     if not form_info:
-        form_info = read_csv_info(os.path.join(base_dir, 'data', 'formulario_apertura.csv'))
-        
+        form_info = load_cached(FORM_APERTURA_PATH, load_formulario_index, {}).get(jrv_key)
+
     # 3. Merge (Primary overrides Form for overlapping keys, Form provides unique keys)
-    # Default structure based on form_info or empty
-    final_info = form_info if form_info else {"observador": "N/A", "jrv": str(jrv)}
-    
+    final_info = dict(form_info) if form_info else {"observador": "N/A", "jrv": jrv_key}
+
     # Override with Primary (JRV_totales)
     if primary_info:
         final_info.update(primary_info)
-        
+
     return final_info
 
-def get_comparison_data(jrv, nivel='PRESIDENTE'):
-    conn = get_db_connection()
+# Result keys that are summary rows rather than candidates
+IGNORED_KEYS = ["RESULTADOS", "VOTOS", "TOTAL", "VALIDOS", "NULOS", "BLANCOS", "GRAN TOTAL", "COLUMNS"]
+
+# Official ballot order; these columns are always present in a comparison
+SORT_ORDER = ["DC", "LIBRE", "PINU", "LIBERAL", "NACIONAL"]
+
+def normalize_candidate(name):
+    # Handle " - DIP " keys specially to preserve the number
+    suffix = ""
+    if " - DIP " in name:
+        parts = name.split(" - DIP ")
+        name = parts[0]
+        suffix = " - DIP " + parts[1]
+
+    # Remove parenthetical redundancy e.g. "NAME (NAME )"
+    if '(' in name: name = name.split('(')[0].strip()
+    
+    # Explicit Normalization Logic (ordered by specificity)
+    p_upper = name.upper().strip()
+    normalized_name = name
+    
+    # Order matters! Check PINU before DC (due to 'Social Democrata')
+    if 'NACIONAL' in p_upper: normalized_name = 'Nacional'
+    elif 'LIBERAL' in p_upper and 'LIBRE' not in p_upper: normalized_name = 'Liberal'
+    elif 'LIBRE' in p_upper or 'LIBERTAD' in p_upper or 'REFUNDACION' in p_upper: normalized_name = 'Libre'
+    elif 'SALVADOR' in p_upper or 'PSH' in p_upper: normalized_name = 'PSH'
+    elif 'INNOVACION' in p_upper or 'PINU' in p_upper or 'SOCIAL' in p_upper: normalized_name = 'PINU'
+    elif 'DEMOCRATA' in p_upper or ' DC' in p_upper or p_upper == 'DC': normalized_name = 'DC'
+    
+    # Check mapping (legacy fallback)
+    # for k, v in NORM_MAP.items():
+    #     if k in name: 
+    #         normalized_name = v
+    #         break
+    
+    return normalized_name + suffix
+
+# --- ALCALDE: JSON DE ORIGEN ---
+# The comparison page starts from data/JSON/{jrv}-ALCALDE[-FRENAEL].json and then
+# overrides with resultados/resumenes. The files are parsed once and cached by mtime; a
+# checked signature is trusted for ALCALDE_JSON_MAX_AGE seconds, so a dashboard view does not
+# stat them. FRENAEL_ALCALDE_FROM_JSON=0 in the environment serves the page from the database
+# only (no file access); it is read on each call, so it can be switched without a restart.
+ALCALDE_JSON_MAX_AGE = 30
+
+def alcalde_from_json():
+    return os.environ.get('FRENAEL_ALCALDE_FROM_JSON', '1').strip().lower() not in ('0', 'false', 'no', 'off')
+
+ALCALDE_FRENAEL_PARTIES = ["DC", "Libre", "PINU", "Liberal", "Nacional", "PSH"]
+
+def load_alcalde_oficial_json(path):
+    """ { 'votos': {candidate: votes}, 'resumen': {...} } from a CNE {jrv}-ALCALDE.json """
+    parsed = {'votos': {}, 'resumen': {}}
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data_esc = json.load(f)
+
+        # Parse Resultados
+        for item in data_esc.get('resultados', []):
+            votos = int(item.get('votos', 0))
+            parsed['votos'][normalize_candidate(item.get('partido', ''))] = votos
+
+        # Parse Summary (Estadisticas); gran total = validos + blancos + nulos
+        stats = data_esc.get('estadisticas', {}).get('distribucion_votos', {})
+        resumen = parsed['resumen']
+        resumen['votos_blancos'] = int(stats.get('blancos', 0))
+        resumen['votos_nulos'] = int(stats.get('nulos', 0))
+        resumen['votos_validos'] = int(stats.get('validos', 0))
+        resumen['gran_total'] = resumen['votos_validos'] + resumen['votos_blancos'] + resumen['votos_nulos']
+    except Exception as e:
+        print(f"Error loading Official Alcalde JSON: {e}")
+    return parsed
+
+def load_alcalde_frenael_json(path):
+    """ { 'votos': {party: votes}, 'resumen': {...} } from a FRENAEL {jrv}-ALCALDE-FRENAEL.json """
+    parsed = {'votos': {}, 'resumen': {}}
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data_trep = json.load(f)
+
+        # The JSON keys are like "DC", "Libre", "PINU", "Liberal", "Nacional" (matches our short names!)
+        for key, val in data_trep.items():
+            idx_val = int(val) if str(val).isdigit() else 0
+            if key in ALCALDE_FRENAEL_PARTIES: parsed['votos'][key] = idx_val
+            elif key == "votosBlanco": parsed['resumen']['votos_blancos'] = idx_val
+            elif key == "votosNulos": parsed['resumen']['votos_nulos'] = idx_val
+            elif key == "granTotal": parsed['resumen']['gran_total'] = idx_val
+    except Exception as e:
+        print(f"Error loading Frenael Alcalde JSON: {e}")
+    return parsed
+
+# --- DIPUTADOS: PLANILLA OFICIAL (diputados_oficial.json) ---
+
+DIP_PARTY_ALIASES = {
+    "PN": "NACIONAL", "PL": "LIBERAL", "LIBRE": "LIBRE", "PSH": "PSH", "DC": "DC", "PINU": "PINU"
+}
+
+def normalize_dip_party(p_name):
+    """ Party name of a DIPUTADOS key / official roster entry (NACIONAL, LIBERAL, LIBRE, ...) """
+    p_upper = p_name.upper().strip()
+    # Common Aliases
+    if 'NACIONAL' in p_upper: return 'NACIONAL'
+    if 'LIBERAL' in p_upper and 'LIBRE' not in p_upper: return 'LIBERAL'
+    if 'LIBRE' in p_upper or 'LIBERTAD' in p_upper: return 'LIBRE'
+    if 'SALVADOR' in p_upper or 'PSH' in p_upper: return 'PSH'
+    if 'INNOVACION' in p_upper or 'PINU' in p_upper or 'SOCIAL' in p_upper: return 'PINU'
+    if 'DEMOCRATA' in p_upper or ' DC' in p_upper or p_upper == 'DC': return 'DC'
+    return p_upper
+
+def dip_short_name(raw_name):
+    """ Shorten Name: First + First Last """
+    parts = raw_name.split()
+    if len(parts) >= 3:
+        # Common Spanish: Name Last1 Last2 (3 parts) -> Name Last1
+        # Name1 Name2 Last1 Last2 (4 parts) -> Name1 Last1; 5+ parts: first and second to last
+        if len(parts) == 4: return f"{parts[0]} {parts[2]}"
+        if len(parts) == 3: return f"{parts[0]} {parts[1]}"
+        return f"{parts[0]} {parts[-2]}"
+    return raw_name
+
+def load_diputados_oficial_index(path):
+    """
+    Official DIPUTADOS roster per JRV, with everything get_comparison_data() needs precomputed:
+    { jrv: {
+        'idx_map':   { party: { absolute index: relative index } },
+        'parties':   [ (party, [(relative index or None, cand_info), ...]) ] in file order,
+        'names':     { party: { relative index: short name } },
+        'max_count': largest number of candidates of a party } }
+    """
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            full_official = json.load(f)
+    except Exception as e:
+        print(f"Error reading diputados_oficial.json: {e}")
+        return {}
+
+    index = {}
+    for jrv, official_data in full_official.items():
+        if not official_data: continue
+        # Absolute -> Relative: { 'LIBRE': { 9: 1, 10: 2... }, 'DC': { 1: 1... } }
+        party_idx_map = {}
+        for off_party, rows in official_data.items():
+            target_party = normalize_dip_party(DIP_PARTY_ALIASES.get(off_party, off_party))
+            party_map = party_idx_map.setdefault(target_party, {})
+            for rel, abs_k in enumerate(sorted(rows.keys(), key=lambda x: int(x)), start=1):
+                party_map[int(abs_k)] = rel
+
+        parties, names_map = [], {}
+        for off_party, rows in official_data.items():
+            target_party = normalize_dip_party(DIP_PARTY_ALIASES.get(off_party, off_party))
+            party_rows = []
+            names = names_map.setdefault(target_party, {})
+            for abs_str, cand_info in rows.items():
+                rel_i = party_idx_map[target_party].get(int(abs_str))
+                party_rows.append((rel_i, cand_info))
+                if rel_i is not None and isinstance(cand_info, dict):
+                    names[rel_i] = dip_short_name(cand_info.get('name', '').strip())
+            parties.append((target_party, party_rows))
+
+        index[str(jrv)] = {
+            'idx_map': party_idx_map,
+            'parties': parties,
+            'names': names_map,
+            'max_count': max(len(rows) for rows in official_data.values()),
+        }
+    return index
+
+def get_diputados_oficial(jrv):
+    """ Precomputed official roster of one JRV (see load_diputados_oficial_index), or None. Shared: do not modify. """
+    return load_cached(DIPUTADOS_OFICIAL_PATH, load_diputados_oficial_index, {}).get(str(jrv))
+
+def get_comparison_data(jrv, nivel='PRESIDENTE', conn=None):
+    conn = get_connection(conn)
     trep = conn.execute("SELECT * FROM actas WHERE jrv = ? AND origen = 'TREP' AND nivel = ?", (jrv, nivel)).fetchone()
     esc = conn.execute("SELECT * FROM actas WHERE jrv = ? AND origen = 'ESCRUTINIO' AND nivel = ?", (jrv, nivel)).fetchone()
     
@@ -342,119 +814,31 @@ def get_comparison_data(jrv, nivel='PRESIDENTE'):
     }
     found_candidates = set()
     
-    # Name Normalization Map
-    
-    IGNORED_KEYS = ["RESULTADOS", "VOTOS", "TOTAL", "VALIDOS", "NULOS", "BLANCOS", "GRAN TOTAL", "COLUMNS"]
-
-    def normalize(name):
-        # Handle " - DIP " keys specially to preserve the number
-        suffix = ""
-        if " - DIP " in name:
-            parts = name.split(" - DIP ")
-            name = parts[0]
-            suffix = " - DIP " + parts[1]
-
-        # Remove parenthetical redundancy e.g. "NAME (NAME )"
-        if '(' in name: name = name.split('(')[0].strip()
-        
-        # Explicit Normalization Logic (ordered by specificity)
-        p_upper = name.upper().strip()
-        normalized_name = name
-        
-        # Order matters! Check PINU before DC (due to 'Social Democrata')
-        if 'NACIONAL' in p_upper: normalized_name = 'Nacional'
-        elif 'LIBERAL' in p_upper and 'LIBRE' not in p_upper: normalized_name = 'Liberal'
-        elif 'LIBRE' in p_upper or 'LIBERTAD' in p_upper or 'REFUNDACION' in p_upper: normalized_name = 'Libre'
-        elif 'SALVADOR' in p_upper or 'PSH' in p_upper: normalized_name = 'PSH'
-        elif 'INNOVACION' in p_upper or 'PINU' in p_upper or 'SOCIAL' in p_upper: normalized_name = 'PINU'
-        elif 'DEMOCRATA' in p_upper or ' DC' in p_upper or p_upper == 'DC': normalized_name = 'DC'
-        
-        # Check mapping (legacy fallback)
-        # for k, v in NORM_MAP.items():
-        #     if k in name: 
-        #         normalized_name = v
-        #         break
-        
-        return normalized_name + suffix
 
     # --- Special Handling for ALCALDE (Load from JSON) ---
     if nivel == 'ALCALDE':
-        import json
-        import os
-        
         # Prepare Metadata from DB if available (so images and IDs work)
         if trep: comp_data['trep']['meta'] = dict(trep)
         if esc: comp_data['esc']['meta'] = dict(esc)
 
-        # Paths
-        base_dir = os.path.dirname(__file__)
-        path_oficial = os.path.join(base_dir, 'data', 'JSON', f'{jrv}-ALCALDE.json')
-        path_frenael = os.path.join(base_dir, 'data', 'JSON', f'{jrv}-ALCALDE-FRENAEL.json')
-
-        # Load OFICIAL (Escrutinio)
-        if os.path.exists(path_oficial):
-            try:
-                with open(path_oficial, 'r', encoding='utf-8') as f:
-                    data_esc = json.load(f)
-                    
-                # Parse Resultados
-                for item in data_esc.get('resultados', []):
-                    p_name = item.get('partido', '')
-                    votos = int(item.get('votos', 0))
-                    
-                    # Normalize Party Name
-                    norm_name = normalize(p_name)
-                    comp_data['esc']['votos'][norm_name] = votos
-                    found_candidates.add(norm_name)
-                    
-                # Parse Summary (Estadisticas)
-                stats = data_esc.get('estadisticas', {}).get('distribucion_votos', {})
-                comp_data['esc']['resumen']['votos_blancos'] = int(stats.get('blancos', 0))
-                comp_data['esc']['resumen']['votos_nulos'] = int(stats.get('nulos', 0))
-                comp_data['esc']['resumen']['votos_validos'] = int(stats.get('validos', 0))
-                
-                # Gran Total (Sum validos + blancos + nulos if not explicit?)
-                # JSON has "totalizacion_actas" but not explicit gran total of votes?
-                # Actually sum is safest or use validos+blancos+nulos
-                comp_data['esc']['resumen']['gran_total'] = comp_data['esc']['resumen']['votos_validos'] + comp_data['esc']['resumen']['votos_blancos'] + comp_data['esc']['resumen']['votos_nulos']
-                
-            except Exception as e:
-                print(f"Error loading Official Alcalde JSON: {e}")
-
-        # Load FRENAEL (Trep)
-        if os.path.exists(path_frenael):
-            try:
-                with open(path_frenael, 'r', encoding='utf-8') as f:
-                    data_trep = json.load(f)
-                
-                # Direct Keys for Parties
-                # We need to keys that match our normalized parties or known keys
-                # The JSON keys are like "DC", "Libre", "PINU", "Liberal", "Nacional" (matches our short names!)
-                # And summary keys
-                
-                for key, val in data_trep.items():
-                    # Check if it's a party
-                    idx_val = int(val) if str(val).isdigit() else 0
-                    
-                    if key in ["DC", "Libre", "PINU", "Liberal", "Nacional", "PSH"]:
-                         # It matches our short names directly
-                         comp_data['trep']['votos'][key] = idx_val
-                         found_candidates.add(key)
-                    elif key == "votosBlanco":
-                        comp_data['trep']['resumen']['votos_blancos'] = idx_val
-                    elif key == "votosNulos":
-                        comp_data['trep']['resumen']['votos_nulos'] = idx_val
-                    elif key == "granTotal":
-                        comp_data['trep']['resumen']['gran_total'] = idx_val
-
-            except Exception as e:
-                print(f"Error loading Frenael Alcalde JSON: {e}")
+        # Source JSONs (parsed once, cached by mtime), then the DB overrides below.
+        # Without a TREP acta the final safety check zeroes everything, so skip them.
+        if has_trep and alcalde_from_json():
+            for side, suffix, loader in (('esc', 'ALCALDE', load_alcalde_oficial_json),
+                                         ('trep', 'ALCALDE-FRENAEL', load_alcalde_frenael_json)):
+                parsed = load_cached(os.path.join(ALCALDE_JSON_DIR, f'{jrv}-{suffix}.json'), loader,
+                                     max_age=ALCALDE_JSON_MAX_AGE)
+                if not parsed: continue
+                comp_data[side]['votos'].update(parsed['votos'])
+                comp_data[side]['resumen'].update(parsed['resumen'])
+                found_candidates.update(parsed['votos'])
 
         # --- OVERRIDE WITH DB RESUMEN IF EXISTS (Fix persistence) ---
         # User edits are saved to 'resumenes' table, so we must load from there.
         if trep:
             res_db = conn.execute("SELECT * FROM resumenes WHERE acta_id = ?", (trep['id'],)).fetchone()
             if res_db:
+                comp_data['trep']['resumen']['votos_validos'] = res_db['votos_validos']
                 comp_data['trep']['resumen']['votos_blancos'] = res_db['votos_blancos']
                 comp_data['trep']['resumen']['votos_nulos'] = res_db['votos_nulos']
                 comp_data['trep']['resumen']['gran_total'] = res_db['gran_total']
@@ -462,25 +846,26 @@ def get_comparison_data(jrv, nivel='PRESIDENTE'):
         if esc:
             res_db = conn.execute("SELECT * FROM resumenes WHERE acta_id = ?", (esc['id'],)).fetchone()
             if res_db:
+                comp_data['esc']['resumen']['votos_validos'] = res_db['votos_validos']
                 comp_data['esc']['resumen']['votos_blancos'] = res_db['votos_blancos']
                 comp_data['esc']['resumen']['votos_nulos'] = res_db['votos_nulos']
                 comp_data['esc']['resumen']['gran_total'] = res_db['gran_total']
 
         # --- OVERRIDE VOTES WITH DB RESULTS IF EXISTS ---
         if trep:
-            rows = conn.execute("SELECT candidato, votos FROM resultados WHERE acta_id = ?", (trep['id'],)).fetchall()
+            rows = conn.execute("SELECT candidato, votos FROM resultados WHERE acta_id = ? ORDER BY id", (trep['id'],)).fetchall()
             for row in rows:
                 if any(x in row['candidato'].upper() for x in IGNORED_KEYS): continue
                 # We trust the key saved in DB is already correct/normalized, or we re-normalize
-                final_key = normalize(row['candidato'].upper()) 
+                final_key = normalize_candidate(row['candidato'].upper()) 
                 comp_data['trep']['votos'][final_key] = row['votos']
                 found_candidates.add(final_key)
 
         if esc:
-            rows = conn.execute("SELECT candidato, votos FROM resultados WHERE acta_id = ?", (esc['id'],)).fetchall()
+            rows = conn.execute("SELECT candidato, votos FROM resultados WHERE acta_id = ? ORDER BY id", (esc['id'],)).fetchall()
             for row in rows:
                 if any(x in row['candidato'].upper() for x in IGNORED_KEYS): continue
-                final_key = normalize(row['candidato'].upper())
+                final_key = normalize_candidate(row['candidato'].upper())
                 comp_data['esc']['votos'][final_key] = row['votos']
                 found_candidates.add(final_key)
 
@@ -491,11 +876,11 @@ def get_comparison_data(jrv, nivel='PRESIDENTE'):
 
             resumen = conn.execute("SELECT * FROM resumenes WHERE acta_id = ?", (trep['id'],)).fetchone()
             if resumen: comp_data['trep']['resumen'] = dict(resumen)
-            rows = conn.execute("SELECT candidato, votos FROM resultados WHERE acta_id = ?", (trep['id'],)).fetchall()
+            rows = conn.execute("SELECT candidato, votos FROM resultados WHERE acta_id = ? ORDER BY id", (trep['id'],)).fetchall()
             for row in rows:
                 if any(x in row['candidato'].upper() for x in IGNORED_KEYS): continue
                 
-                clean_name = normalize(row['candidato'].upper())
+                clean_name = normalize_candidate(row['candidato'].upper())
                 # Use title case if shorter than 5 chars (like 'DC') keep upper, else Title? actually 'Nacional' is Title.
                 # existing short names are 'Nacional', 'Liberal'. Let's match that.
                 if clean_name in list(NORM_MAP.values()): pass 
@@ -513,7 +898,7 @@ def get_comparison_data(jrv, nivel='PRESIDENTE'):
                 # Simple apply
                 if any(x in row['candidato'].upper() for x in IGNORED_KEYS): continue # Double check if not clean
                 
-                final_key = normalize(row['candidato'].upper())
+                final_key = normalize_candidate(row['candidato'].upper())
                 # Additional Check: if level is PRESIDENTE, ignore "DIP" keys
                 if nivel == 'PRESIDENTE' and 'DIP' in final_key: continue
                 
@@ -524,11 +909,11 @@ def get_comparison_data(jrv, nivel='PRESIDENTE'):
             comp_data['esc']['meta'] = dict(esc)
             resumen = conn.execute("SELECT * FROM resumenes WHERE acta_id = ?", (esc['id'],)).fetchone()
             if resumen: comp_data['esc']['resumen'] = dict(resumen)
-            rows = conn.execute("SELECT candidato, votos FROM resultados WHERE acta_id = ?", (esc['id'],)).fetchall()
+            rows = conn.execute("SELECT candidato, votos FROM resultados WHERE acta_id = ? ORDER BY id", (esc['id'],)).fetchall()
             for row in rows:
                 if any(x in row['candidato'].upper() for x in IGNORED_KEYS): continue
                 
-                final_key = normalize(row['candidato'].upper())
+                final_key = normalize_candidate(row['candidato'].upper())
                 if nivel == 'PRESIDENTE' and 'DIP' in final_key: continue
                 
                 comp_data['esc']['votos'][final_key] = row['votos']
@@ -540,8 +925,6 @@ def get_comparison_data(jrv, nivel='PRESIDENTE'):
     # Official Order Matches: DC, Libre, PINU, Liberal, Nacional (normalized casing)
     # DC, PINU, PSH -> Upper
     # Liberal, Libre, Nacional -> Title
-    SORT_ORDER = ["DC", "LIBRE", "PINU", "LIBERAL", "NACIONAL"]
-    
     for oficial in SORT_ORDER:
         match = None
         # Check if already present
@@ -581,47 +964,9 @@ def get_comparison_data(jrv, nivel='PRESIDENTE'):
 
     # --- Matrix Generation for Diputados ---
     if nivel == 'DIPUTADOS':
-        # Load Official Data from JSON
-        import json
-        import os
-        json_path = os.path.join(os.path.dirname(__file__), 'data', 'diputados_oficial.json')
-        official_data = full_official = {}
-        if os.path.exists(json_path):
-            with open(json_path, 'r', encoding='utf-8') as f:
-                full_official = json.load(f)
-                
-
-                official_data = full_official.get(str(jrv), {})
-
-        # Helper to normalize party names
-        def normalize_party(p_name):
-            p_upper = p_name.upper().strip()
-            # Common Aliases
-            if 'NACIONAL' in p_upper: return 'NACIONAL'
-            if 'LIBERAL' in p_upper and 'LIBRE' not in p_upper: return 'LIBERAL'
-            if 'LIBRE' in p_upper or 'LIBERTAD' in p_upper: return 'LIBRE'
-            if 'SALVADOR' in p_upper or 'PSH' in p_upper: return 'PSH'
-            if 'INNOVACION' in p_upper or 'PINU' in p_upper or 'SOCIAL' in p_upper: return 'PINU'
-            if 'DEMOCRATA' in p_upper or ' DC' in p_upper or p_upper == 'DC': return 'DC'
-            return p_upper
-            
-        party_aliases = {
-            "PN": "NACIONAL", "PL": "LIBERAL", "LIBRE": "LIBRE", "PSH": "PSH", "DC": "DC", "PINU": "PINU"
-        }
-
-        # Pre-calculate Index Mapping (Absolute -> Relative) from Official Data
-        # Map: { 'LIBRE': { 9: 1, 10: 2... }, 'DC': { 1: 1... } }
-        party_idx_map = {}
-        if official_data:
-            for off_party, rows in official_data.items():
-                 target_party = normalize_party(party_aliases.get(off_party, off_party))
-                 if target_party not in party_idx_map: party_idx_map[target_party] = {}
-                 
-                 # Sort Absolute Keys
-                 sorted_keys = sorted(rows.keys(), key=lambda x: int(x))
-                 for rel, abs_k in enumerate(sorted_keys, start=1):
-                     try: party_idx_map[target_party][int(abs_k)] = rel
-                     except: pass
+        # Official roster, parsed once and indexed by JRV (reloaded when the file changes)
+        official = get_diputados_oficial(jrv)
+        party_idx_map = official['idx_map'] if official else {}
 
         matrix_map = {}
         found_parties = set()
@@ -637,7 +982,7 @@ def get_comparison_data(jrv, nivel='PRESIDENTE'):
                 # Filter out unwanted keys that might have been ingested as candidates
                 if any(x in raw_party.upper() for x in IGNORED_KEYS): continue
                 
-                party = normalize_party(raw_party)
+                party = normalize_dip_party(raw_party)
                 
                 try: 
                     raw_idx = int(parts[1])
@@ -657,40 +1002,23 @@ def get_comparison_data(jrv, nivel='PRESIDENTE'):
                 if idx > max_idx: max_idx = idx
 
         # 2. Integrate Candidates from Official Data
-        if official_data:
-            for off_party, rows in official_data.items():
-                target_party = normalize_party(party_aliases.get(off_party, off_party))
-                
+        if official:
+            for target_party, rows in official['parties']:
                 found_parties.add(target_party)
                 if target_party not in matrix_map: matrix_map[target_party] = {}
 
-                # Use calculated map
-                if target_party in party_idx_map:
-                    # Iterate the MAP to ensure we cover all official candidates in order
-                    # party_idx_map[target_party] = { abs: rel, ... }
-                    # We can also just iterate 'rows' and use the map
-                    for abs_str, cand_info in rows.items():
-                         try:
-                             abs_i = int(abs_str)
-                             rel_i = party_idx_map[target_party][abs_i]
-                             
-                             if rel_i > max_idx: max_idx = rel_i
-                             
-                             # Check existing key at RELATIVE slot
-                             existing_key = matrix_map[target_party].get(rel_i)
-                             if not existing_key:
-                                 new_key = f"{target_party} - DIP {rel_i}"
-                                 matrix_map[target_party][rel_i] = new_key
-                                 comp_data['esc']['votos'][new_key] = cand_info['votes']
-                             else:
-                                 # Update existing
-                                 comp_data['esc']['votos'][existing_key] = cand_info['votes']
-                         except: pass
-                else:
-                    # Fallback if map failed? Should not happen if official_data exists
-                    pass
+                for rel_i, cand_info in rows:
+                    if rel_i is None: continue
+                    if rel_i > max_idx: max_idx = rel_i
+
+                    # Check existing key at RELATIVE slot
+                    existing_key = matrix_map[target_party].get(rel_i)
+                    if not existing_key:
+                        existing_key = f"{target_party} - DIP {rel_i}"
+                        matrix_map[target_party][rel_i] = existing_key
+                    try: comp_data['esc']['votos'][existing_key] = cand_info['votes']
+                    except: pass
 
-        
         # 3. Fill structure: Start with SORT_ORDER unconditionally
         sorted_parties = list(SORT_ORDER)
         
@@ -710,46 +1038,8 @@ def get_comparison_data(jrv, nivel='PRESIDENTE'):
                     if gen_key not in comp_data['trep']['votos']:
                         comp_data['trep']['votos'][gen_key] = 0
 
-        # 2a. Extract Candidate Names
-        # struct: { 'Party': { rel_idx: "Name" } }
-        names_map = {}
-        if official_data:
-            for off_party, rows in official_data.items():
-                target_party = normalize_party(party_aliases.get(off_party, off_party))
-                if target_party not in names_map: names_map[target_party] = {}
-                
-                if target_party in party_idx_map:
-                    for abs_str, cand_info in rows.items():
-                        try:
-                            abs_i = int(abs_str)
-                            rel_i = party_idx_map[target_party][abs_i]
-                            # Shorten Name: First + First Last
-                            raw_name = cand_info.get('name', '').strip()
-                            parts = raw_name.split()
-                            short_name = raw_name
-                            if len(parts) >= 3:
-                                # Assume: Name1 [Name2] Last1 [Last2]
-                                # We want Name1 + Last1
-                                # Any middle names usually come before the first surname.
-                                # Heuristic: if 4 parts -> parts[0] + parts[2]
-                                # if 3 parts -> parts[0] + parts[1] (assuming Name Last1 Last2) OR Name1 Name2 Last1?
-                                # Common Spanish: Name Last1 Last2 (3 parts) -> Name Last1
-                                # Name1 Name2 Last1 (3 parts) -> Name1 Last1 (less common to omit mother's surname)
-                                # Let's try: unique logic
-                                if len(parts) == 4:
-                                    short_name = f"{parts[0]} {parts[2]}"
-                                elif len(parts) == 3:
-                                    # Ambiguous. Usually Name Last1 Last2.
-                                    # Juan Perez Lopez -> Juan Perez
-                                    short_name = f"{parts[0]} {parts[1]}"
-                                else:
-                                    # 5+ parts? taking 0 and -2 is safer
-                                    short_name = f"{parts[0]} {parts[-2]}"
-                            elif len(parts) == 2:
-                                short_name = raw_name
-                            
-                            names_map[target_party][rel_i] = short_name
-                        except: pass
+        # 2a. Candidate short names { 'Party': { rel_idx: "Name" } }, precomputed with the roster
+        names_map = {p: dict(names) for p, names in official['names'].items()} if official else {}
 
         comp_data['matrix'] = {
             'parties': sorted_parties,
@@ -759,12 +1049,9 @@ def get_comparison_data(jrv, nivel='PRESIDENTE'):
         }
 
         # Filter out rows that exceed official candidate count (if available)
-        if official_data:
-             # Determine Official Max Count (using relative count now)
-             max_cand_count = 0
-             for off_party, rows in official_data.items():
-                 c_cnt = len(rows)
-                 if c_cnt > max_cand_count: max_cand_count = c_cnt
+        if official:
+             # Official Max Count (using relative count now)
+             max_cand_count = official['max_count']
              
              if max_cand_count > 0:
                  final_max_idx = max_cand_count
@@ -845,6 +1132,7 @@ def get_comparison_data(jrv, nivel='PRESIDENTE'):
         comp_data['esc']['votos'] = {}
         comp_data['trep']['resumen'] = {'votos_validos': 0, 'votos_blancos': 0, 'votos_nulos': 0, 'gran_total': 0}
         comp_data['esc']['resumen'] = {'votos_validos': 0, 'votos_blancos': 0, 'votos_nulos': 0, 'gran_total': 0}
+        comp_data['trep']['total_marcas'] = comp_data['esc']['total_marcas'] = 0
         if comp_data.get('header_info'):
             comp_data['header_info']['participacion'] = "0.00%"
         if comp_data.get('matrix'):
@@ -869,236 +1157,386 @@ def get_comparison_data(jrv, nivel='PRESIDENTE'):
                  for k in comp_data['matrix']['totals']:
                      comp_data['matrix']['totals'][k] = {'trep': 0, 'esc': 0, 'diff': 0}
 
-    conn.close()
     return comp_data
 
-def get_all_jrvs_status():
-    conn = get_db_connection()
-    try: jrvs = conn.execute("SELECT DISTINCT jrv FROM actas ORDER BY CAST(jrv AS INTEGER) ASC").fetchall()
-    except: jrvs = conn.execute("SELECT DISTINCT jrv FROM actas ORDER BY jrv ASC").fetchall()
-    
+def status_winner(votos):
+    # Highest vote wins; ties keep the first key in insertion order (same as a stable sort)
+    if not votos: return "Sin Datos"
+    top_key = max(votos.items(), key=lambda item: item[1])[0]
+    name = top_key.split('(')[0].strip()
+    if "NACIONAL" in name: return "P. NACIONAL"
+    elif "LIBERAL" in name: return "P. LIBERAL"
+    elif "LIBRE" in name: return "LIBRE"
+    elif "DEMOCRATA" in name or "DC" in name: return "DC"
+    elif "INNOVACION" in name or "PINU" in name: return "PINU"
+    return name
+
+def compute_jrv_status(trep_votos, esc_votos, trep_resumen, esc_resumen):
+    """
+    Diff, signed per-party diffs and winner for one PRESIDENTE comparison.
+    Inputs are the normalized vote dicts (as built by get_comparison_data before padding)
+    and the resumen dicts of each side.
+    """
+    trep_votos = dict(trep_votos)
+    esc_votos = dict(esc_votos)
+
+    # Pad official columns exactly like get_comparison_data does
+    found = set(trep_votos) | set(esc_votos)
+    for oficial in SORT_ORDER:
+        match = next((fc for fc in found if fc.upper() == oficial), None)
+        if match: found.discard(match)
+        to_add = match or oficial
+        if to_add not in trep_votos: trep_votos[to_add] = 0
+        if to_add not in esc_votos: esc_votos[to_add] = 0
+
+    diff = 0
+    diff_nacional = diff_liberal = diff_libre = 0
+    for k in set(trep_votos) | set(esc_votos):
+        v_trep = trep_votos.get(k, 0)
+        v_esc = esc_votos.get(k, 0)
+        diff += abs(v_trep - v_esc)
+        d_signed = v_esc - v_trep
+        name = k.upper()
+        if "NACIONAL" in name: diff_nacional += d_signed
+        elif "LIBERAL" in name: diff_liberal += d_signed
+        elif "LIBRE" in name or "REFUNDACION" in name: diff_libre += d_signed
+
+    for field in ('votos_blancos', 'votos_nulos', 'gran_total'):
+        diff += abs(trep_resumen[field] - esc_resumen[field])
+
+    return {
+        'diff': diff,
+        'winner': status_winner(esc_votos if esc_votos else trep_votos),
+        'diff_nacional': diff_nacional,
+        'diff_liberal': diff_liberal,
+        'diff_libre': diff_libre
+    }
+
+# --- MATERIALIZED COMPARISON (jrv_comparacion / jrv_comparacion_partidos) ---
+# One row per (jrv, nivel) with the TREP-vs-ESCRUTINIO diff and winner, plus one row
+# per (jrv, nivel, partido) with the party totals shown in the summary table.
+# Kept up to date by every db.* write; rebuild_comparaciones() recomputes it from scratch.
+
+def summary_party_key(candidato, level):
+    """ Party column a result row belongs to in the summary table (None = junk row) """
+    canda = candidato.upper()
+    if level == 'DIPUTADOS':
+        # Formats: "PARTIDO - DIP X", "PARTIDO (CANDIDATO)", "PARTIDO"
+        if " - DIP" in canda: key = canda.split(" - DIP")[0].strip()
+        elif "(" in canda: key = canda.split("(")[0].strip()
+        else: key = canda.strip()
+        return map_party_name(key)
+    elif level == 'ALCALDE':
+        # Formats: "PARTIDO", "PARTIDO (CANDIDATO)"
+        if "(" in canda: key = canda.split("(")[0].strip()
+        else: key = canda.strip()
+        return map_party_name(key)
+    # PRESIDENTE: map the candidate name directly
+    return map_party_name(canda)
+
+def status_votes(rows, nivel):
+    """ Normalized {candidate: votes} as get_comparison_data builds it from resultados rows """
+    votos = {}
+    for candidato, v in rows:
+        cand_up = candidato.upper()
+        if any(x in cand_up for x in IGNORED_KEYS): continue
+        final_key = normalize_candidate(cand_up)
+        if nivel == 'PRESIDENTE' and 'DIP' in final_key: continue
+        votos[final_key] = v
+    return votos
+
+def summary_votes(rows, nivel):
+    """ {party column: votes} as get_summary_table aggregates resultados rows """
+    votos = {}
+    for candidato, v in rows:
+        key = summary_party_key(candidato, nivel)
+        if not key: continue
+        if nivel == 'DIPUTADOS':
+            # For Deputies, we sum votes of all candidates for the party
+            votos[key] = votos.get(key, 0) + v
+        else:
+            # One result per party; duplicates ('PINU' vs 'PINU (NAME)') take the MAX to avoid double counting
+            votos[key] = max(votos.get(key, 0), v)
+    return votos
+
+def compute_comparacion(jrv, nivel, trep, esc, trep_rows, esc_rows, trep_res, esc_res):
+    """
+    Derived rows for one (jrv, nivel).
+    trep/esc: acta rows (id, estado) or None; *_rows: [(candidato, votos)] in insertion order;
+    *_res: resumen rows (votos_blancos, votos_nulos, gran_total) or None.
+    Returns (jrv_comparacion tuple, [jrv_comparacion_partidos tuples]).
+    """
+    empty_resumen = {'votos_validos': 0, 'votos_blancos': 0, 'votos_nulos': 0, 'gran_total': 0}
+    status = {'diff': 0, 'winner': "Sin Datos", 'diff_nacional': 0, 'diff_liberal': 0, 'diff_libre': 0}
+    if trep and esc:
+        status = compute_jrv_status(status_votes(trep_rows, nivel), status_votes(esc_rows, nivel),
+                                    trep_res or empty_resumen, esc_res or empty_resumen)
+        if nivel == 'DIPUTADOS':
+            # Winner by party total, not by the single most voted deputy
+            esc_parties = summary_votes(esc_rows, nivel)
+            status['winner'] = status_winner(esc_parties or summary_votes(trep_rows, nivel))
+
+    party_trep = summary_votes(trep_rows, nivel)
+    party_esc = summary_votes(esc_rows, nivel)
+    parties = list(party_trep) + [p for p in party_esc if p not in party_trep]
+    if trep_res or esc_res:
+        for key, field in (('VOTOS BLANCOS', 'votos_blancos'), ('VOTOS NULOS', 'votos_nulos')):
+            party_trep[key] = trep_res[field] if trep_res else 0
+            party_esc[key] = esc_res[field] if esc_res else 0
+            parties.append(key)
+
+    partido_rows = []
+    for p in parties:
+        v_trep = party_trep.get(p, 0)
+        v_esc = party_esc.get(p, 0)
+        partido_rows.append((jrv, nivel, p, v_trep, v_esc, v_esc - v_trep))
+    has_trep_data = any(r[3] > 0 for r in partido_rows)
+
+    comparacion_row = (
+        jrv, nivel,
+        trep['id'] if trep else None, esc['id'] if esc else None,
+        trep['estado'] if trep else None,
+        status['diff'], status['diff_nacional'], status['diff_liberal'], status['diff_libre'], status['winner'],
+        trep_res['gran_total'] if trep_res else 0, esc_res['gran_total'] if esc_res else 0,
+        1 if has_trep_data else 0
+    )
+    return comparacion_row, partido_rows
+
+SQL_INSERT_COMPARACION = """
+    INSERT OR REPLACE INTO jrv_comparacion
+        (jrv, nivel, trep_id, esc_id, estado, diff, diff_nacional, diff_liberal, diff_libre, winner,
+         trep_gran_total, esc_gran_total, has_trep_data, jrv_num)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, CAST(?1 AS INTEGER))
+"""
+SQL_INSERT_COMPARACION_PARTIDO = "INSERT INTO jrv_comparacion_partidos (jrv, nivel, partido, trep, esc, diff) VALUES (?, ?, ?, ?, ?, ?)"
+
+def refresh_comparacion(jrv, nivel, conn=None):
+    """ Recomputes the derived rows of one (jrv, nivel). Called inside every write transaction. """
+    with transaction(conn) as conn:
+        conn.execute("DELETE FROM jrv_comparacion WHERE jrv = ? AND nivel = ?", (jrv, nivel))
+        conn.execute("DELETE FROM jrv_comparacion_partidos WHERE jrv = ? AND nivel = ?", (jrv, nivel))
+
+        actas = conn.execute("SELECT id, origen, estado FROM actas WHERE jrv = ? AND nivel = ?", (jrv, nivel)).fetchall()
+        if not actas: return
+        trep = next((a for a in actas if a['origen'] == 'TREP'), None)
+        esc = next((a for a in actas if a['origen'] == 'ESCRUTINIO'), None)
+
+        def acta_rows(acta):
+            if not acta: return []
+            return [(r['candidato'], r['votos']) for r in conn.execute(
+                "SELECT candidato, votos FROM resultados WHERE acta_id = ? ORDER BY id", (acta['id'],))]
+
+        def acta_resumen(acta):
+            if not acta: return None
+            return conn.execute("SELECT votos_blancos, votos_nulos, gran_total FROM resumenes WHERE acta_id = ?", (acta['id'],)).fetchone()
+
+        comparacion_row, partido_rows = compute_comparacion(
+            jrv, nivel, trep, esc, acta_rows(trep), acta_rows(esc), acta_resumen(trep), acta_resumen(esc))
+        conn.execute(SQL_INSERT_COMPARACION, comparacion_row)
+        conn.executemany(SQL_INSERT_COMPARACION_PARTIDO, partido_rows)
+
+def refresh_comparacion_for_acta(acta_id, conn=None):
+    conn = get_connection(conn)
+    acta = conn.execute("SELECT jrv, nivel FROM actas WHERE id = ?", (acta_id,)).fetchone()
+    if acta: refresh_comparacion(acta['jrv'], acta['nivel'], conn=conn)
+
+def rebuild_comparaciones(conn=None, batch_size=5000):
+    """
+    Recomputes jrv_comparacion and jrv_comparacion_partidos for the whole database
+    (existing databases, or after scripts that write to resultados directly).
+    Results are streamed grouped by (jrv, nivel), so memory does not grow with the database.
+    """
+    with transaction(conn) as conn:
+        conn.execute("DELETE FROM jrv_comparacion")
+        conn.execute("DELETE FROM jrv_comparacion_partidos")
+
+        actas = {}
+        for a in conn.execute("SELECT id, jrv, nivel, origen, estado FROM actas"):
+            slot = actas.setdefault((a['jrv'], a['nivel']), {'TREP': None, 'ESCRUTINIO': None})
+            if a['origen'] in slot and slot[a['origen']] is None: slot[a['origen']] = a
+        resumenes = {r['acta_id']: r for r in conn.execute("SELECT acta_id, votos_blancos, votos_nulos, gran_total FROM resumenes")}
+
+        comparacion_rows, partido_rows = [], []
+
+        def add(jrv, nivel, slot, by_acta):
+            trep, esc = slot['TREP'], slot['ESCRUTINIO']
+            comparacion_row, partidos = compute_comparacion(
+                jrv, nivel, trep, esc,
+                by_acta.get(trep['id'], []) if trep else [], by_acta.get(esc['id'], []) if esc else [],
+                resumenes.get(trep['id']) if trep else None, resumenes.get(esc['id']) if esc else None)
+            comparacion_rows.append(comparacion_row)
+            partido_rows.extend(partidos)
+            if len(comparacion_rows) >= batch_size: flush()
+
+        def flush():
+            conn.executemany(SQL_INSERT_COMPARACION, comparacion_rows)
+            conn.executemany(SQL_INSERT_COMPARACION_PARTIDO, partido_rows)
+            comparacion_rows.clear()
+            partido_rows.clear()
+
+        count = len(actas)
+        groups = itertools.groupby(conn.execute("""
+            SELECT a.jrv, a.nivel, r.acta_id, r.candidato, r.votos
+            FROM resultados r JOIN actas a ON a.id = r.acta_id
+            ORDER BY a.jrv, a.nivel, r.acta_id, r.id
+        """), key=lambda r: (r['jrv'], r['nivel']))
+        for (jrv, nivel), group in groups:
+            by_acta = {}
+            for r in group: by_acta.setdefault(r['acta_id'], []).append((r['candidato'], r['votos']))
+            slot = actas.pop((jrv, nivel), None)
+            if slot: add(jrv, nivel, slot, by_acta)
+        # Actas without any result row
+        for (jrv, nivel), slot in actas.items():
+            add(jrv, nivel, slot, {})
+        flush()
+    return count
+
+def get_all_jrvs_status(conn=None):
+    """
+    Dashboard status for every JRV (PRESIDENTE comparison), read from jrv_comparacion.
+    """
+    conn = get_connection(conn)
+    rows = conn.execute("""
+        SELECT j.jrv, c.trep_id, c.esc_id, c.estado, c.diff, c.winner, c.diff_nacional, c.diff_liberal, c.diff_libre
+        FROM jrv_comparacion j
+        LEFT JOIN jrv_comparacion c ON c.jrv = j.jrv AND c.nivel = 'PRESIDENTE'
+        GROUP BY j.jrv_num, j.jrv
+        ORDER BY j.jrv_num ASC, j.jrv ASC
+    """).fetchall()
+
     status_list = []
-    for row in jrvs:
-        jrv = row['jrv']
-        trep = conn.execute("SELECT estado FROM actas WHERE jrv=? AND origen='TREP' AND nivel='PRESIDENTE'", (jrv,)).fetchone()
-        esc = conn.execute("SELECT id FROM actas WHERE jrv=? AND origen='ESCRUTINIO' AND nivel='PRESIDENTE'", (jrv,)).fetchone()
-        
-        diff = 0
-        winner = "Sin Datos"
-        diff_nacional = 0
-        diff_liberal = 0
-        diff_libre = 0
-        
-        if trep and esc:
-            comp = get_comparison_data(jrv, nivel='PRESIDENTE')
-            for k in comp['all_candidates']:
-                v_trep = comp['trep']['votos'].get(k, 0)
-                v_esc = comp['esc']['votos'].get(k, 0)
-                
-                diff += abs(v_trep - v_esc)
-                d_signed = v_esc - v_trep 
-                
-                name = k.upper()
-                if "NACIONAL" in name: diff_nacional += d_signed
-                elif "LIBERAL" in name: diff_liberal += d_signed
-                elif "LIBRE" in name or "REFUNDACION" in name: diff_libre += d_signed
-            
-            r_trep = comp['trep']['resumen']
-            r_esc = comp['esc']['resumen']
-            diff += abs(r_trep['votos_blancos'] - r_esc['votos_blancos'])
-            diff += abs(r_trep['votos_nulos'] - r_esc['votos_nulos'])
-            diff += abs(r_trep['gran_total'] - r_esc['gran_total'])
-
-        votos_fuente = {}
-        if trep and esc:
-             # Cargar comp_data para obtener ganador
-             if 'comp' not in locals(): comp = get_comparison_data(jrv)
-             votos_fuente = comp['esc']['votos'] if comp['esc']['votos'] else comp['trep']['votos']
-        
-        if votos_fuente:
-            top = sorted(votos_fuente.items(), key=lambda item: item[1], reverse=True)
-            if top:
-                name = top[0][0].split('(')[0].strip()
-                if "NACIONAL" in name: winner = "P. NACIONAL"
-                elif "LIBERAL" in name: winner = "P. LIBERAL"
-                elif "LIBRE" in name: winner = "LIBRE"
-                elif "DEMOCRATA" in name or "DC" in name: winner = "DC"
-                elif "INNOVACION" in name or "PINU" in name: winner = "PINU"
-                else: winner = name
-        
+    for row in rows:
+        has_trep = row['trep_id'] is not None
         status_list.append({
-            'jrv': jrv, 
-            'has_trep': trep is not None, 
-            'has_esc': esc is not None, 
-            'estado': trep['estado'] if trep else 'FALTANTE', 
-            'diff': diff, 
-            'winner': winner,
-            'diff_nacional': diff_nacional,
-            'diff_liberal': diff_liberal,
-            'diff_libre': diff_libre
+            'jrv': row['jrv'], 
+            'has_trep': has_trep, 
+            'has_esc': row['esc_id'] is not None, 
+            'estado': row['estado'] if has_trep else 'FALTANTE', 
+            'diff': row['diff'] or 0, 
+            'winner': row['winner'] or "Sin Datos",
+            'diff_nacional': row['diff_nacional'] or 0,
+            'diff_liberal': row['diff_liberal'] or 0,
+            'diff_libre': row['diff_libre'] or 0
         })
-    conn.close()
     return status_list
 
-def get_jrv_navigation(current_jrv):
-    conn = get_db_connection()
-    try:
-        try: jrvs_raw = conn.execute("SELECT DISTINCT jrv FROM actas ORDER BY CAST(jrv AS INTEGER) ASC").fetchall()
-        except: jrvs_raw = conn.execute("SELECT DISTINCT jrv FROM actas ORDER BY jrv ASC").fetchall()
-        jrvs = [row['jrv'] for row in jrvs_raw]
-        prev_jrv, next_jrv = None, None
-        try:
-            idx = jrvs.index(str(current_jrv))
-            if idx > 0: prev_jrv = jrvs[idx - 1]
-            if idx < len(jrvs) - 1: next_jrv = jrvs[idx + 1]
-        except ValueError: pass
-        return {'prev': prev_jrv, 'next': next_jrv}
-    finally: conn.close()
-
-def get_next_pending_jrv(current_jrv, level='PRESIDENTE'):
-    conn = get_db_connection()
-    try:
-        # Buscar siguiente pendiente con ID mayor
-        query_next = "SELECT jrv FROM actas WHERE origen = 'TREP' AND estado = 'PENDIENTE' AND nivel = ? AND CAST(jrv AS INTEGER) > CAST(? AS INTEGER) ORDER BY CAST(jrv AS INTEGER) ASC LIMIT 1"
-        row = conn.execute(query_next, (level, current_jrv,)).fetchone()
-        if row: return row['jrv']
-        
-        # Buscar desde el principio
-        query_first = "SELECT jrv FROM actas WHERE origen = 'TREP' AND estado = 'PENDIENTE' AND nivel = ? ORDER BY CAST(jrv AS INTEGER) ASC LIMIT 1"
-        row = conn.execute(query_first, (level,)).fetchone()
-        if row and str(row['jrv']) != str(current_jrv): return row['jrv']
-        return None
-    finally: conn.close()
-
-def get_global_stats():
-    conn = get_db_connection()
+def get_jrv_navigation(current_jrv, level=None, estado=None, only_diff=False, depto=None, conn=None):
+    """
+    Previous / next JRV around current_jrv, answered by two indexed LIMIT 1 lookups
+    on (jrv_num, jrv) instead of materializing the whole list.
+    Without filters it steps through every JRV in actas. Optional filters:
+      level     - only JRVs with a comparison at this level
+      estado    - TREP estado at that level (e.g. PENDIENTE, VALIDADO)
+      only_diff - only JRVs whose comparison has diff > 0
+      depto     - department, from JRV_totales.csv (see sync_jrv_ubicacion)
+    estado / only_diff apply to PRESIDENTE when no level is given.
+    """
+    conn = get_connection(conn)
+    if level or estado or only_diff:
+        source = "jrv_comparacion c"
+        where, params = ["c.nivel = ?"], [level or 'PRESIDENTE']
+        if estado:
+            where.append("c.estado = ?")
+            params.append(estado)
+        if only_diff: where.append("c.diff > 0")
+    else:
+        source = "actas c"
+        where, params = [], []
+    if depto:
+        sync_jrv_ubicacion(conn=conn)
+        source += " JOIN jrv_ubicacion u ON u.jrv = c.jrv"
+        where.append("u.depto = ?")
+        params.append(depto.strip().upper())
+
+    current = [str(current_jrv), str(current_jrv)]
+    filters = "".join(f"{w} AND " for w in where)
+    prev_row = conn.execute(f"""
+        SELECT c.jrv FROM {source} WHERE {filters}(c.jrv_num, c.jrv) < (CAST(? AS INTEGER), ?)
+        ORDER BY c.jrv_num DESC, c.jrv DESC LIMIT 1""", params + current).fetchone()
+    next_row = conn.execute(f"""
+        SELECT c.jrv FROM {source} WHERE {filters}(c.jrv_num, c.jrv) > (CAST(? AS INTEGER), ?)
+        ORDER BY c.jrv_num ASC, c.jrv ASC LIMIT 1""", params + current).fetchone()
+    return {'prev': prev_row['jrv'] if prev_row else None, 'next': next_row['jrv'] if next_row else None}
+
+def get_next_pending_jrv(current_jrv, level='PRESIDENTE', conn=None):
+    conn = get_connection(conn)
+    # Buscar siguiente pendiente con ID mayor
+    query_next = "SELECT jrv FROM actas WHERE nivel = ? AND origen = 'TREP' AND estado = 'PENDIENTE' AND jrv_num > CAST(? AS INTEGER) ORDER BY jrv_num ASC LIMIT 1"
+    row = conn.execute(query_next, (level, current_jrv,)).fetchone()
+    if row: return row['jrv']
+    
+    # Buscar desde el principio
+    query_first = "SELECT jrv FROM actas WHERE nivel = ? AND origen = 'TREP' AND estado = 'PENDIENTE' ORDER BY jrv_num ASC LIMIT 1"
+    row = conn.execute(query_first, (level,)).fetchone()
+    if row and str(row['jrv']) != str(current_jrv): return row['jrv']
+    return None
+
+def get_global_stats(conn=None):
+    conn = get_connection(conn)
     
     # Structure: { 'PRESIDENTE': { 'trep': {...}, 'esc': {...} }, ... }
     final_stats = {}
     
     levels = ['PRESIDENTE', 'DIPUTADOS', 'ALCALDE']
     
+    # Sums per (level, origin, candidate). A (jrv, level) counts only if its FRENAEL (TREP)
+    # acta has a valid total - "solo debe sumarse los resultados que tenga valor valido de
+    # TOTAL para FRENAEL" - for TREP and the official count alike. Summing every result row
+    # dominates the cost (about the same as the former per-level queries); one small
+    # GROUP BY per (level, origin) sorts faster than a single sort over all of them.
+    pairs = [(level, origen) for level in levels for origen in ('TREP', 'ESCRUTINIO')]
+    branch = """
+        SELECT * FROM (
+            SELECT a.nivel, a.origen, r.candidato, SUM(r.votos) as total
+            FROM trep_valida t
+            JOIN actas a ON a.jrv = t.jrv AND a.nivel = t.nivel
+            JOIN resultados r ON r.acta_id = a.id
+            WHERE a.nivel = ? AND a.origen = ?
+            GROUP BY r.candidato
+        )"""
+    votes = {}
+    for row in conn.execute("""
+        WITH trep_valida AS (
+            SELECT a.jrv, a.nivel FROM actas a
+            JOIN resumenes res ON res.acta_id = a.id
+            WHERE a.origen = 'TREP' AND res.gran_total > 0
+        )""" + " UNION ALL ".join([branch] * len(pairs)), [p for pair in pairs for p in pair]):
+        votes.setdefault((row['nivel'], row['origen']), []).append(row)
+
+    # Acta counts per (level, origin) in one grouped pass over the TREP actas and their totals:
+    #   total_inventory - TREP: every acta; ESC: those with a TREP counterpart (observed universe)
+    #   actas           - processed: valid TREP total (and, for ESC, at least one result row)
+    counts = {}
+    for row in conn.execute("""
+        SELECT a.nivel, a.origen, COUNT(*) AS total_inventory,
+               SUM(CASE WHEN COALESCE(res.gran_total, 0) > 0
+                         AND (a.origen = 'TREP' OR EXISTS (SELECT 1 FROM resultados r WHERE r.acta_id = a.id))
+                        THEN 1 ELSE 0 END) AS actas
+        FROM actas t
+        LEFT JOIN resumenes res ON res.acta_id = t.id
+        JOIN actas a ON a.jrv = t.jrv AND a.nivel = t.nivel AND a.origen IN ('TREP', 'ESCRUTINIO')
+        WHERE t.origen = 'TREP'
+        GROUP BY a.nivel, a.origen
+    """):
+        counts[(row['nivel'], row['origen'])] = row
+
     for level in levels:
         # Initialize level stats with empty party dicts
         level_stats = {'trep': {}, 'esc': {}}
-        
-        # Query with filtering for Valid Total in FRENAEL (TREP)
-        # User requirement: "solo debe sumarse los resultados que tenga valor valido de TOTAL para FRENAEL"
-        # Since we compare TREP vs OFFICIAL, do we apply this filter to OFFICIAL too? 
-        # The prompt says "TOTAL para FRENAEL", implying strictness on FRENAEL side.
-        # But usually we want to see available data. 
-        # Let's interpret strictness:
-        # Sum votes FROM actas WHERE (acta has valid summary total > 0)
-        
-        # Actually, let's effectively filter specific valid actas. 
-        # For TREP: Must have gran_total > 0 in resumenes.
-        # For ESC: Maybe keep standard? Or same rule?
-        # Let's apply "gran_total > 0" check for both to be safe/consistent, or strictly for TREP if requested.
-        # "que tenga valor valido de TOTAL para FRENAEL" -> specifically mentioned FRENAEL.
-        
-        
+        rows_trep = votes.get((level, 'TREP'), [])
+        rows_esc = votes.get((level, 'ESCRUTINIO'), [])
 
-            
-        # Get Acta Counts
-        # TREP: Must have valid resumen
-        # ESC: If present in resultados (since we didn't enforce resumen check for ESC in the main query? 
-        # Wait, the main query DOES enforce `JOIN resumenes`. 
-        # If OFICIAL data lacks resumenes, the main query returns ZERO for official.
-        # This confirms why Official might be empty if resumenes is empty.
-        # 
-        # FIX: The query needs left join or separate logic for ESC if ESC data lacks resumenes.
-        # But filtering only FRENAEL total valid?
-        # "solo debe sumarse los resultados que tenga valor valido de TOTAL para FRENAEL"
-        # This acts as a filter on *FRENAEL* data.
-        # It doesn't explicitly say "Filter Official data by FRENAEL valid total".
-        # It says "sum results... that have valid TOTAL for FRENAEL".
-        # 
-        # Let's decouple:
-        # TREP Data: Filter by `res.gran_total > 0`.
-        # ESC Data: Show all available? Or match FRENAEL?
-        # Usually independent totals.
-        #
-        # Let's adjust the query to be separated or use UNION.
-        # Or simplistic approach: 
-        # 1. Query TREP with filter.
-        # 2. Query ESC without filter (or different filter).
-        
-        # New approach: Two queries.
-        
-        # TREP Query
-        query_trep = """
-            SELECT r.candidato, SUM(r.votos) as total 
-            FROM resultados r 
-            JOIN actas a ON r.acta_id = a.id 
-            JOIN resumenes res ON res.acta_id = a.id
-            WHERE a.nivel = ? AND a.origen = 'TREP'
-            AND res.gran_total > 0
-            GROUP BY r.candidato
-        """
-        rows_trep = conn.execute(query_trep, (level,)).fetchall()
-        
-        # ESC Query (Strictly Filtered by TREP Processed)
-        # Only sum results from Official Actas that HAVE a corresponding TREP acta WITH DATA (gran_total > 0)
-        query_esc = """
-            SELECT r.candidato, SUM(r.votos) as total 
-            FROM resultados r 
-            JOIN actas a ON r.acta_id = a.id 
-            WHERE a.nivel = ? AND a.origen = 'ESCRUTINIO'
-            AND EXISTS (
-                SELECT 1 FROM actas t 
-                JOIN resumenes res ON res.acta_id = t.id
-                WHERE t.jrv = a.jrv AND t.nivel = a.nivel AND t.origen = 'TREP'
-                AND res.gran_total > 0
-            )
-            GROUP BY r.candidato
-        """
-        rows_esc = conn.execute(query_esc, (level,)).fetchall()
-        
-        # Counts - Processed (with votes)
-        count_trep = conn.execute("""
-            SELECT COUNT(DISTINCT a.id) 
-            FROM actas a 
-            JOIN resumenes res ON res.acta_id = a.id 
-            WHERE a.nivel = ? AND a.origen = 'TREP' AND res.gran_total > 0
-        """, (level,)).fetchone()[0]
-        
-        # Count ESC (Filtered by TREP Processed)
-        count_esc = conn.execute("""
-            SELECT COUNT(DISTINCT a.id) 
-            FROM actas a 
-            JOIN resultados r ON r.acta_id = a.id
-            WHERE a.nivel = ? AND a.origen = 'ESCRUTINIO'
-            AND EXISTS (
-                SELECT 1 FROM actas t 
-                JOIN resumenes res ON res.acta_id = t.id
-                WHERE t.jrv = a.jrv AND t.nivel = a.nivel AND t.origen = 'TREP'
-                AND res.gran_total > 0
-            )
-        """, (level,)).fetchone()[0]
-
-        # Counts - Total Inventory (for comparison context)
-        total_trep = conn.execute("SELECT COUNT(*) FROM actas WHERE nivel = ? AND origen = 'TREP'", (level,)).fetchone()[0]
-        
-        # Total ESC restricted to observed universe (Inventory Overlap)
-        # We assume if it's observed, we expect to eventually have it.
-        total_esc = conn.execute("""
-            SELECT COUNT(*) FROM actas a
-            WHERE a.nivel = ? AND a.origen = 'ESCRUTINIO'
-            AND EXISTS (SELECT 1 FROM actas t WHERE t.jrv = a.jrv AND t.nivel = a.nivel AND t.origen = 'TREP')
-        """, (level,)).fetchone()[0]
-        
-        level_stats['trep']['actas'] = count_trep
-        level_stats['trep']['total_inventory'] = total_trep
-        
-        level_stats['esc']['actas'] = count_esc
-        level_stats['esc']['total_inventory'] = total_esc
+        for side, origen in (('trep', 'TREP'), ('esc', 'ESCRUTINIO')):
+            c = counts.get((level, origen))
+            level_stats[side]['actas'] = (c['actas'] or 0) if c else 0
+            level_stats[side]['total_inventory'] = c['total_inventory'] if c else 0
         
         totals_validos = {'trep': 0, 'esc': 0}
         
         # Aggregate TREP
         for row in rows_trep:
             totals_validos['trep'] += row['total']
-            name = map_party_name(row['candidato'].upper())
+            name = candidate_party(row['candidato'])
             # Skip invalid
             if not name: continue
             
@@ -1109,7 +1547,7 @@ def get_global_stats():
         # Aggregate ESC
         for row in rows_esc:
             totals_validos['esc'] += row['total']
-            name = map_party_name(row['candidato'].upper())
+            name = candidate_party(row['candidato'])
             # Skip invalid
             if not name: continue
             
@@ -1167,46 +1605,152 @@ def get_global_stats():
         
         final_stats[level] = level_stats
 
-    conn.close()
     return final_stats
 
-def export_db_csv():
-    conn = get_db_connection()
-    output = io.StringIO()
-    output.write(u'\ufeff')
-    writer = csv.writer(output)
-    writer.writerow(['JRV', 'ORIGEN', 'CANDIDATO_RUBRO', 'VOTOS'])
-    query = """
-    SELECT * FROM (
-        SELECT a.jrv, a.origen, r.candidato as nombre, r.votos, 1 as orden
-        FROM resultados r JOIN actas a ON r.acta_id = a.id
-        UNION ALL
-        SELECT a.jrv, a.origen, 'VOTOS BLANCOS' as nombre, res.votos_blancos as votos, 2 as orden
-        FROM resumenes res JOIN actas a ON res.acta_id = a.id
-        UNION ALL
-        SELECT a.jrv, a.origen, 'VOTOS NULOS' as nombre, res.votos_nulos as votos, 3 as orden
-        FROM resumenes res JOIN actas a ON res.acta_id = a.id
-        UNION ALL
-        SELECT a.jrv, a.origen, 'GRAN TOTAL' as nombre, res.gran_total as votos, 4 as orden
-        FROM resumenes res JOIN actas a ON res.acta_id = a.id
-    ) t
-    ORDER BY CAST(jrv AS INTEGER), origen, orden, nombre
+# --- EXPORTACIÓN CSV ---
+
+EXPORT_CSV_HEADER = ['JRV', 'ORIGEN', 'CANDIDATO_RUBRO', 'VOTOS']
+# Fragment of the party name on the acta -> short name in the export
+EXPORT_PARTY_ALIASES = [
+    ("NACIONAL DE HONDURAS", "P. NACIONAL"),
+    ("LIBERAL DE HONDURAS", "P. LIBERAL"),
+    ("LIBERTAD Y REFUNDACION", "LIBRE"),
+    ("DEMOCRATA CRISTIANO", "DC"),
+    ("INNOVACION Y UNIDAD", "PINU"),
+]
+# Summary rows written after the candidates of each JRV/origen: (order, rubro, resumenes column)
+EXPORT_RESUMEN_ROWS = [(2, 'VOTOS BLANCOS', 'votos_blancos'), (3, 'VOTOS NULOS', 'votos_nulos'), (4, 'GRAN TOTAL', 'gran_total')]
+EXPORT_CSV_BATCH = 1000
+
+def export_party_name(nombre):
+    nombre = nombre.split('(')[0].strip()
+    for fragment, short in EXPORT_PARTY_ALIASES:
+        if fragment in nombre: return short
+    return nombre
+
+def iter_export_rows(nivel=None, conn=None):
     """
-    rows = conn.execute(query).fetchall()
-    for row in rows:
-        nombre = row['nombre'].split('(')[0].strip()
-        if "NACIONAL DE HONDURAS" in nombre: nombre = "P. NACIONAL"
-        elif "LIBERAL DE HONDURAS" in nombre: nombre = "P. LIBERAL"
-        elif "LIBERTAD Y REFUNDACION" in nombre: nombre = "LIBRE"
-        elif "DEMOCRATA CRISTIANO" in nombre: nombre = "DC"
-        elif "INNOVACION Y UNIDAD" in nombre: nombre = "PINU"
-        writer.writerow([row['jrv'], row['origen'], nombre, row['votos']])
-    conn.close()
-    return output.getvalue()
-
-def update_result_vote(acta_id, candidato, votos):
-    conn = get_db_connection()
-    
+    Rows [jrv, origen, candidato_rubro, votos] of the CSV export (all levels, or one), ordered by
+    JRV, origen, then candidates / blancos / nulos / gran total. Read from one cursor walking
+    actas in jrv_num order; only one JRV/origen group is sorted in memory at a time.
+    """
+    conn = get_connection(conn)
+    where, params = ("WHERE a.nivel = ?", (nivel,)) if nivel else ("", ())
+    rows = conn.execute(f"""
+        SELECT a.id AS acta_id, a.jrv, a.jrv_num, a.origen, r.id AS resultado_id, r.candidato, r.votos,
+               res.acta_id AS resumen_id, res.votos_blancos, res.votos_nulos, res.gran_total
+        FROM actas a
+        LEFT JOIN resultados r ON r.acta_id = a.id
+        LEFT JOIN resumenes res ON res.acta_id = a.id
+        {where}
+        ORDER BY a.jrv_num, a.origen
+    """, params)
+
+    party_names = {}  # raw name -> export name, computed once per distinct name
+    for (_, origen), group in itertools.groupby(rows, key=lambda r: (r['jrv_num'], r['origen'])):
+        lines, resumen_done = [], set()
+        for r in group:
+            if r['resultado_id'] is not None:
+                nombre = r['candidato'] or ''
+                lines.append((1, nombre, r['acta_id'], r['jrv'], r['votos']))
+            if r['resumen_id'] is not None and r['acta_id'] not in resumen_done:
+                resumen_done.add(r['acta_id'])
+                for orden, rubro, col in EXPORT_RESUMEN_ROWS:
+                    lines.append((orden, rubro, r['acta_id'], r['jrv'], r[col]))
+        lines.sort(key=lambda x: x[:3])
+        for orden, nombre, _, jrv, votos in lines:
+            name = party_names.get(nombre)
+            if name is None:
+                name = party_names[nombre] = export_party_name(nombre)
+            yield [jrv, origen, name, votos]
+
+def iter_export_csv(nivel=None, conn=None, batch_size=EXPORT_CSV_BATCH):
+    """ The CSV export as text chunks (BOM + header first, then batch_size rows per chunk). """
+    buf = io.StringIO()
+    buf.write(u'\ufeff')
+    writer = csv.writer(buf)
+    writer.writerow(EXPORT_CSV_HEADER)
+    for i, row in enumerate(iter_export_rows(nivel, conn=conn), 1):
+        writer.writerow(row)
+        if i % batch_size == 0:
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate()
+    yield buf.getvalue()
+
+def export_db_csv(conn=None, nivel=None):
+    return ''.join(iter_export_csv(nivel, conn=conn))
+
+# --- DRY-RUN DE IMPORTADORES ---
+
+DIFF_FIELDS = ['jrv', 'nivel', 'origen', 'candidato', 'cambio', 'actual', 'nuevo']
+
+def _rows_digest(rows):
+    """ Order-independent hash of the (candidato, votos) rows of one acta (duplicates count). """
+    return hash(frozenset(collections.Counter(rows).items()))
+
+def diff_resultados(new_results, conn=None):
+    """
+    Dry run of an import: new_results = {(jrv, nivel, origen): [(candidato, votos)]}, the rows the
+    importer would write. Compares them with the database per (jrv, nivel, origen, candidato) and writes nothing.
+    Each acta is first compared by a hash of its rows (one pass over resultados); only the actas whose
+    hash differs are read row by row. Returns [{jrv, nivel, origen, candidato, cambio, actual, nuevo}],
+    cambio: 'alta' (new candidato or acta), 'baja' (row that would disappear) or 'modificado'.
+    """
+    conn = get_connection(conn)
+    new_results = {(str(jrv), nivel, origen): rows for (jrv, nivel, origen), rows in new_results.items()}
+
+    # 1. Hash of the current rows of every acta the import touches
+    actas, digests = {}, {}
+    rows = conn.execute("""SELECT a.id, a.jrv, a.nivel, a.origen, r.candidato, r.votos
+                           FROM actas a LEFT JOIN resultados r ON r.acta_id = a.id ORDER BY a.id""")
+    for acta_id, group in itertools.groupby(rows, key=lambda r: r['id']):
+        group = list(group)
+        key = (group[0]['jrv'], group[0]['nivel'], group[0]['origen'])
+        if key not in new_results: continue
+        actas[key] = acta_id
+        digests[key] = _rows_digest((r['candidato'], r['votos']) for r in group if r['candidato'] is not None)
+
+    # 2. Row by row only where the hash differs
+    changed = [key for key, new_rows in new_results.items() if digests.get(key) != _rows_digest(new_rows)]
+    current = {}
+    ids = [actas[key] for key in changed if key in actas]
+    for i in range(0, len(ids), 500):
+        chunk = ids[i:i + 500]
+        for r in conn.execute(f"SELECT acta_id, candidato, votos FROM resultados WHERE acta_id IN ({','.join('?' * len(chunk))}) ORDER BY id", chunk):
+            current.setdefault(r['acta_id'], []).append((r['candidato'], r['votos']))
+
+    changes = []
+    for key in sorted(changed, key=lambda k: (int(k[0]) if k[0].isdigit() else 0, k)):
+        old_rows = current.get(actas.get(key), [])
+        old, new = dict(old_rows), dict(new_results[key])
+        repeated = collections.Counter(candidato for candidato, _ in old_rows)
+        for candidato in list(new) + [c for c in old if c not in new]:
+            actual, nuevo = old.get(candidato), new.get(candidato)
+            if candidato not in old: cambio = 'alta'
+            elif candidato not in new: cambio = 'baja'
+            elif actual != nuevo or repeated[candidato] > 1: cambio = 'modificado'
+            else: continue
+            changes.append(dict(zip(DIFF_FIELDS, (*key, candidato, cambio, actual, nuevo))))
+    return changes
+
+def write_diff_report(changes, path):
+    """ Writes the diff_resultados changes to `path`: JSON if it ends in .json, CSV otherwise. """
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        if path.endswith('.json'):
+            json.dump(changes, f, ensure_ascii=False, indent=1)
+        else:
+            writer = csv.DictWriter(f, fieldnames=DIFF_FIELDS)
+            writer.writeheader()
+            writer.writerows(changes)
+
+def update_result_vote(acta_id, candidato, votos, conn=None):
+    with transaction(conn) as conn:
+        _update_result_vote(conn, acta_id, candidato, votos)
+        recalculate_grand_total(acta_id, conn=conn)
+        refresh_comparacion_for_acta(acta_id, conn=conn)
+
+def _update_result_vote(conn, acta_id, candidato, votos):
     # Try case-insensitive match first to prevent duplicates like "Nacional" vs "NACIONAL"
     # We prioritize strict match if exists, but if not, look for case-insensitive match
     
@@ -1230,302 +1774,281 @@ def update_result_vote(acta_id, candidato, votos):
         conn.execute("UPDATE resultados SET votos = ? WHERE id = ?", (votos, match_id))
     else:
         conn.execute("INSERT INTO resultados (acta_id, candidato, votos) VALUES (?, ?, ?)", (acta_id, candidato, votos))
-        
-    conn.commit()
-    conn.close()
-    recalculate_grand_total(acta_id)
 
-def update_resumen_field(acta_id, field, value):
-    conn = get_db_connection()
+def update_resumen_field(acta_id, field, value, conn=None):
     if field not in ['votos_blancos', 'votos_nulos', 'votos_validos']: return
-    exists = conn.execute("SELECT acta_id FROM resumenes WHERE acta_id = ?", (acta_id,)).fetchone()
-    if not exists: conn.execute("INSERT INTO resumenes (acta_id, votos_validos, votos_blancos, votos_nulos, gran_total) VALUES (?, 0, 0, 0, 0)", (acta_id,))
-    conn.execute(f"UPDATE resumenes SET {field} = ? WHERE acta_id = ?", (value, acta_id))
-    conn.commit(); conn.close(); recalculate_grand_total(acta_id)
-
-def recalculate_grand_total(acta_id):
-    conn = get_db_connection()
-    # Get Level
-    acta = conn.execute("SELECT nivel FROM actas WHERE id=?", (acta_id,)).fetchone()
-    nivel = acta['nivel'] if acta else ''
-    
-    sum_candidatos = conn.execute("SELECT SUM(votos) FROM resultados WHERE acta_id = ?", (acta_id,)).fetchone()[0] or 0
-    res = conn.execute("SELECT votos_validos, votos_blancos, votos_nulos FROM resumenes WHERE acta_id = ?", (acta_id,)).fetchone()
-    
-    blancos = res['votos_blancos'] if res else 0
-    nulos = res['votos_nulos'] if res else 0
-    validos_db = res['votos_validos'] if res else 0
-    
-    if nivel == 'DIPUTADOS':
-        # For DEPUTIES: Votos Validos is manually entered (Ballots), NOT sum of votes (Marks)
-        # Gran Total = Validos (Ballots) + Blancos + Nulos
-        gran_total = validos_db + blancos + nulos
-        conn.execute("UPDATE resumenes SET gran_total = ? WHERE acta_id = ?", (gran_total, acta_id))
-    else:
-        # For PRESIDENTE/ALCALDE: Validos = Sum of Candidates
-        gran_total = sum_candidatos + blancos + nulos
-        conn.execute("UPDATE resumenes SET gran_total = ?, votos_validos = ? WHERE acta_id = ?", (gran_total, sum_candidatos, acta_id))
-        
-    conn.commit(); conn.close()
-
-def delete_result_row(acta_id, candidato):
-    conn = get_db_connection()
-    conn.execute("DELETE FROM resultados WHERE acta_id = ? AND candidato = ?", (acta_id, candidato))
-    conn.commit(); conn.close(); recalculate_grand_total(acta_id)
-
-def add_result_row(acta_id, candidato, votos):
-    update_result_vote(acta_id, candidato, votos)
-
-def delete_jrv_data(jrv):
-    conn = get_db_connection()
-    # Get IDs first
-    rows = conn.execute("SELECT id FROM actas WHERE jrv = ?", (jrv,)).fetchall()
-    ids = [r['id'] for r in rows]
-    
-    if ids:
-        placeholders = ','.join('?' * len(ids))
-        conn.execute(f"DELETE FROM resultados WHERE acta_id IN ({placeholders})", ids)
-        conn.execute(f"DELETE FROM resumenes WHERE acta_id IN ({placeholders})", ids)
-        conn.execute("DELETE FROM actas WHERE jrv = ?", (jrv,))
-        
-    conn.commit(); conn.close()
-
-def validate_acta_trep(jrv, nivel='PRESIDENTE'):
-    conn = get_db_connection()
-    conn.execute("UPDATE actas SET estado = 'VALIDADO' WHERE jrv = ? AND origen = 'TREP' AND nivel = ?", (jrv, nivel)); conn.commit(); conn.close()
-
-def get_summary_table(level='PRESIDENTE'):
-    conn = get_db_connection()
-    
-    # Structure: { jrv: { party: { trep: 0, esc: 0, diff: 0 }, ... } }
-    summary = {}
-    
-    # Get all JRVs and their status (TREP)
-    # We prioritize TREP status.
-    query_jrvs = "SELECT jrv, estado FROM actas WHERE nivel = ? AND origen = 'TREP' ORDER BY jrv"
-    jrvs_rows = conn.execute(query_jrvs, (level,)).fetchall()
-    
-    # Map JRV -> Status
-    jrv_status = {r['jrv']: r['estado'] for r in jrvs_rows}
-    
-    # If we have Escrutinio-only JRVs (unlikely but possible if TREP is missing), they won't be in jrv_status
-    # So we also get distinct JRVs from all sources to be safe for the loop
-    query_all = "SELECT DISTINCT jrv FROM actas WHERE nivel = ? ORDER BY jrv"
-    all_jrvs_rows = conn.execute(query_all, (level,)).fetchall()
-    
-    if not all_jrvs_rows:
-        return {'columns': [], 'data': []}
-        
-    sorted_jrvs = [row['jrv'] for row in all_jrvs_rows]
-    # Sort numerically
-    sorted_jrvs.sort(key=lambda x: int(x) if str(x).isdigit() else x)
-    
-    # ... (Queries for results/resumenes remain same) ... 
-    
-    # (Skip down to final_list loop)
-
-    
-    # query results
-    query = """
-        SELECT a.jrv, a.origen, r.candidato, r.votos
-        FROM actas a
-        JOIN resultados r ON a.id = r.acta_id
-        WHERE a.nivel = ?
+    with transaction(conn) as conn:
+        exists = conn.execute("SELECT acta_id FROM resumenes WHERE acta_id = ?", (acta_id,)).fetchone()
+        if not exists: conn.execute("INSERT INTO resumenes (acta_id, votos_validos, votos_blancos, votos_nulos, gran_total) VALUES (?, 0, 0, 0, 0)", (acta_id,))
+        conn.execute(f"UPDATE resumenes SET {field} = ? WHERE acta_id = ?", (value, acta_id))
+        recalculate_grand_total(acta_id, conn=conn)
+        refresh_comparacion_for_acta(acta_id, conn=conn)
+
+def recalculate_grand_total(acta_id, conn=None):
+    recalculate_grand_totals(acta_ids=[acta_id], conn=conn)
+
+SQL_ACTA_VOTE_TOTALS = """
+    SELECT a.id AS acta_id, COALESCE(SUM(r.votos), 0) AS suma,
+           (a.nivel = 'DIPUTADOS' AND NOT :validos_from_votes) AS keep_validos
+    FROM actas a LEFT JOIN resultados r ON r.acta_id = a.id
+    WHERE {where}
+    GROUP BY a.id
+"""
+
+def recalculate_grand_totals(acta_ids=None, nivel=None, validos_from_votes=False, insert_missing=False, conn=None):
     """
-    rows = conn.execute(query, (level,)).fetchall()
-    
-    # query resumenes
-    query_res = """
-        SELECT a.jrv, a.origen, res.votos_blancos, res.votos_nulos
-        FROM actas a
-        JOIN resumenes res ON a.id = res.acta_id
-        WHERE a.nivel = ?
+    Set-based recalculate_grand_total for the actas in `acta_ids` or of `nivel` (all if neither):
+    one aggregate UPDATE ... FROM and, with insert_missing, an INSERT ... SELECT of the missing
+    resumenes (blancos/nulos 0), in a single transaction.
+    votos_validos = SUM(votos), except for DIPUTADOS where it is the ballot count entered by hand
+    and only gran_total changes; validos_from_votes=True sums DIPUTADOS too (post-import fix-up,
+    their JSONs have no summary). Returns the number of resumenes updated or inserted.
     """
-    rows_res = conn.execute(query_res, (level,)).fetchall()
-    
-    data_map = {} # jrv -> { party -> { trep: 0, esc: 0 } }
-
-    for row in rows:
-        jrv = row['jrv']
-        origen = 'trep' if row['origen'] == 'TREP' else 'esc'
-        canda = row['candidato'].upper()
-        
-        key = ""
-        
-        if level == 'DIPUTADOS':
-             # Formats: "PARTIDO - DIP X", "PARTIDO (CANDIDATO)", "PARTIDO"
-             if " - DIP" in canda:
-                 key = canda.split(" - DIP")[0].strip()
-             elif "(" in canda:
-                 key = canda.split("(")[0].strip()
-             else:
-                 key = canda.strip()
-             key = map_party_name(key)
-             
-        elif level == 'ALCALDE':
-             # Formats: "PARTIDO", "PARTIDO (CANDIDATO)"
-             if "(" in canda:
-                 key = canda.split("(")[0].strip()
-             else:
-                 key = canda.strip()
-             key = map_party_name(key)
-             
-        else: # PRESIDENTE
-             # Use the map logic directly on candidate name
-             # Use the map logic directly on candidate name
-             key = map_party_name(canda)
-             # Only treat as OTROS if it didn't map to a KNOWN key.
-             # Known keys from map_party_name: P. NACIONAL, P. LIBERAL, LIBRE, DC, PINU, ALIANZA, PSH, OTROS
-             KNOWN_KEYS = ["P. NACIONAL", "P. LIBERAL", "LIBRE", "DC", "PINU", "ALIANZA", "PSH", "OTROS"]
-             
-             # If key is None (junk), it will be caught by the check below
-             if key and key not in KNOWN_KEYS and "VOTOS" not in key:
-                 key = "OTROS"
-
-        # SKIP IF KEY IS NONE (JUNK DATA)
-        if not key: continue
-
-        if jrv not in data_map: data_map[jrv] = {}
-        if key not in data_map[jrv]: data_map[jrv][key] = {'trep': 0, 'esc': 0}
-        
-        if level == 'DIPUTADOS':
-            # For Deputies, we sum votes of all candidates for the party
-            data_map[jrv][key][origen] += row['votos']
-        else:
-            # For Presidente/Alcalde, there should be 1 result per party.
-            # If duplicates exist (e.g. same party with different candidate names like 'PINU' vs 'PINU (NAME)'),
-            # we take the MAX to avoid double counting (e.g. 6 + 6 = 12).
-            # We assume duplicates have the same vote count or one is 0.
-            current = data_map[jrv][key][origen]
-            data_map[jrv][key][origen] = max(current, row['votos'])
-
-    # Process Resumenes
-    for row in rows_res:
-        jrv = row['jrv']
-        origen = 'trep' if row['origen'] == 'TREP' else 'esc'
-        
-        if jrv not in data_map: data_map[jrv] = {}
-        
-        if 'VOTOS BLANCOS' not in data_map[jrv]: data_map[jrv]['VOTOS BLANCOS'] = {'trep': 0, 'esc': 0}
-        data_map[jrv]['VOTOS BLANCOS'][origen] = row['votos_blancos']
-        
-        if 'VOTOS NULOS' not in data_map[jrv]: data_map[jrv]['VOTOS NULOS'] = {'trep': 0, 'esc': 0}
-        data_map[jrv]['VOTOS NULOS'][origen] = row['votos_nulos']
-
-    # Columns
-    all_parties = set()
-    for jrv_data in data_map.values():
-        all_parties.update(jrv_data.keys())
-        
-    priority = ["P. NACIONAL", "P. LIBERAL", "LIBRE", "DC", "PINU", "PSH", "ALIANZA", "OTROS", "VOTOS BLANCOS", "VOTOS NULOS"]
-    sorted_parties = sorted(list(all_parties), key=lambda x: priority.index(x) if x in priority else 99)
-
-    # Column Metadata (Name + Color)
-    columns_meta = []
+    where, params = ["1"], {'validos_from_votes': int(bool(validos_from_votes))}
+    if acta_ids is not None:
+        where.append("a.id IN (SELECT value FROM json_each(:acta_ids))")
+        params['acta_ids'] = json.dumps([int(i) for i in acta_ids])
+    if nivel is not None:
+        where.append("a.nivel = :nivel")
+        params['nivel'] = nivel
+    totals = SQL_ACTA_VOTE_TOTALS.format(where=' AND '.join(where))
+
+    with transaction(conn) as conn:
+        changed = conn.execute(f"""
+            UPDATE resumenes SET
+                votos_validos = CASE WHEN t.keep_validos THEN resumenes.votos_validos ELSE t.suma END,
+                gran_total = CASE WHEN t.keep_validos THEN resumenes.votos_validos ELSE t.suma END
+                             + resumenes.votos_blancos + resumenes.votos_nulos
+            FROM ({totals}) t
+            WHERE resumenes.acta_id = t.acta_id
+        """, params).rowcount
+        if insert_missing:
+            changed += conn.execute(f"""
+                INSERT INTO resumenes (acta_id, votos_validos, votos_blancos, votos_nulos, gran_total)
+                SELECT t.acta_id, CASE WHEN t.keep_validos THEN 0 ELSE t.suma END, 0, 0,
+                       CASE WHEN t.keep_validos THEN 0 ELSE t.suma END
+                FROM ({totals}) t
+                WHERE NOT EXISTS (SELECT 1 FROM resumenes x WHERE x.acta_id = t.acta_id)
+            """, params).rowcount
+    return changed
+
+def recalculate_diputados_totals(jrvs, conn=None):
+    """
+    Post-import fix-up of the DIPUTADOS actas of these JRVs (their JSONs have no summary):
+    votos_validos = SUM(votos), missing resumenes inserted, then their comparison refreshed.
+    Actas of other JRVs, e.g. resumenes entered by hand, are left alone. Returns the number
+    of resumenes updated or inserted.
+    """
+    jrvs = sorted({str(j) for j in jrvs})
+    with transaction(conn) as conn:
+        rows = conn.execute("SELECT id, jrv FROM actas WHERE nivel = 'DIPUTADOS' AND jrv IN (SELECT value FROM json_each(?))",
+                            (json.dumps(jrvs),)).fetchall()
+        if not rows: return 0
+        fixed = recalculate_grand_totals(acta_ids=[r['id'] for r in rows], validos_from_votes=True, insert_missing=True, conn=conn)
+        for jrv in {r['jrv'] for r in rows}:
+            refresh_comparacion(jrv, 'DIPUTADOS', conn=conn)
+    return fixed
+
+def delete_result_row(acta_id, candidato, conn=None):
+    with transaction(conn) as conn:
+        conn.execute("DELETE FROM resultados WHERE acta_id = ? AND candidato = ?", (acta_id, candidato))
+        recalculate_grand_total(acta_id, conn=conn)
+        refresh_comparacion_for_acta(acta_id, conn=conn)
+
+def add_result_row(acta_id, candidato, votos, conn=None):
+    update_result_vote(acta_id, candidato, votos, conn=conn)
+
+def delete_jrv_data(jrv, conn=None):
+    with transaction(conn) as conn:
+        # Get IDs first
+        rows = conn.execute("SELECT id FROM actas WHERE jrv = ?", (jrv,)).fetchall()
+        ids = [r['id'] for r in rows]
+        
+        if ids:
+            placeholders = ','.join('?' * len(ids))
+            conn.execute(f"DELETE FROM resultados WHERE acta_id IN ({placeholders})", ids)
+            conn.execute(f"DELETE FROM resumenes WHERE acta_id IN ({placeholders})", ids)
+            conn.execute("DELETE FROM actas WHERE jrv = ?", (jrv,))
+        conn.execute("DELETE FROM jrv_comparacion WHERE jrv = ?", (jrv,))
+        conn.execute("DELETE FROM jrv_comparacion_partidos WHERE jrv = ?", (jrv,))
+        # Forget its source files so the next incremental import restores the JRV
+        conn.execute("DELETE FROM source_files WHERE jrv = ?", (str(jrv),))
+
+def validate_acta_trep(jrv, nivel='PRESIDENTE', conn=None):
+    with transaction(conn) as conn:
+        conn.execute("UPDATE actas SET estado = 'VALIDADO' WHERE jrv = ? AND origen = 'TREP' AND nivel = ?", (jrv, nivel))
+        conn.execute("UPDATE jrv_comparacion SET estado = 'VALIDADO' WHERE jrv = ? AND nivel = ? AND trep_id IS NOT NULL", (jrv, nivel))
+
+SUMMARY_PRIORITY = ["P. NACIONAL", "P. LIBERAL", "LIBRE", "DC", "PINU", "PSH", "ALIANZA", "OTROS", "VOTOS BLANCOS", "VOTOS NULOS"]
+
+def summary_column_class(p):
+    """ Tailwind classes for a party column header """
+    color = 'bg-gray-700 text-white' # Default
+    if 'NACIONAL' in p: color = 'bg-blue-700 text-white'
+    elif 'LIBERAL' in p: color = 'bg-red-600 text-white'
+    elif 'LIBRE' in p: color = 'bg-red-800 text-white'
+    elif 'DC' in p: color = 'bg-green-600 text-white'
+    elif 'PINU' in p: color = 'bg-orange-500 text-white'
+    elif 'PSH' in p or 'SALVADOR' in p: color = 'bg-cyan-600 text-white'
+    elif 'ALIANZA' in p: color = 'bg-purple-700 text-white'
+    return color
+
+def summary_columns(level, conn=None):
+    """ Parties seen at this level, in SUMMARY_PRIORITY order: (names, column meta for the table header). """
+    conn = get_connection(conn)
+    parties = [r['partido'] for r in conn.execute("SELECT DISTINCT partido FROM jrv_comparacion_partidos WHERE nivel = ?", (level,))]
+    sorted_parties = sorted(parties, key=lambda x: SUMMARY_PRIORITY.index(x) if x in SUMMARY_PRIORITY else 99)
+    return sorted_parties, [{'name': p, 'class': summary_column_class(p)} for p in sorted_parties]
+
+def summary_row(jrv, trep_id, estado, by_party, sorted_parties, registered, pres_total):
+    """ One row of the summary table. by_party: {partido: row with trep/esc/diff}. """
+    row_results = []
     for p in sorted_parties:
-        color = 'bg-gray-700 text-white' # Default
-        if 'NACIONAL' in p: color = 'bg-blue-700 text-white'
-        elif 'LIBERAL' in p: color = 'bg-red-600 text-white'
-        elif 'LIBRE' in p: color = 'bg-red-800 text-white'
-        elif 'DC' in p: color = 'bg-green-600 text-white'
-        elif 'PINU' in p: color = 'bg-orange-500 text-white'
-        elif 'PSH' in p or 'SALVADOR' in p: color = 'bg-cyan-600 text-white'
-        elif 'ALIANZA' in p: color = 'bg-purple-700 text-white'
-        
-        columns_meta.append({'name': p, 'class': color})
-
-    # --- NEW: Bulk Load Registered Voters (Efficiency) ---
-    import csv
-    import os
-    base_dir = os.path.dirname(__file__)
-    jrv_registered = {}
-    try:
-        path = os.path.join(base_dir, 'data', 'JRV_totales.csv')
-        if os.path.exists(path):
-            with open(path, mode='r', encoding='utf-8', errors='replace') as f:
-                reader = csv.DictReader(f)
-                for r in reader:
-                    # CSV Headers: NUMERO_JRV, ... Votantes
-                    jrv_num = r.get('NUMERO_JRV', '').strip()
-                    votantes = r.get('Votantes', '0')
-                    if jrv_num and votantes.isdigit():
-                        jrv_registered[jrv_num] = int(votantes)
-    except Exception as e:
-        print(f"Error reading JRV_totales bulk: {e}")
-
-    # --- NEW: Pre-fetch Presidential Totals (for Participation) ---
-    # We need Presidential Total for ALL JRVs to calculate participation correct regardless of current level view
-    pres_totals = {}
-    try:
-        # Get Validated/Pending TREP Presidential Totals
-        # Note: We prioritize Validated, but take Pending if that's what we have.
-        # Actually, let's just take whatever TREP acta exists for PRESIDENTE.
-        q_pres = """
-            SELECT a.jrv, res.gran_total, res.votos_validos, res.votos_blancos, res.votos_nulos 
-            FROM actas a 
-            JOIN resumenes res ON a.id = res.acta_id 
-            WHERE a.nivel = 'PRESIDENTE' AND a.origen = 'TREP'
-        """
-        rows_pres = conn.execute(q_pres).fetchall()
-        for rp in rows_pres:
-            # Recalculate total to be safe or use gran_total
-            # Use gran_total which logic ensures is Validos + Blancos + Nulos
-            pres_totals[rp['jrv']] = rp['gran_total']
-    except Exception as e:
-         print(f"Error pre-fetching presidential totals: {e}")
-
-    final_list = []
-    # Ensure all JRVs exist even if no results (though jrvs list came from actas so they exist)
-    # Use jrvs list from first query to ensure order
-    # Sort JRVs numerically
-    sorted_jrvs = sorted(list(data_map.keys()), key=lambda x: int(x) if str(x).isdigit() else x)
-    
-    for jrv in sorted_jrvs:
-        # Check if FRENAEL has any data (Total > 0)
-        # If FRENAEL total is 0, it means the acta is missing/deleted or empty.
-        
-        # ... (Existing logic for has_trep_data check) ...
+        d = by_party.get(p)
+        if d: row_results.append({'party': p, 'trep': d['trep'], 'esc': d['esc'], 'diff': d['diff']})
+        else: row_results.append({'party': p, 'trep': 0, 'esc': 0, 'diff': 0})
+
+    # Calculate Participation
+    partic_pct = 0
+    if registered > 0:
+        partic_pct = round(((pres_total or 0) / registered) * 100, 2)
+
+    return {
+        'jrv': jrv,
+        'status': estado if trep_id is not None else 'PENDIENTE',
+        'participation': partic_pct,
+        'results': row_results
+    }
 
-        
-        has_trep_data = False
-        row_results = []
-        
-        for p in sorted_parties:
-            d = data_map[jrv].get(p, {'trep': 0, 'esc': 0})
-            if d['trep'] > 0: has_trep_data = True
-            
-            diff = d['esc'] - d['trep']
-            row_results.append({
-                'party': p,
-                'trep': d['trep'],
-                'esc': d['esc'],
-                'diff': diff
-            })
-            
-        if not has_trep_data:
-            continue
+def get_summary_table(level='PRESIDENTE', conn=None):
+    """
+    Per-JRV party table (FRENAEL vs CNE) for one level, read from the derived
+    jrv_comparacion / jrv_comparacion_partidos tables.
+    JRVs without any FRENAEL data are skipped.
+    """
+    conn = get_connection(conn)
 
-        # Calculate Participation
-        regs = jrv_registered.get(str(jrv), 0)
-        p_total = pres_totals.get(str(jrv), 0) # Fallback to 0 if no presidential acta
-        
-        partic_pct = 0
-        if regs > 0:
-            partic_pct = round((p_total / regs) * 100, 2)
-            
-        final_list.append({
-            'jrv': jrv, 
-            'status': jrv_status.get(jrv, 'PENDIENTE'), 
-            'participation': partic_pct,
-            'results': row_results
-        })
-            
+    # Columns: every party seen at this level
+    sorted_parties, columns_meta = summary_columns(level, conn=conn)
+    return {'columns': columns_meta, 'data': list(iter_summary_rows(level, sorted_parties, conn=conn))}
 
-        
-    return {'columns': columns_meta, 'data': final_list}
+def iter_summary_rows(level, sorted_parties, conn=None):
+    """
+    Rows of get_summary_table one at a time, read from a single cursor in JRV order,
+    so callers can stream them without holding the whole table in memory.
+    """
+    conn = get_connection(conn)
+
+    # --- Registered Voters (shared JRV_totales index) ---
+    jrv_registered = get_registered_voters()
+
+    # Participation is always based on the presidential TREP total, joined per JRV
+    rows = conn.execute("""
+        SELECT c.jrv, c.trep_id, c.estado, pres.trep_gran_total AS pres_total, p.partido, p.trep, p.esc, p.diff
+        FROM jrv_comparacion c
+        CROSS JOIN jrv_comparacion_partidos p ON p.jrv = c.jrv AND p.nivel = c.nivel -- CROSS: keep c outer, read in index order
+        LEFT JOIN jrv_comparacion pres ON pres.jrv = c.jrv AND pres.nivel = 'PRESIDENTE' AND pres.trep_id IS NOT NULL
+        WHERE c.nivel = ? AND c.has_trep_data = 1
+        ORDER BY c.jrv_num, c.jrv
+    """, (level,))
+
+    for jrv, group in itertools.groupby(rows, key=lambda r: r['jrv']):
+        group = list(group)
+        first = group[0]
+        yield summary_row(jrv, first['trep_id'], first['estado'], {r['partido']: r for r in group},
+                          sorted_parties, jrv_registered.get(str(jrv), 0), first['pres_total'])
+
+def summary_flat_header(sorted_parties):
+    """ Header of the flat (CSV / Excel) summary table: three columns per party. """
+    header = ['JRV', 'ESTADO', 'PARTICIPACION']
+    for p in sorted_parties:
+        header += [f'{p} FRENAEL', f'{p} CNE', f'{p} DIF']
+    return header
+
+def summary_flat_row(row):
+    line = [row['jrv'], row['status'], row['participation']]
+    for r in row['results']:
+        line += [r['trep'], r['esc'], r['diff']]
+    return line
+
+SUMMARY_PAGE_SORTS = {
+    'jrv': "c.jrv_num {order}, c.jrv {order}",
+    'diff': "c.diff {order}, c.jrv_num, c.jrv",
+    'participation': "participation {order}, c.jrv_num, c.jrv",
+    'party_diff': "abs(p.diff) {order}, c.jrv_num, c.jrv",
+}
+SUMMARY_PAGE_MAX = 1000
 
-def get_or_create_official_acta(jrv, level):
-    conn = get_db_connection()
+def get_summary_page(level='PRESIDENTE', page=1, per_page=100, sort='jrv', order='asc',
+                     estado=None, party=None, min_diff=None, depto=None, conn=None):
+    """
+    One page of get_summary_table, with filtering, sorting and paging done in SQL over
+    the indexed jrv_comparacion / jrv_comparacion_partidos tables. Filters:
+      estado   - TREP estado (PENDIENTE, VALIDADO, ...)
+      party    - only JRVs with this party; with min_diff, |diff| of that party >= min_diff
+      min_diff - without party, the JRV diff (jrv_comparacion.diff) >= min_diff
+      depto    - department, from JRV_totales.csv (see sync_jrv_ubicacion)
+    sort: jrv, diff, participation or party_diff (needs party); order: asc / desc.
+    Returns {'columns', 'data', 'page', 'per_page', 'total', 'pages'}.
+    """
+    conn = get_connection(conn)
+    if sort not in SUMMARY_PAGE_SORTS or (sort == 'party_diff' and not party):
+        raise ValueError(f"Invalid sort: {sort}")
+    order = 'DESC' if str(order).lower() == 'desc' else 'ASC'
+    per_page = max(1, min(int(per_page), SUMMARY_PAGE_MAX))
+    page = max(1, int(page))
+
+    source = "jrv_comparacion c"
+    where, params = ["c.nivel = ?", "c.has_trep_data = 1"], [level]
+    if estado:
+        # has_trep_data implies a TREP acta, so the row status is c.estado
+        where.append("c.estado = ?")
+        params.append(estado)
+    if party:
+        source += " JOIN jrv_comparacion_partidos p ON p.jrv = c.jrv AND p.nivel = c.nivel AND p.partido = ?"
+        params.insert(0, party)
+        if min_diff is not None:
+            where.append("abs(p.diff) >= ?")
+            params.append(int(min_diff))
+    elif min_diff is not None:
+        where.append("c.diff >= ?")
+        params.append(int(min_diff))
+    if depto or sort == 'participation':
+        sync_jrv_ubicacion(conn=conn)
+        source += " LEFT JOIN jrv_ubicacion u ON u.jrv = c.jrv"
+        if depto:
+            where.append("u.depto = ?")
+            params.append(depto.strip().upper())
+    if sort == 'participation':
+        source += " LEFT JOIN jrv_comparacion pres ON pres.jrv = c.jrv AND pres.nivel = 'PRESIDENTE' AND pres.trep_id IS NOT NULL"
+    participation = ("CASE WHEN u.votantes > 0 THEN CAST(COALESCE(pres.trep_gran_total, 0) AS REAL) / u.votantes ELSE 0 END"
+                     if sort == 'participation' else "0")
+    filters = " AND ".join(where)
+
+    total = conn.execute(f"SELECT COUNT(*) FROM {source} WHERE {filters}", params).fetchone()[0]
+    page_rows = conn.execute(f"""
+        SELECT c.jrv, c.trep_id, c.estado, {participation} AS participation FROM {source}
+        WHERE {filters} ORDER BY {SUMMARY_PAGE_SORTS[sort].format(order=order)}
+        LIMIT ? OFFSET ?""", params + [per_page, (page - 1) * per_page]).fetchall()
+
+    sorted_parties, columns_meta = summary_columns(level, conn=conn)
+    jrvs = [r['jrv'] for r in page_rows]
+    by_jrv, pres_totals = {}, {}
+    if jrvs:
+        in_jrvs = ','.join('?' * len(jrvs))
+        for r in conn.execute(f"SELECT jrv, partido, trep, esc, diff FROM jrv_comparacion_partidos WHERE nivel = ? AND jrv IN ({in_jrvs})", [level] + jrvs):
+            by_jrv.setdefault(r['jrv'], {})[r['partido']] = r
+        pres_totals = {r['jrv']: r['trep_gran_total'] for r in conn.execute(
+            f"SELECT jrv, trep_gran_total FROM jrv_comparacion WHERE nivel = 'PRESIDENTE' AND trep_id IS NOT NULL AND jrv IN ({in_jrvs})", jrvs)}
+
+    jrv_registered = get_registered_voters()
+    data = [summary_row(r['jrv'], r['trep_id'], r['estado'], by_jrv.get(r['jrv'], {}), sorted_parties,
+                        jrv_registered.get(str(r['jrv']), 0), pres_totals.get(r['jrv'])) for r in page_rows]
+    return {'columns': columns_meta, 'data': data, 'page': page, 'per_page': per_page,
+            'total': total, 'pages': (total + per_page - 1) // per_page}
+
+def get_or_create_official_acta(jrv, level, conn=None):
+    conn = get_connection(conn)
     # Official origin is typically 'CNE' in this DB context for non-TREP
     # But let's check what 'init_db' or other inserts use.
     # 'register_manual_upload' uses 'ESCRUTINIO' for non-TREP.
@@ -1547,24 +2070,22 @@ def get_or_create_official_acta(jrv, level):
     
     row = conn.execute("SELECT id FROM actas WHERE jrv = ? AND nivel = ? AND origen != 'TREP'", (jrv, level)).fetchone()
     if row:
-        conn.close()
         return row['id']
     else:
         # Create it
         print(f"Creating missing OFFICIAL acta for JRV {jrv} {level}")
-        cursor = conn.execute("INSERT INTO actas (jrv, nivel, origen, filepath, estado) VALUES (?, ?, ?, '', 'PENDIENTE')", 
-                             (jrv, level, origin_to_use))
-        new_id = cursor.lastrowid
-        
-        # Init Resumen if needed?
-        conn.execute("INSERT INTO resumenes (acta_id, votos_validos, votos_blancos, votos_nulos, gran_total) VALUES (?, 0, 0, 0, 0)", (new_id,))
-        
-        conn.commit()
-        conn.close()
+        with transaction(conn):
+            cursor = conn.execute("INSERT INTO actas (jrv, nivel, origen, filepath, estado, jrv_num) VALUES (?, ?, ?, '', 'PENDIENTE', CAST(?1 AS INTEGER))", 
+                                 (jrv, level, origin_to_use))
+            new_id = cursor.lastrowid
+            
+            # Init Resumen if needed?
+            conn.execute("INSERT INTO resumenes (acta_id, votos_validos, votos_blancos, votos_nulos, gran_total) VALUES (?, 0, 0, 0, 0)", (new_id,))
+            refresh_comparacion(jrv, level, conn=conn)
         return new_id
 
-def get_dashboard_stats_by_level():
-    conn = get_db_connection()
+def get_dashboard_stats_by_level(conn=None):
+    conn = get_connection(conn)
     levels = ['PRESIDENTE', 'DIPUTADOS', 'ALCALDE']
     stats = {}
     
@@ -1595,42 +2116,40 @@ def get_dashboard_stats_by_level():
             'pending': pending
         }
         
-    conn.close()
     return stats
 
-def register_manual_upload(jrv, nivel, source, filepath):
-    conn = get_db_connection()
+def register_manual_upload(jrv, nivel, source, filepath, conn=None):
     # Map Source to Origen
     origen = 'TREP' if source == 'TREP' else 'ESCRUTINIO'
     
-    # Check if exists
-    row = conn.execute("SELECT id FROM actas WHERE jrv = ? AND nivel = ? AND origen = ?", (jrv, nivel, origen)).fetchone()
-    
-    if row:
-        conn.execute("UPDATE actas SET filepath = ?, estado = 'MANUAL' WHERE id = ?", (filepath, row['id']))
-    else:
-        conn.execute("INSERT INTO actas (jrv, nivel, origen, filepath, estado) VALUES (?, ?, ?, ?, 'MANUAL')", (jrv, nivel, origen, filepath))
-    
-    conn.commit()
-    conn.close()
+    with transaction(conn) as conn:
+        # Check if exists
+        row = conn.execute("SELECT id FROM actas WHERE jrv = ? AND nivel = ? AND origen = ?", (jrv, nivel, origen)).fetchone()
+        
+        if row:
+            conn.execute("UPDATE actas SET filepath = ?, estado = 'MANUAL' WHERE id = ?", (filepath, row['id']))
+        else:
+            conn.execute("INSERT INTO actas (jrv, nivel, origen, filepath, estado, jrv_num) VALUES (?, ?, ?, ?, 'MANUAL', CAST(?1 AS INTEGER))", (jrv, nivel, origen, filepath))
+        refresh_comparacion(jrv, nivel, conn=conn)
 
-def delete_acta_record(jrv, nivel, source):
-    conn = get_db_connection()
+def delete_acta_record(jrv, nivel, source, conn=None):
     origen = 'TREP' if source == 'TREP' else 'ESCRUTINIO'
     
-    # Get filepath via ID to be safe
-    row = conn.execute("SELECT id, filepath FROM actas WHERE jrv = ? AND nivel = ? AND origen = ?", (jrv, nivel, origen)).fetchone()
-    filepath = None
-    
-    if row:
-        acta_id = row['id']
-        filepath = row['filepath']
+    with transaction(conn) as conn:
+        # Get filepath via ID to be safe
+        row = conn.execute("SELECT id, filepath FROM actas WHERE jrv = ? AND nivel = ? AND origen = ?", (jrv, nivel, origen)).fetchone()
+        filepath = None
         
-        # Delete dependencies
-        conn.execute("DELETE FROM resultados WHERE acta_id = ?", (acta_id,))
-        conn.execute("DELETE FROM resumenes WHERE acta_id = ?", (acta_id,))
-        conn.execute("DELETE FROM actas WHERE id = ?", (acta_id,))
-        conn.commit()
+        if row:
+            acta_id = row['id']
+            filepath = row['filepath']
+            
+            # Delete dependencies
+            conn.execute("DELETE FROM resultados WHERE acta_id = ?", (acta_id,))
+            conn.execute("DELETE FROM resumenes WHERE acta_id = ?", (acta_id,))
+            conn.execute("DELETE FROM actas WHERE id = ?", (acta_id,))
+            refresh_comparacion(jrv, nivel, conn=conn)
+            # The JRV is re-imported by the next incremental import
+            conn.execute("DELETE FROM source_files WHERE jrv = ?", (str(jrv),))
     
-    conn.close()
     return filepath
\ No newline at end of file
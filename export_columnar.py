@@ -0,0 +1,253 @@
+"""
+Exportación columnar de actas, resultados y resumenes para análisis estadístico (pandas).
+
+Formatos:
+    parquet  un .parquet por tabla (requiere pyarrow)
+    npz      un .npz por tabla, el formato de numpy.savez_compressed; se escribe con la
+             librería estándar, así que no requiere numpy (numpy.load lo lee)
+
+Las columnas de texto (nivel, origen, partido, candidato...) van con codificación de
+diccionario: en Parquet como tipo dictionary (pandas las carga como category); en .npz como
+códigos int32 en `<col>.npy` y los valores en `<col>_categories.npy`:
+
+    z = numpy.load('resultados.npz')
+    partido = pandas.Categorical.from_codes(z['partido'], z['partido_categories'])
+
+En .npz los NULL de columnas enteras se guardan como -1 y los de texto como código -1.
+
+`partido` es la clave de partido del resumen (db.summary_party_key: P. NACIONAL, LIBRE, ...),
+una por partido también en DIPUTADOS; la casilla original queda en `candidato`. Las filas que
+no son de un partido (encabezados basura del CSV) van con partido NULL.
+
+Uso:
+    python export_columnar.py [DESTINO] [--format auto|parquet|npz] [--db auditoria.db]
+"""
+import argparse
+import ast
+import functools
+import os
+import shutil
+import struct
+import sys
+import tempfile
+import time
+import zipfile
+from array import array
+
+import db
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+BATCH_SIZE = 50000
+NULL_INT = -1
+FORMATS = ('auto', 'parquet', 'npz')
+
+# tabla -> (consulta, [(columna, 'int' | 'dict')]); las filas salen de un solo cursor, por lotes
+EXPORT_TABLES = {
+    'actas': ("""
+        SELECT id, jrv, jrv_num, nivel, origen, estado, filepath, year_detected, fecha_proceso
+        FROM actas ORDER BY id""",
+        [('id', 'int'), ('jrv', 'dict'), ('jrv_num', 'int'), ('nivel', 'dict'), ('origen', 'dict'),
+         ('estado', 'dict'), ('filepath', 'dict'), ('year_detected', 'dict'), ('fecha_proceso', 'dict')]),
+    'resultados': ("""
+        SELECT r.acta_id, a.jrv_num, a.nivel, a.origen, summary_party_key(r.candidato, a.nivel) AS partido,
+               r.candidato, r.votos
+        FROM resultados r JOIN actas a ON a.id = r.acta_id ORDER BY r.id""",
+        [('acta_id', 'int'), ('jrv_num', 'int'), ('nivel', 'dict'), ('origen', 'dict'),
+         ('partido', 'dict'), ('candidato', 'dict'), ('votos', 'int')]),
+    'resumenes': ("""
+        SELECT res.acta_id, a.jrv_num, a.nivel, a.origen, res.votos_validos, res.votos_blancos,
+               res.votos_nulos, res.gran_total
+        FROM resumenes res JOIN actas a ON a.id = res.acta_id ORDER BY res.acta_id""",
+        [('acta_id', 'int'), ('jrv_num', 'int'), ('nivel', 'dict'), ('origen', 'dict'),
+         ('votos_validos', 'int'), ('votos_blancos', 'int'), ('votos_nulos', 'int'), ('gran_total', 'int')]),
+}
+
+@functools.lru_cache(maxsize=None)
+def _party_key(candidato, nivel):
+    """ Clave de partido de db.summary_party_key (la del resumen y jrv_comparacion_partidos). """
+    return db.summary_party_key(candidato, nivel) if candidato is not None else None
+
+class DictEncoder:
+    """ Valor -> código int32, en orden de aparición. None no entra al diccionario. """
+    def __init__(self):
+        self.codes = {}
+        self.values = []
+
+    def encode(self, value):
+        if value is None: return None
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.values)
+            self.values.append(str(value))
+        return code
+
+# --- .npz (sin numpy) ---
+
+def _npy_header(descr, length):
+    """ Cabecera .npy v1.0 de un vector 1-D. """
+    header = "{'descr': '%s', 'fortran_order': False, 'shape': (%d,), }" % (descr, length)
+    header += ' ' * (63 - (10 + len(header)) % 64) + '\n'
+    return b'\x93NUMPY\x01\x00' + struct.pack('<H', len(header)) + header.encode('latin1')
+
+class NpzWriter:
+    """
+    Escribe las columnas de cada lote en archivos temporales (bytes crudos de array.array)
+    y al cerrar las empaqueta como .npy dentro de un zip comprimido.
+    """
+    def __init__(self, path, columns):
+        self.path = path
+        self.columns = columns
+        self.length = 0
+        self.files = {name: tempfile.TemporaryFile() for name, _ in columns}
+        self.encoders = {name: DictEncoder() for name, kind in columns if kind == 'dict'}
+
+    def write_batch(self, rows):
+        for i, (name, kind) in enumerate(self.columns):
+            if kind == 'dict':
+                encode = self.encoders[name].encode
+                codes = [encode(r[i]) for r in rows]
+                array('i', [NULL_INT if c is None else c for c in codes]).tofile(self.files[name])
+            else:
+                array('q', [NULL_INT if r[i] is None else r[i] for r in rows]).tofile(self.files[name])
+        self.length += len(rows)
+
+    def close(self):
+        order = '<' if sys.byteorder == 'little' else '>'
+        with zipfile.ZipFile(self.path, 'w', zipfile.ZIP_DEFLATED, allowZip64=True) as zf:
+            for name, kind in self.columns:
+                f = self.files[name]
+                f.seek(0)
+                with zf.open(f'{name}.npy', 'w', force_zip64=True) as out:
+                    out.write(_npy_header(order + ('i4' if kind == 'dict' else 'i8'), self.length))
+                    shutil.copyfileobj(f, out)
+                f.close()
+                if kind == 'dict':
+                    values = self.encoders[name].values
+                    width = max([len(v) for v in values] + [1])
+                    with zf.open(f'{name}_categories.npy', 'w', force_zip64=True) as out:
+                        out.write(_npy_header(f'<U{width}', len(values)))
+                        for v in values:
+                            out.write(v.encode('utf-32-le').ljust(4 * width, b'\0'))
+
+def read_npz(path):
+    """
+    Carga un .npz exportado: {columna: array} con numpy; sin numpy, {columna: array.array}
+    para los enteros y listas de str para las categorías.
+    """
+    if np is not None:
+        with np.load(path) as z:
+            return {name: z[name] for name in z.files}
+
+    data = {}
+    with zipfile.ZipFile(path) as zf:
+        for entry in zf.namelist():
+            raw = zf.read(entry)
+            header_len = struct.unpack('<H', raw[8:10])[0]
+            header = ast.literal_eval(raw[10:10 + header_len].decode('latin1'))
+            body = raw[10 + header_len:]
+            descr = header['descr']
+            if descr[1] == 'U':
+                width = 4 * int(descr[2:])
+                data[entry[:-4]] = [body[i:i + width].decode('utf-32-le').rstrip('\0') for i in range(0, len(body), width)]
+            else:
+                values = array('i' if descr[1:] == 'i4' else 'q')
+                values.frombytes(body)
+                if (descr[0] == '<') != (sys.byteorder == 'little'): values.byteswap()
+                data[entry[:-4]] = values
+    return data
+
+# --- Parquet (pyarrow) ---
+
+class ParquetWriter:
+    """ Un row group por lote; las columnas 'dict' como dictionary<int32, string>. """
+    def __init__(self, path, columns):
+        self.columns = columns
+        self.encoders = {name: DictEncoder() for name, kind in columns if kind == 'dict'}
+        self.schema = pa.schema([(name, pa.dictionary(pa.int32(), pa.string()) if kind == 'dict' else pa.int64())
+                                 for name, kind in columns])
+        self.writer = pq.ParquetWriter(path, self.schema)
+
+    def write_batch(self, rows):
+        arrays = []
+        for i, (name, kind) in enumerate(self.columns):
+            if kind == 'dict':
+                enc = self.encoders[name]
+                codes = pa.array([enc.encode(r[i]) for r in rows], pa.int32())
+                arrays.append(pa.DictionaryArray.from_arrays(codes, pa.array(enc.values, pa.string())))
+            else:
+                arrays.append(pa.array([r[i] for r in rows], pa.int64()))
+        self.writer.write_batch(pa.RecordBatch.from_arrays(arrays, schema=self.schema))
+
+    def close(self):
+        self.writer.close()
+
+def read_parquet(path):
+    return pq.read_table(path)
+
+# ---
+
+def resolve_format(fmt):
+    if fmt == 'auto': return 'parquet' if pa is not None else 'npz'
+    if fmt == 'parquet' and pa is None:
+        raise RuntimeError("pyarrow no está instalado: use --format npz")
+    return fmt
+
+def export_columnar(out_dir, fmt='auto', tables=None, batch_size=BATCH_SIZE, conn=None):
+    """
+    Exporta las tablas (todas por defecto) a out_dir, leyendo cada una por lotes de batch_size
+    filas desde un cursor. Devuelve {tabla: ruta}.
+    """
+    fmt = resolve_format(fmt)
+    conn = db.get_connection(conn)
+    conn.create_function('summary_party_key', 2, _party_key, deterministic=True)
+    os.makedirs(out_dir, exist_ok=True)
+
+    paths = {}
+    for table in tables or EXPORT_TABLES:
+        query, columns = EXPORT_TABLES[table]
+        path = os.path.join(out_dir, f'{table}.{fmt}')
+        writer = ParquetWriter(path, columns) if fmt == 'parquet' else NpzWriter(path, columns)
+        cursor = conn.execute(query)
+        try:
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows: break
+                writer.write_batch(rows)
+        finally:
+            writer.close()
+        paths[table] = path
+    return paths
+
+def read_columnar(path):
+    """ Carga un archivo exportado según su extensión. """
+    return read_parquet(path) if path.endswith('.parquet') else read_npz(path)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Exporta actas, resultados y resumenes en formato columnar")
+    parser.add_argument('destino', nargs='?', default='export', help="carpeta de salida (por defecto ./export)")
+    parser.add_argument('--format', choices=FORMATS, default='auto', help="parquet si pyarrow está instalado, si no npz")
+    parser.add_argument('--table', action='append', choices=sorted(EXPORT_TABLES), help="solo estas tablas (repetible)")
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help="filas por lote leído del cursor")
+    parser.add_argument('--db', help="ruta de la BD (por defecto la de db.py)")
+    args = parser.parse_args()
+    if args.db: db.DB_NAME = args.db
+    db.init_db()
+
+    try:
+        t0 = time.perf_counter()
+        paths = export_columnar(args.destino, args.format, args.table, args.batch_size)
+    except RuntimeError as e:
+        sys.exit(str(e))
+    for table, path in paths.items():
+        print(f"{table}: {path} ({os.path.getsize(path) / 1e6:.1f} MB)")
+    print(f"Exportado en {time.perf_counter() - t0:.1f}s")
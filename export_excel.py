@@ -0,0 +1,106 @@
+"""
+Libro Excel del comparativo por JRV (FRENAEL vs CNE): una hoja por nivel con las mismas
+columnas que get_summary_table (estado, % participación y FRENAEL / CNE / DIF por partido).
+
+Se escribe con el modo write-only (streaming) de openpyxl, fila a fila desde el cursor de
+db.iter_summary_rows, así que la memoria no crece con el número de JRVs. El archivo queda en
+cache/ y se reutiliza mientras no cambien la BD ni JRV_totales.csv.
+
+Uso:
+    python export_excel.py [SALIDA.xlsx] [--db auditoria.db]
+"""
+import argparse
+import hashlib
+import os
+import tempfile
+import threading
+import time
+
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font, PatternFill
+from openpyxl.utils import get_column_letter
+
+import db
+from file_cache import file_signature
+
+LEVELS = ['PRESIDENTE', 'ALCALDE', 'DIPUTADOS']
+CACHE_DIR = os.path.join(db.BASE_DIR, 'cache')
+WORKBOOK_PREFIX = 'resumen_niveles_'
+DOWNLOAD_NAME = 'resumen_niveles.xlsx'
+
+HEADER_FONT = Font(bold=True)
+HEADER_FILL = PatternFill('solid', fgColor='F3F4F6')
+_build_lock = threading.Lock()
+
+def data_signature():
+    """
+    Changes whenever the workbook could change: any write to the DB (main file or WAL)
+    or a new JRV_totales.csv (registered voters for the participation column).
+    """
+    return (db.DB_NAME, file_signature(db.DB_NAME), file_signature(db.DB_NAME + '-wal'),
+            file_signature(db.JRV_TOTALES_PATH))
+
+def write_workbook(path, levels=LEVELS, conn=None):
+    """ Writes the workbook to path, one write-only sheet per level. """
+    conn = db.get_connection(conn)
+    wb = Workbook(write_only=True)
+    for level in levels:
+        ws = wb.create_sheet(level)
+        sorted_parties, _ = db.summary_columns(level, conn=conn)
+        header = db.summary_flat_header(sorted_parties)
+        ws.freeze_panes = 'B2'
+        ws.column_dimensions['A'].width = 10
+        ws.column_dimensions['B'].width = 12
+        for i in range(3, len(header) + 1):
+            ws.column_dimensions[get_column_letter(i)].width = 14
+
+        cells = []
+        for name in header:
+            cell = WriteOnlyCell(ws, value=name)
+            cell.font, cell.fill = HEADER_FONT, HEADER_FILL
+            cells.append(cell)
+        ws.append(cells)
+        for row in db.iter_summary_rows(level, sorted_parties, conn=conn):
+            ws.append(db.summary_flat_row(row))
+    wb.save(path)
+
+def get_cached_workbook(conn=None):
+    """
+    Path of the workbook for the current data, built on first use and reused until
+    data_signature() changes (a WAL checkpoint also counts as a change, which only costs one
+    extra rebuild). Older versions are removed from cache/.
+    """
+    signature = data_signature()
+    name = WORKBOOK_PREFIX + hashlib.sha1(repr(signature).encode()).hexdigest()[:16] + '.xlsx'
+    path = os.path.join(CACHE_DIR, name)
+    if os.path.exists(path): return path
+
+    with _build_lock:
+        if os.path.exists(path): return path
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(suffix='.xlsx.tmp', dir=CACHE_DIR)
+        os.close(fd)
+        try:
+            write_workbook(tmp, conn=conn)
+            os.replace(tmp, path)
+        finally:
+            if os.path.exists(tmp): os.remove(tmp)
+
+        for old in os.listdir(CACHE_DIR):
+            if old.startswith(WORKBOOK_PREFIX) and old != name:
+                try: os.remove(os.path.join(CACHE_DIR, old))
+                except OSError: pass
+    return path
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Exporta el comparativo por JRV a Excel (una hoja por nivel)")
+    parser.add_argument('salida', nargs='?', default=DOWNLOAD_NAME, help=f"archivo .xlsx (por defecto {DOWNLOAD_NAME})")
+    parser.add_argument('--db', help="ruta de la BD (por defecto la de db.py)")
+    args = parser.parse_args()
+    if args.db: db.DB_NAME = args.db
+    db.init_db()
+
+    t0 = time.perf_counter()
+    write_workbook(args.salida)
+    print(f"{args.salida} ({os.path.getsize(args.salida) / 1e6:.1f} MB) en {time.perf_counter() - t0:.1f}s")
@@ -0,0 +1,52 @@
+import os
+import threading
+import time
+
+# In-process cache of parsed data files, invalidated by mtime/size.
+# Key: (path, loader) -> ((mtime_ns, size) or None if missing, parsed_value, monotonic time of the last check)
+_cache = {}
+_lock = threading.RLock()
+
+def file_signature(path):
+    """(mtime_ns, size) of a file, or None if it does not exist."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+def load_cached(path, loader, default=None, max_age=0):
+    """
+    Returns loader(path), parsing the file only the first time and again
+    whenever its mtime or size changes. Missing files return `default`.
+    With max_age > 0 the cached signature (a missing file included) is trusted
+    for that many seconds without calling os.stat again.
+    The returned value is shared between callers: do not mutate it.
+    """
+    key = (path, loader)
+    now = time.monotonic()
+    hit = _cache.get(key)
+    if hit and max_age and now - hit[2] < max_age:
+        return default if hit[0] is None else hit[1]
+
+    sig = file_signature(path)
+    if sig is None:
+        if max_age: _cache[key] = (None, None, now)
+        else: _cache.pop(key, None)
+        return default
+
+    if hit and hit[0] == sig:
+        _cache[key] = (sig, hit[1], now)
+        return hit[1]
+
+    with _lock:
+        hit = _cache.get(key)
+        if hit and hit[0] == sig:
+            return hit[1]
+        value = loader(path)
+        _cache[key] = (sig, value, now)
+        return value
+
+def clear_cache():
+    with _lock:
+        _cache.clear()
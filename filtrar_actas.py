@@ -1,6 +1,11 @@
 import os
-import shutil
+import re
 import sys
+import json
+import time
+import shutil
+import argparse
+from concurrent.futures import ThreadPoolExecutor
 
 # --- CONFIGURACIÓN DE RUTAS ---
 # Usamos r'' para indicar "raw strings" y evitar problemas con las barras invertidas de Windows
@@ -16,76 +21,201 @@ DIR_ORIGEN_MASIVO = r"C:\@actas_elecciones_2025\actas_cna_img"
 # 3. Carpeta DESTINO (Donde se pegarán las copias encontradas)
 DIR_DESTINO = os.path.join(BASE_DIR, 'data', 'ACTAS', 'OFICIAL')
 
-def procesar_copiado():
+# --- CONFIGURACIÓN DEL COPIADO ---
+# Niveles a copiar (texto buscado en el nombre del archivo) y rangos de JRV [(desde, hasta)]; None = todas
+NIVELES = ('PRESIDENTE',)
+RANGOS_JRV = None
+
+# Copias simultáneas (el trabajo es de E/S, no de CPU)
+HILOS_COPIA = 8
+
+# 'copia' (shutil.copy2), 'reflink' (clon copy-on-write, Linux) o 'hardlink' (mismo archivo físico).
+# reflink y hardlink sólo se intentan si origen y destino están en el mismo sistema de archivos;
+# si fallan se copia normalmente.
+MODO_ENLACE = 'reflink'
+
+# Archivos ya copiados (nombre -> [size, mtime_ns] del origen) para retomar un copiado interrumpido
+ARCHIVO_CHECKPOINT = '.filtrar_actas_checkpoint.json'
+CHECKPOINT_CADA = 200
+
+FICLONE = 0x40049409  # ioctl de Linux para clonar un archivo (btrfs, xfs)
+
+def jrv_de_archivo(nombre):
+    match = re.search(r'\d+', nombre)
+    return int(match.group(0)) if match else None
+
+def parse_rango(texto):
+    """ '100-250' -> (100, 250); '77' -> (77, 77). """
+    desde, _, hasta = texto.partition('-')
+    return int(desde), int(hasta or desde)
+
+def archivo_requerido(nombre, niveles, rangos):
+    upper = nombre.upper()
+    if niveles and not any(n in upper for n in niveles): return False
+    if rangos:
+        jrv = jrv_de_archivo(nombre)
+        if jrv is None or not any(desde <= jrv <= hasta for desde, hasta in rangos): return False
+    return True
+
+def _reflink(origen, destino):
+    import fcntl  # Sólo existe en Linux/Unix
+    with open(origen, 'rb') as src, open(destino, 'wb') as dst:
+        fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+    shutil.copystat(origen, destino)
+
+def copiar_archivo(origen, destino, modo, mismo_fs):
+    """ Copia un archivo según `modo`. Devuelve el método usado. """
+    if mismo_fs and modo == 'hardlink':
+        try:
+            if os.path.exists(destino): os.remove(destino)
+            os.link(origen, destino)
+            return 'hardlink'
+        except OSError:
+            pass
+    if mismo_fs and modo == 'reflink':
+        try:
+            _reflink(origen, destino)
+            return 'reflink'
+        except (OSError, ImportError):
+            if os.path.exists(destino): os.remove(destino)
+    # copy2 preserva metadatos (fechas de modificación, etc.)
+    shutil.copy2(origen, destino)
+    return 'copia'
+
+def cargar_checkpoint(ruta):
+    try:
+        with open(ruta, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def guardar_checkpoint(ruta, hechos):
+    tmp = ruta + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(hechos, f)
+    os.replace(tmp, ruta)
+
+def procesar_copiado(niveles=NIVELES, rangos=RANGOS_JRV, hilos=HILOS_COPIA, modo=MODO_ENLACE,
+                     origen=None, destino=None, reiniciar=False):
+    origen = origen or DIR_ORIGEN_MASIVO
+    destino = destino or DIR_DESTINO
+    niveles = tuple(n.upper() for n in niveles or ())
+
     # 1. Validaciones de seguridad
     if not os.path.exists(DIR_REFERENCIA_TREP):
         print(f"ERROR CRÍTICO: No existe la carpeta de referencia:\n{DIR_REFERENCIA_TREP}")
         return
 
-    if not os.path.exists(DIR_ORIGEN_MASIVO):
-        print(f"ERROR CRÍTICO: No existe la carpeta origen con las 19k imágenes:\n{DIR_ORIGEN_MASIVO}")
+    if not os.path.exists(origen):
+        print(f"ERROR CRÍTICO: No existe la carpeta origen con las 19k imágenes:\n{origen}")
         return
 
     # Crear carpeta destino si no existe
-    if not os.path.exists(DIR_DESTINO):
+    if not os.path.exists(destino):
         try:
-            os.makedirs(DIR_DESTINO)
-            print(f"Se creó la carpeta destino: {DIR_DESTINO}")
+            os.makedirs(destino)
+            print(f"Se creó la carpeta destino: {destino}")
         except Exception as e:
             print(f"Error al crear carpeta destino: {e}")
             return
 
     print("--- Iniciando proceso de búsqueda y copiado ---")
     
-    # 2. Obtener la lista de nombres de archivo de la carpeta TREP
-    # Filtramos para que sean solo archivos (ignorando carpetas internas si las hubiera)
+    # 2. Obtener la lista de nombres de archivo de la carpeta TREP (sólo archivos, con los filtros)
     try:
         lista_archivos_requeridos = [
-            f for f in os.listdir(DIR_REFERENCIA_TREP) 
-            if os.path.isfile(os.path.join(DIR_REFERENCIA_TREP, f)) and 'PRESIDENTE' in f.upper()
+            e.name for e in os.scandir(DIR_REFERENCIA_TREP)
+            if e.is_file() and archivo_requerido(e.name, niveles, rangos)
         ]
     except Exception as e:
         print(f"Error leyendo la carpeta de referencia: {e}")
         return
 
     total_requeridos = len(lista_archivos_requeridos)
-    print(f"Se buscarán {total_requeridos} actas basadas en la carpeta 'actas_trep_jpg'.")
+    print(f"Se buscarán {total_requeridos} actas basadas en la carpeta de referencia.")
+
+    # Un solo listado de la carpeta masiva (y del destino) en lugar de un os.path.exists por archivo
+    stats_origen = {e.name: e.stat() for e in os.scandir(origen) if e.is_file()}
+    stats_destino = {e.name: e.stat() for e in os.scandir(destino) if e.is_file()}
+    mismo_fs = os.stat(origen).st_dev == os.stat(destino).st_dev
 
-    copiados = 0
-    no_encontrados = 0
+    ruta_checkpoint = os.path.join(destino, ARCHIVO_CHECKPOINT)
+    hechos = {} if reiniciar else cargar_checkpoint(ruta_checkpoint)
 
-    # 3. Iterar y Copiar
+    pendientes, no_encontrados, omitidos = [], 0, 0
     for archivo in lista_archivos_requeridos:
-        
-        # Construimos la ruta completa donde DEBERÍA estar el archivo en la carpeta masiva
-        ruta_origen = os.path.join(DIR_ORIGEN_MASIVO, archivo)
-        ruta_destino = os.path.join(DIR_DESTINO, archivo)
+        st = stats_origen.get(archivo)
+        if st is None:
+            no_encontrados += 1
+            # Opcional: Descomenta la línea de abajo si quieres ver cuáles faltan en pantalla
+            # print(f"FALTANTE: {archivo} no está en la carpeta origen.")
+            continue
+        firma = [st.st_size, st.st_mtime_ns]
+        dst = stats_destino.get(archivo)
+        # Idéntico si el destino tiene el mismo tamaño y fecha, o el checkpoint lo registra con la misma firma
+        # del origen (sistemas de archivos que no conservan la fecha exacta)
+        if dst and (hechos.get(archivo) == firma or (dst.st_size == st.st_size and dst.st_mtime_ns == st.st_mtime_ns)):
+            hechos[archivo] = firma
+            omitidos += 1
+            continue
+        pendientes.append((archivo, firma))
+
+    print(f"{omitidos} ya estaban copiadas, {len(pendientes)} por copiar ({hilos} hilos, modo {modo}).")
 
-        if os.path.exists(ruta_origen):
+    # 3. Copiar en paralelo
+    copiados, errores, bytes_copiados = 0, 0, 0
+    metodos = {}
+    t0 = time.perf_counter()
+
+    def copiar(item):
+        archivo, firma = item
+        return item, copiar_archivo(os.path.join(origen, archivo), os.path.join(destino, archivo), modo, mismo_fs)
+
+    with ThreadPoolExecutor(max_workers=max(1, hilos)) as pool:
+        futuros = [pool.submit(copiar, item) for item in pendientes]
+        for futuro, (archivo, firma) in zip(futuros, pendientes):
             try:
-                # copy2 preserva metadatos (fechas de creación, etc.)
-                shutil.copy2(ruta_origen, ruta_destino)
-                copiados += 1
-                
-                # Barra de progreso simple cada 100 archivos
-                if copiados % 100 == 0:
-                    print(f"Procesando... {copiados} actas copiadas.")
-                    
+                _, metodo = futuro.result()
             except Exception as e:
+                errores += 1
                 print(f"Error al copiar {archivo}: {e}")
-        else:
-            no_encontrados += 1
-            # Opcional: Descomenta la línea de abajo si quieres ver cuáles faltan en pantalla
-            # print(f"FALTANTE: {archivo} no está en la carpeta origen.")
+                continue
+            copiados += 1
+            bytes_copiados += firma[0]
+            metodos[metodo] = metodos.get(metodo, 0) + 1
+            hechos[archivo] = firma
+            if copiados % CHECKPOINT_CADA == 0: guardar_checkpoint(ruta_checkpoint, hechos)
+
+            # Barra de progreso simple cada 100 archivos
+            if copiados % 100 == 0:
+                seg = time.perf_counter() - t0
+                print(f"Procesando... {copiados} actas copiadas ({copiados / seg:.0f} archivos/s, {bytes_copiados / seg / 1e6:.1f} MB/s).")
+
+    guardar_checkpoint(ruta_checkpoint, hechos)
+    seg = time.perf_counter() - t0
 
     # 4. Resumen final
     print("-" * 30)
     print("RESUMEN DEL PROCESO:")
     print(f"Total buscados (Ref): {total_requeridos}")
-    print(f"Éxito (Copiados):     {copiados}")
+    print(f"Éxito (Copiados):     {copiados} {metodos if metodos else ''}")
+    print(f"Ya idénticos:         {omitidos}")
+    print(f"Errores:              {errores}")
     print(f"Faltantes (No hallados): {no_encontrados}")
+    if copiados:
+        print(f"Velocidad: {copiados / seg:.0f} archivos/s, {bytes_copiados / seg / 1e6:.1f} MB/s en {seg:.1f}s")
     print("-" * 30)
-    print(f"Verifica los archivos en: {DIR_DESTINO}")
+    print(f"Verifica los archivos en: {destino}")
 
 if __name__ == '__main__':
-    procesar_copiado()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Copia las actas oficiales que corresponden a la carpeta de referencia")
+    parser.add_argument('--niveles', nargs='+', default=list(NIVELES), help="niveles a copiar (PRESIDENTE ALCALDE DIPUTADOS)")
+    parser.add_argument('--jrv', action='append', type=parse_rango, metavar='DESDE-HASTA',
+                        help="rango de JRV a copiar; se puede repetir")
+    parser.add_argument('--hilos', type=int, default=HILOS_COPIA, help="copias simultáneas")
+    parser.add_argument('--modo', choices=['copia', 'reflink', 'hardlink'], default=MODO_ENLACE)
+    parser.add_argument('--origen', help="carpeta masiva de imágenes")
+    parser.add_argument('--destino', help="carpeta destino")
+    parser.add_argument('--reiniciar', action='store_true', help="ignora el checkpoint de una ejecución anterior")
+    args = parser.parse_args()
+    procesar_copiado(args.niveles, args.jrv or RANGOS_JRV, args.hilos, args.modo, args.origen, args.destino, args.reiniciar)
@@ -1,6 +1,8 @@
 import sqlite3
 import json
 import os
+import time
+import argparse
 import db
 
 def normalize_party(p_name):
@@ -13,77 +15,154 @@ def normalize_party(p_name):
     if 'DEMOCRATA' in p_upper or ' DC' in p_upper or p_upper == 'DC': return 'DC'
     return p_upper
 
-def import_official_data():
+def official_result_rows(parties):
+    """ [(candidato, votos)] of one JRV of diputados_oficial.json: "PARTIDO - DIP N", N = rank of the candidate id. """
+    rows = []
+    for p_name, candidates in parties.items():
+        party_key = normalize_party(p_name)
+        # Sort by ID to get relative index 1..N (keys are strings "1", "9" etc.)
+        sorted_ids = sorted(candidates.keys(), key=lambda x: int(x))
+        for idx, cid in enumerate(sorted_ids, start=1):
+            rows.append((f"{party_key} - DIP {idx}", candidates[cid].get('votes', 0)))
+    return rows
+
+# JRVs per executemany batch and characters read per chunk when streaming the JSON
+BATCH_SIZE = 500
+CHUNK_SIZE = 1 << 16
+
+def iter_jrv_objects(path, chunk_size=CHUNK_SIZE):
+    """
+    Yields (jrv, parties) from diputados_oficial.json one top-level JRV at a time, without loading
+    the whole file: JSONDecoder.raw_decode over a buffer that only holds the JRV being parsed.
+    A .jsonl file (see split_to_jsonl) is read as JSON Lines, one {"jrv": {...}} object per line.
+    """
+    if path.endswith('.jsonl'):
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if line.strip(): yield from json.loads(line).items()
+        return
+
+    decoder = json.JSONDecoder()
+    with open(path, 'r', encoding='utf-8') as f:
+        buf = ''
+
+        def more():
+            nonlocal buf
+            chunk = f.read(chunk_size)
+            if not chunk: raise ValueError(f"{path}: unexpected end of JSON")
+            buf += chunk
+
+        def next_char(pos):
+            while True:
+                while pos < len(buf) and buf[pos] in ' \t\r\n': pos += 1
+                if pos < len(buf): return pos, buf[pos]
+                more()
+
+        def value(pos):
+            while True:
+                try:
+                    return decoder.raw_decode(buf, pos)
+                except json.JSONDecodeError:
+                    more()  # value cut by the chunk boundary (or invalid: fails at EOF)
+
+        pos, c = next_char(0)
+        if c != '{': raise ValueError(f"{path}: expected a JSON object")
+        pos, c = next_char(pos + 1)
+        while c != '}':
+            jrv, pos = value(pos)
+            pos, c = next_char(pos)
+            if c != ':': raise ValueError(f"{path}: expected ':' after JRV {jrv}")
+            pos, _ = next_char(pos + 1)
+            parties, pos = value(pos)
+            yield jrv, parties
+
+            buf, pos = buf[pos:], 0
+            pos, c = next_char(pos)
+            if c == ',': pos, c = next_char(pos + 1)
+
+def split_to_jsonl(path, dest):
+    """ Writes the JSON Lines variant of diputados_oficial.json (one JRV per line). """
+    with open(dest, 'w', encoding='utf-8') as out:
+        for jrv, parties in iter_jrv_objects(path):
+            out.write(json.dumps({jrv: parties}, ensure_ascii=False) + '\n')
+
+def import_official_data(json_path=None, batch_size=BATCH_SIZE, dry_run=None):
     base_dir = os.path.dirname(__file__)
-    json_path = os.path.join(base_dir, 'data', 'diputados_oficial.json')
+    json_path = json_path or os.path.join(base_dir, 'data', 'diputados_oficial.json')
     
     if not os.path.exists(json_path):
         print("Json not found!")
         return
 
     print("Loading Official Data...")
-    with open(json_path, 'r', encoding='utf-8') as f:
-        data = json.load(f)
-        
+    t0 = time.perf_counter()
+    db.init_db()  # derived comparison tables rebuilt at the end
     conn = db.get_db_connection()
-    c = conn.cursor()
-    
-    count = 0
-    for jrv, parties in data.items():
-        # Get Acta ID
-        # Note: 'ESCRUTINIO' is the key in DB for 'OFICIAL' origin
-        row = c.execute("SELECT id FROM actas WHERE jrv=? AND nivel='DIPUTADOS' AND origen='ESCRUTINIO'", (jrv,)).fetchone()
-        if not row:
-            # Maybe create it?
-            # User reset DB, so maybe acta is missing if processor didn't create it?
-            # processor should have created it from the 'bad' JSONs. 
-            # If not, let's skip or create.
-            # print(f"Skipping {jrv} (No Acta)")
-            continue
-            
-        acta_id = row['id']
-        
-        # CLEAR existing results for this acta to avoid duplicates with 'bad' data
-        c.execute("DELETE FROM resultados WHERE acta_id=?", (acta_id,))
-        
-        # Insert New
-        for p_name, candidates in parties.items():
-            party_key = normalize_party(p_name)
-            
-            # Sort by ID to get relative index 1..N
-            # Keys are strings "1", "9" etc.
-            sorted_ids = sorted(candidates.keys(), key=lambda x: int(x))
-            
-            for idx, cid in enumerate(sorted_ids, start=1):
-                cand_data = candidates[cid]
-                votes = cand_data.get('votes', 0)
-                
-                # Construct key: "PARTIDO - DIP N"
-                final_key = f"{party_key} - DIP {idx}"
-                
-                c.execute("INSERT INTO resultados (acta_id, candidato, votos) VALUES (?, ?, ?)", (acta_id, final_key, votes))
-        
-        
-        # Recalculate Totals (Inline to avoid DB Lock from new connection)
-        # Sum candidates
-        tm = c.execute("SELECT SUM(votos) FROM resultados WHERE acta_id=?", (acta_id,)).fetchone()[0] or 0
-        
-        # Get Resumen
-        res = c.execute("SELECT votos_blancos, votos_nulos FROM resumenes WHERE acta_id=?", (acta_id,)).fetchone()
-        if res:
-            blancos = res['votos_blancos']
-            nulos = res['votos_nulos']
-            gran = tm + blancos + nulos
-            c.execute("UPDATE resumenes SET gran_total=?, votos_validos=? WHERE acta_id=?", (gran, tm, acta_id))
-        
-        count += 1
-        if count % 100 == 0: 
-            conn.commit() # Commit periodically
-            print(f"Imported {count}...")
-
-    conn.commit()
+
+    # Every acta id in one query ('ESCRUTINIO' is the key in DB for 'OFICIAL' origin).
+    # JRVs without acta are skipped: processor creates them from the source JSONs.
+    acta_ids = {r['jrv']: r['id'] for r in conn.execute("SELECT jrv, id FROM actas WHERE nivel='DIPUTADOS' AND origen='ESCRUTINIO'")}
+    n_actas = n_rows = 0
+
+    if dry_run:
+        # Only report what would change (dry_run = report path): nothing is written to the DB
+        new_results = {(jrv, 'DIPUTADOS', 'ESCRUTINIO'): official_result_rows(parties)
+                       for jrv, parties in iter_jrv_objects(json_path) if jrv in acta_ids}
+        changes = db.diff_resultados(new_results, conn=conn)
+        conn.close()
+        db.write_diff_report(changes, dry_run)
+        print(f"Dry run: {len(changes)} changes in {len({c['jrv'] for c in changes})} JRVs -> {dry_run} "
+              f"({time.perf_counter() - t0:.1f}s).")
+        return changes
+
+    with db.transaction(conn):
+        # blancos/nulos of the existing resumenes, for the totals
+        resumenes = {r['acta_id']: r for r in conn.execute(
+            "SELECT r.acta_id, r.votos_blancos, r.votos_nulos FROM resumenes r JOIN actas a ON a.id = r.acta_id "
+            "WHERE a.nivel='DIPUTADOS' AND a.origen='ESCRUTINIO'")}
+        result_rows, totals = [], {}
+
+        def flush():
+            # CLEAR existing results for these actas to avoid duplicates with 'bad' data
+            conn.executemany("DELETE FROM resultados WHERE acta_id=?", [(acta_id,) for acta_id in totals])
+            conn.executemany("INSERT INTO resultados (acta_id, candidato, votos) VALUES (?, ?, ?)", result_rows)
+            # Totals from the rows in memory
+            conn.executemany("UPDATE resumenes SET gran_total=?, votos_validos=? WHERE acta_id=?",
+                             [(tm + resumenes[acta_id]['votos_blancos'] + resumenes[acta_id]['votos_nulos'], tm, acta_id)
+                              for acta_id, tm in totals.items() if acta_id in resumenes])
+            result_rows.clear()
+            totals.clear()
+
+        # The file is streamed JRV by JRV and written in batches: memory does not grow with its size
+        for jrv, parties in iter_jrv_objects(json_path):
+            acta_id = acta_ids.get(jrv)
+            if acta_id is None: continue
+            if acta_id in totals: flush()  # repeated JRV: the last one wins, as with json.load
+
+            rows = official_result_rows(parties)
+            result_rows.extend((acta_id, candidato, votos) for candidato, votos in rows)
+            totals[acta_id] = sum(votos for _, votos in rows)
+            n_actas += 1
+            n_rows += len(rows)
+            if len(totals) >= batch_size: flush()
+        flush()
+
+        # Results were written directly: refresh the derived comparison tables
+        db.rebuild_comparaciones(conn=conn)
     conn.close()
-    print(f"Finished. Imported {count} actas.")
+
+    elapsed = time.perf_counter() - t0
+    print(f"Finished. Imported {n_actas} actas, {n_rows} rows in {elapsed:.1f}s "
+          f"({n_rows / elapsed if elapsed else 0:.0f} rows/s).")
 
 if __name__ == "__main__":
-    import_official_data()
+    parser = argparse.ArgumentParser(description="Importa diputados_oficial.json (o su variante .jsonl) a la BD")
+    parser.add_argument('path', nargs='?', help="JSON o JSONL a importar (por defecto data/diputados_oficial.json)")
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help="JRVs por lote de escritura")
+    parser.add_argument('--to-jsonl', metavar='DEST', help="sólo convierte el JSON a JSON Lines en DEST")
+    parser.add_argument('--dry-run', metavar='REPORT', help="no escribe nada: guarda en REPORT (.csv/.json) lo que cambiaría")
+    args = parser.parse_args()
+    if args.to_jsonl:
+        split_to_jsonl(args.path or os.path.join(os.path.dirname(__file__), 'data', 'diputados_oficial.json'), args.to_jsonl)
+    else:
+        import_official_data(args.path, batch_size=args.batch_size, dry_run=args.dry_run)
@@ -3,27 +3,61 @@ import json
 import os
 import db
 import glob
+import time
+import argparse
 
 def normalize_candidate(name):
     # Simple normalization if needed, but official JSON usually has full names
     return name.strip().upper()
 
-def import_president_data():
+def clean_int(val):
+    try: return int(str(val).replace(',', ''))
+    except: return 0
+
+def president_result_rows(resultados):
+    """ [(candidato, votos)] from the 'resultados' list of a PRESIDENTE JSON, plus the sum of votes. """
+    rows, validos = [], 0
+    for item in resultados:
+        partido = item.get('partido', 'UNKNOWN')
+        # Comparison view uses keys like "DC", "LIBRE": map strict party names from JSON to our standard keys.
+        p_upper = partido.upper()
+        key = "UNKNOWN"
+        if 'NACIONAL' in p_upper: key = 'NACIONAL'
+        elif 'LIBERAL' in p_upper and 'LIBRE' not in p_upper: key = 'LIBERAL'
+        elif 'LIBRE' in p_upper: key = 'LIBRE'
+        elif 'INNOVACION' in p_upper: key = 'PINU'
+        elif 'DEMOCRATA' in p_upper: key = 'DC'
+        else: key = p_upper # Fallback
+
+        v_str = str(item.get('votos', '0')).replace(',', '')
+        try: votos = int(v_str)
+        except: votos = 0
+        rows.append((key, votos))
+        validos += votos
+    return rows, validos
+
+def import_president_data(dry_run=None):
     base_dir = os.path.dirname(__file__)
     json_dir = os.path.join(base_dir, 'data', 'JSON')
     
+    t0 = time.perf_counter()
+    db.init_db()  # derived comparison tables rebuilt at the end
     conn = db.get_db_connection()
-    c = conn.cursor()
     
     # Get all *-PRESIDENTE.json files
     files = glob.glob(os.path.join(json_dir, "*-PRESIDENTE.json"))
     print(f"Found {len(files)} President JSON files.")
-    
-    count = 0
+
+    # Every acta id (Official/Escrutinio) in one query; JRVs without acta are skipped
+    acta_ids = {r['jrv']: r['id'] for r in conn.execute("SELECT jrv, id FROM actas WHERE nivel='PRESIDENTE' AND origen='ESCRUTINIO'")}
+
+    result_rows, resumen_rows = {}, {}
     for file_path in files:
         filename = os.path.basename(file_path)
         jrv = filename.split('-')[0]
-        
+        acta_id = acta_ids.get(jrv)
+        if acta_id is None: continue
+
         # Load JSON
         try:
             with open(file_path, 'r', encoding='utf-8') as f:
@@ -36,58 +70,13 @@ def import_president_data():
         if 'resultados' not in data:
             print(f"Skipping {filename}: No 'resultados' key")
             continue
-            
-        # Get Acta ID (Official/Escrutinio)
-        row = c.execute("SELECT id FROM actas WHERE jrv=? AND nivel='PRESIDENTE' AND origen='ESCRUTINIO'", (jrv,)).fetchone()
-        if not row:
-            # print(f"Skipping {jrv} (No Acta in DB)")
-            continue
-            
-        acta_id = row['id']
-        
-        # CLEAR existing results
-        c.execute("DELETE FROM resultados WHERE acta_id=?", (acta_id,))
-        
-        # Insert New
-        validos = 0
-        for item in data['resultados']:
-            partido = item.get('partido', 'UNKNOWN')
-            # For President, we usually use Partido as key or candidate?
-            # Existing specific logic uses Candidate Name or Party?
-            # In processor.py: key = f"{partido}" if candidate empty, else "{partido} ({candidato})"
-            # But let's check what the frontend expects. 
-            # Frontend uses `key` to match. 
-            # If I look at `processor.py`, it uses: key = f"{partido}" ... if candidate: key += f" ({candidato})"
-            # However, `db.py` normalizes keys.
-            # Let's use simple Party Name for now as that's what seems to be used in Comparison view (keys are DC, Libre, etc.)
-            
-            # WAIT. Comparison view uses keys like "DC", "LIBRE".
-            # processor.py Line 157: key = f"{partido}"
-            # Let's map strict party names from JSON to our standard keys.
-            
-            p_upper = partido.upper()
-            key = "UNKNOWN"
-            if 'NACIONAL' in p_upper: key = 'NACIONAL'
-            elif 'LIBERAL' in p_upper and 'LIBRE' not in p_upper: key = 'LIBERAL'
-            elif 'LIBRE' in p_upper: key = 'LIBRE'
-            elif 'INNOVACION' in p_upper: key = 'PINU'
-            elif 'DEMOCRATA' in p_upper: key = 'DC'
-            else: key = p_upper # Fallback
-            
-            v_str = str(item.get('votos', '0')).replace(',', '')
-            try: votos = int(v_str)
-            except: votos = 0
-            
-            c.execute("INSERT INTO resultados (acta_id, candidato, votos) VALUES (?, ?, ?)", (acta_id, key, votos))
-            validos += votos
-            
+
+        rows, validos = president_result_rows(data['resultados'])
+        result_rows[acta_id] = [(acta_id, key, votos) for key, votos in rows]
+
         # Update Resumen
         # JSON has stats
         stats = data.get('estadisticas', {}).get('distribucion_votos', {})
-        def clean_int(val):
-            try: return int(str(val).replace(',', ''))
-            except: return 0
-            
         r_validos = clean_int(stats.get('validos', 0))
         r_nulos = clean_int(stats.get('nulos', 0))
         r_blancos = clean_int(stats.get('blancos', 0))
@@ -96,25 +85,39 @@ def import_president_data():
         # If JSON summary is missing/zero, use calculated
         if r_validos == 0 and validos > 0: r_validos = validos
         if gran_total == 0: gran_total = validos
+        resumen_rows[acta_id] = (acta_id, r_validos, r_blancos, r_nulos, gran_total)
 
-        # Update DB Resumen
-        # Check if exists
-        res = c.execute("SELECT * FROM resumenes WHERE acta_id=?", (acta_id,)).fetchone()
-        if res:
-             c.execute("UPDATE resumenes SET votos_validos=?, votos_blancos=?, votos_nulos=?, gran_total=? WHERE acta_id=?", 
-                       (r_validos, r_blancos, r_nulos, gran_total, acta_id))
-        else:
-             c.execute("INSERT INTO resumenes (acta_id, votos_validos, votos_blancos, votos_nulos, gran_total) VALUES (?, ?, ?, ?, ?)",
-                       (acta_id, r_validos, r_blancos, r_nulos, gran_total))
-        
-        count += 1
-        if count % 100 == 0: 
-            conn.commit()
-            print(f"Imported {count}...")
+    if dry_run:
+        # Only report what would change (dry_run = report path): nothing is written to the DB
+        jrv_of = {acta_id: jrv for jrv, acta_id in acta_ids.items()}
+        changes = db.diff_resultados({(jrv_of[acta_id], 'PRESIDENTE', 'ESCRUTINIO'): [(key, votos) for _, key, votos in rows]
+                                      for acta_id, rows in result_rows.items()}, conn=conn)
+        conn.close()
+        db.write_diff_report(changes, dry_run)
+        print(f"Dry run: {len(changes)} changes in {len({c['jrv'] for c in changes})} JRVs -> {dry_run} "
+              f"({time.perf_counter() - t0:.1f}s).")
+        return changes
+
+    with db.transaction(conn):
+        # CLEAR existing results, then write everything with executemany
+        conn.executemany("DELETE FROM resultados WHERE acta_id=?", [(acta_id,) for acta_id in resumen_rows])
+        conn.executemany("INSERT INTO resultados (acta_id, candidato, votos) VALUES (?, ?, ?)",
+                         [row for rows in result_rows.values() for row in rows])
+        conn.executemany("""INSERT INTO resumenes (acta_id, votos_validos, votos_blancos, votos_nulos, gran_total) VALUES (?, ?, ?, ?, ?)
+                            ON CONFLICT(acta_id) DO UPDATE SET votos_validos=excluded.votos_validos, votos_blancos=excluded.votos_blancos,
+                                votos_nulos=excluded.votos_nulos, gran_total=excluded.gran_total""", list(resumen_rows.values()))
 
-    conn.commit()
+        # Results were written directly: refresh the derived comparison tables
+        db.rebuild_comparaciones(conn=conn)
     conn.close()
-    print(f"Finished. Imported {count} President actas.")
+
+    elapsed = time.perf_counter() - t0
+    n_rows = sum(len(rows) for rows in result_rows.values())
+    print(f"Finished. Imported {len(resumen_rows)} President actas, {n_rows} rows in {elapsed:.1f}s "
+          f"({n_rows / elapsed if elapsed else 0:.0f} rows/s).")
 
 if __name__ == "__main__":
-    import_president_data()
+    parser = argparse.ArgumentParser(description="Importa los JSON de PRESIDENTE (data/JSON) a la BD")
+    parser.add_argument('--dry-run', metavar='REPORT', help="no escribe nada: guarda en REPORT (.csv/.json) lo que cambiaría")
+    args = parser.parse_args()
+    import_president_data(dry_run=args.dry_run)
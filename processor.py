@@ -2,7 +2,12 @@ import os
 import json
 import logging
 import re
-from db import save_acta_result, check_acta_exists, update_acta_path
+import time
+import hashlib
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from db import (save_acta_result, save_actas_bulk, check_acta_exists, update_acta_paths, get_connection, get_db_connection,
+                get_source_manifest, save_source_files, transaction, diff_resultados, write_diff_report)
 
 logging.basicConfig(
     filename='frenael_debug.log',
@@ -20,88 +25,94 @@ def get_jrv_from_filename(filename):
     match = re.search(r'\d+', filename)
     return match.group(0) if match else None
 
-def scan_folders():
+# Clasificador de nombres de archivo: JRV (primer número), nivel y lo que sigue al nivel
+# ('.json' = oficial, '-FRENAEL.json' = FRENAEL en data/JSON; extensión en las imágenes)
+FILE_CLASSIFIER = re.compile(r'^\D*(?P<jrv>\d+)(?:.*?(?P<nivel>PRESIDENTE|ALCALDE|DIPUTADOS)(?P<tail>.*)|.*)$', re.IGNORECASE | re.DOTALL)
+LEVEL_KEYS = {'PRESIDENTE': 'pres', 'ALCALDE': 'alc', 'DIPUTADOS': 'dip'}
+IMAGE_EXTS = ('.jpg', '.jpeg', '.png', '.pdf')
+
+def _scan(folder, stats):
+    """ (nombre, match del clasificador) de los archivos de una carpeta; guarda su stat en `stats`. """
+    try:
+        entries = list(os.scandir(folder))
+    except FileNotFoundError:
+        return
+    for entry in entries:
+        m = FILE_CLASSIFIER.match(entry.name)
+        if not m: continue
+        if stats is not None and entry.is_file():
+            st = entry.stat()
+            stats[os.path.relpath(entry.path, BASE_DIR)] = (st.st_size, st.st_mtime_ns)
+        yield entry.name, m
+
+def scan_folders(stats=None):
+    """
+    Inventario {jrv: {clave: archivo}} de los JSON e imágenes, en una pasada por carpeta
+    con os.scandir. Si se pasa `stats` (dict) se llena con {ruta relativa: (size, mtime_ns)}.
+    """
     for f in [FOLDER_TREP, FOLDER_ESCRUTINIO, FOLDER_JSON_ESC, FOLDER_DIP_FRENAEL]:
         os.makedirs(f, exist_ok=True)
-    
+
     inventory = {}
-    
+
     # 1. Scan Standard JSON Folder
-    if os.path.exists(FOLDER_JSON_ESC):
-        for f in os.listdir(FOLDER_JSON_ESC):
-            j = get_jrv_from_filename(f)
-            if not j: continue
-            if j not in inventory: inventory[j] = {}
-            
-            # Clasificar archivo JSON
-            if f.endswith('-PRESIDENTE.json'):
-                inventory[j]['json_pres_oficial'] = f
-            elif f.endswith('-ALCALDE.json'):
-                inventory[j]['json_alc_oficial'] = f
-            elif f.endswith('-DIPUTADOS.json'):
-                inventory[j]['json_dip_oficial'] = f
-            elif f.endswith('-ALCALDE-FRENAEL.json'):
-                inventory[j]['json_alc_frenael'] = f
-            elif f.endswith('-DIPUTADOS-FRENAEL.json'):
-                inventory[j]['json_dip_frenael'] = f
+    for f, m in _scan(FOLDER_JSON_ESC, stats):
+        entry = inventory.setdefault(m['jrv'], {})
+        nivel = m['nivel']
+        if not nivel or nivel != nivel.upper(): continue
+        if m['tail'] == '.json':
+            entry[f'json_{LEVEL_KEYS[nivel]}_oficial'] = f
+        elif m['tail'] == '-FRENAEL.json' and nivel != 'PRESIDENTE':
+            entry[f'json_{LEVEL_KEYS[nivel]}_frenael'] = f
 
     # 2. Scan Special Diputados Folder (p_processed_XXXX.json)
-    if os.path.exists(FOLDER_DIP_FRENAEL):
-        for f in os.listdir(FOLDER_DIP_FRENAEL):
-            if f.startswith('p_processed_') and f.endswith('.json'):
-                j = get_jrv_from_filename(f)
-                if not j: continue
-                if j not in inventory: inventory[j] = {}
-                # Set as the PRIMARY source for dip_frenael
-                inventory[j]['json_dip_frenael'] = os.path.join(FOLDER_DIP_FRENAEL, f)
-
-    valid_exts = ('.jpg', '.jpeg', '.png', '.pdf')
+    for f, m in _scan(FOLDER_DIP_FRENAEL, stats):
+        if f.startswith('p_processed_') and f.endswith('.json'):
+            # Set as the PRIMARY source for dip_frenael
+            inventory.setdefault(m['jrv'], {})['json_dip_frenael'] = os.path.join(FOLDER_DIP_FRENAEL, f)
+
+    # 3. Imágenes de actas
     for folder, source_key in [(FOLDER_TREP, 'trep'), (FOLDER_ESCRUTINIO, 'esc')]:
-        if os.path.exists(folder):
-            for f in os.listdir(folder):
-                if not f.lower().endswith(valid_exts): continue
-                
-                j = get_jrv_from_filename(f)
-                if not j: continue
-                
-                if j not in inventory: inventory[j] = {}
-                
-                U = f.upper()
-                if 'PRESIDENTE' in U:
-                    inventory[j][source_key] = f
-                elif 'ALCALDE' in U:
-                    inventory[j][f'{source_key}_alc'] = f
-                elif 'DIPUTADOS' in U:
-                    inventory[j][f'{source_key}_dip'] = f
+        for f, m in _scan(folder, stats):
+            if not f.lower().endswith(IMAGE_EXTS): continue
+            entry = inventory.setdefault(m['jrv'], {})
+            nivel = (m['nivel'] or '').upper()
+            if nivel == 'PRESIDENTE':
+                entry[source_key] = f
+            elif nivel:
+                entry[f'{source_key}_{LEVEL_KEYS[nivel]}'] = f
 
     return inventory
 
+# Clave de imagen del inventario -> (origen, nivel, carpeta guardada en actas.filepath)
+IMAGE_PATH_KEYS = [
+    ('trep', 'TREP', 'PRESIDENTE', 'data/ACTAS/FRENAEL'),
+    ('trep_alc', 'TREP', 'ALCALDE', 'data/ACTAS/FRENAEL'),
+    ('trep_dip', 'TREP', 'DIPUTADOS', 'data/ACTAS/FRENAEL'),
+    ('esc', 'ESCRUTINIO', 'PRESIDENTE', 'data/ACTAS/OFICIAL'),
+    ('esc_alc', 'ESCRUTINIO', 'ALCALDE', 'data/ACTAS/OFICIAL'),
+    ('esc_dip', 'ESCRUTINIO', 'DIPUTADOS', 'data/ACTAS/OFICIAL'),
+]
+
 # --- NUEVA FUNCIÓN: REFRESCAR RUTAS ---
-def refresh_file_paths():
+def refresh_file_paths(conn=None):
     """
     Escanea las carpetas de imágenes y actualiza la BD con los nombres reales.
+    Compara en memoria con actas.filepath y aplica sólo las rutas cambiadas en una transacción.
     """
     inventory = scan_folders()
-    updated_count = 0
-    
+    conn = get_connection(conn)
+    actas = {(r['jrv'], r['origen'], r['nivel']): (r['id'], r['filepath'])
+             for r in conn.execute("SELECT id, jrv, origen, nivel, filepath FROM actas")}
+
+    changes = []
     for jrv, files in inventory.items():
-        # Actualizar TREP
-        if 'trep' in files:
-            if update_acta_path(jrv, 'TREP', f"data/ACTAS/FRENAEL/{files['trep']}", nivel='PRESIDENTE'): updated_count += 1
-        if 'trep_alc' in files:
-            if update_acta_path(jrv, 'TREP', f"data/ACTAS/FRENAEL/{files['trep_alc']}", nivel='ALCALDE'): updated_count += 1
-        if 'trep_dip' in files:
-            if update_acta_path(jrv, 'TREP', f"data/ACTAS/FRENAEL/{files['trep_dip']}", nivel='DIPUTADOS'): updated_count += 1
-        
-        # Actualizar ESCRUTINIO
-        if 'esc' in files:
-            if update_acta_path(jrv, 'ESCRUTINIO', f"data/ACTAS/OFICIAL/{files['esc']}", nivel='PRESIDENTE'): updated_count += 1
-        if 'esc_alc' in files:
-            if update_acta_path(jrv, 'ESCRUTINIO', f"data/ACTAS/OFICIAL/{files['esc_alc']}", nivel='ALCALDE'): updated_count += 1
-        if 'esc_dip' in files:
-            if update_acta_path(jrv, 'ESCRUTINIO', f"data/ACTAS/OFICIAL/{files['esc_dip']}", nivel='DIPUTADOS'): updated_count += 1
-                
-    return updated_count
+        for key, origen, nivel, folder in IMAGE_PATH_KEYS:
+            if key not in files: continue
+            acta = actas.get((jrv, origen, nivel))
+            new_path = f"{folder}/{files[key]}"
+            if acta and acta[1] != new_path: changes.append((new_path, acta[0]))
+    return update_acta_paths(changes, conn=conn)
 
 def load_json_data(filename_or_path, source_type):
     # Determine full path: if it has directory separator, use as is; else join with JSON dir
@@ -220,51 +231,283 @@ def load_json_data(filename_or_path, source_type):
         logging.error(f"Error JSON {filename_or_path}: {e}")
         return None
 
-def process_batch_generator(dummy1, dummy2): 
-    inventory = scan_folders()
-    yield "data: Iniciando Carga MultNivel...\n\n"
-    
-    count_processed = 0
+# --- CONSISTENCIA JSON ALCALDE vs BD ---
+def find_alcalde_json_drift(conn=None):
+    """
+    Compara los JSON de ALCALDE en disco con lo importado en resultados/resumenes,
+    usando el mismo parseo que la importación. Devuelve una lista de diferencias
+    {jrv, origen, campo, json, db}. También aparecen las correcciones hechas desde la app.
+    """
+    conn = get_connection(conn)
+    drift = []
+    for jrv, files in scan_folders().items():
+        for key, source_type, origen in (('json_alc_oficial', 'ALCALDE_OFICIAL', 'ESCRUTINIO'),
+                                         ('json_alc_frenael', 'ALCALDE_FRENAEL', 'TREP')):
+            if key not in files: continue
+            data_pkg = load_json_data(files[key], source_type)
+            if not data_pkg: continue
+
+            acta = conn.execute("SELECT id FROM actas WHERE jrv = ? AND origen = ? AND nivel = 'ALCALDE'", (jrv, origen)).fetchone()
+            if not acta:
+                drift.append({'jrv': jrv, 'origen': origen, 'campo': 'acta', 'json': files[key], 'db': None})
+                continue
+
+            db_votos = {r['candidato']: r['votos'] for r in conn.execute("SELECT candidato, votos FROM resultados WHERE acta_id = ? ORDER BY id", (acta['id'],))}
+            for candidato in sorted(set(data_pkg['resultados']) | set(db_votos)):
+                v_json, v_db = data_pkg['resultados'].get(candidato), db_votos.get(candidato)
+                if v_json != v_db: drift.append({'jrv': jrv, 'origen': origen, 'campo': candidato, 'json': v_json, 'db': v_db})
+
+            res = conn.execute("SELECT * FROM resumenes WHERE acta_id = ?", (acta['id'],)).fetchone()
+            for field, v_json in data_pkg['resumen'].items():
+                v_db = res[field] if res else None
+                if v_json != v_db: drift.append({'jrv': jrv, 'origen': origen, 'campo': field, 'json': v_json, 'db': v_db})
+    return drift
+
+# --- MANIFIESTO DE FUENTES (reimportación incremental) ---
+def jrv_source_files(files):
+    """ Rutas, relativas a BASE_DIR, de los JSON e imágenes de una JRV del inventario. """
+    paths = []
+    for key, name in files.items():
+        if key.startswith('json_'):
+            path = name if os.path.sep in name else os.path.join(FOLDER_JSON_ESC, name)
+        else:
+            path = os.path.join(FOLDER_TREP if key.startswith('trep') else FOLDER_ESCRUTINIO, name)
+        paths.append(os.path.relpath(path, BASE_DIR))
+    return sorted(paths)
+
+def file_hash(path):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            h.update(block)
+    return h.hexdigest()
+
+def diff_source_files(inventory, manifest, stats=None):
+    """
+    Compara el inventario con el manifiesto (db.get_source_manifest). Devuelve (changed, updates):
+    - changed: JRVs con algún archivo nuevo, con otro contenido o eliminado (hay que reimportarlas).
+    - updates: {jrv: [(path, size, mtime_ns, hash)]} de las JRVs cuyo manifiesto cambió, incluidas
+      las que sólo cambiaron de mtime y las que ya no tienen archivos (lista vacía).
+    Sólo se calcula el hash de los archivos cuyo tamaño o mtime no coincide; `stats` es el dict
+    que llena scan_folders (evita volver a hacer stat de cada archivo).
+    """
+    changed, updates, seen = set(), {}, set()
     for jrv, files in inventory.items():
-        # --- PROCESO PRESIDENTE (Legacy Logic) ---
-        if 'json_pres_oficial' in files:
-            data_pkg = load_json_data(files['json_pres_oficial'], 'PRESIDENTE_OFICIAL')
-            if data_pkg:
-                esc_path = f"data/ACTAS/OFICIAL/{files['esc']}" if 'esc' in files else ""
-                save_acta_result(jrv, 'ESCRUTINIO', esc_path, data_pkg, nivel='PRESIDENTE')
-                
-                # TREP para Pres se inicializa con copia de Oficial si no existe
-                if not check_acta_exists(jrv, 'TREP', nivel='PRESIDENTE'):
-                    trep_path = f"data/ACTAS/FRENAEL/{files['trep']}" if 'trep' in files else ""
-                    save_acta_result(jrv, 'TREP', trep_path, data_pkg, nivel='PRESIDENTE')
-                    count_processed += 1
-        
-        # --- PROCESO ALCALDE ---
-        if 'json_alc_oficial' in files:
-            data_pkg = load_json_data(files['json_alc_oficial'], 'ALCALDE_OFICIAL')
-            if data_pkg:
-                path = f"data/ACTAS/OFICIAL/{files['esc_alc']}" if 'esc_alc' in files else ""
-                save_acta_result(jrv, 'ESCRUTINIO', path, data_pkg, nivel='ALCALDE')
-        
-        if 'json_alc_frenael' in files:
-            data_pkg = load_json_data(files['json_alc_frenael'], 'ALCALDE_FRENAEL')
-            if data_pkg:
-                path = f"data/ACTAS/FRENAEL/{files['trep_alc']}" if 'trep_alc' in files else ""
-                save_acta_result(jrv, 'TREP', path, data_pkg, nivel='ALCALDE')
-
-        # --- PROCESO DIPUTADOS ---
-        if 'json_dip_oficial' in files:
-            data_pkg = load_json_data(files['json_dip_oficial'], 'DIPUTADOS_OFICIAL')
-            if data_pkg:
-                path = f"data/ACTAS/OFICIAL/{files['esc_dip']}" if 'esc_dip' in files else ""
-                save_acta_result(jrv, 'ESCRUTINIO', path, data_pkg, nivel='DIPUTADOS')
-        
-        if 'json_dip_frenael' in files:
-            data_pkg = load_json_data(files['json_dip_frenael'], 'DIPUTADOS_FRENAEL')
-            if data_pkg:
-                path = f"data/ACTAS/FRENAEL/{files['trep_dip']}" if 'trep_dip' in files else ""
-                save_acta_result(jrv, 'TREP', path, data_pkg, nivel='DIPUTADOS')
+        rows, dirty = [], False
+        for rel in jrv_source_files(files):
+            seen.add(rel)
+            sig = stats.get(rel) if stats is not None else None
+            if sig is None:
+                try:
+                    st = os.stat(os.path.join(BASE_DIR, rel))
+                except OSError:
+                    continue
+                sig = (st.st_size, st.st_mtime_ns)
+            old = manifest.get(rel)
+            if old and old['jrv'] == jrv and (old['size'], old['mtime_ns']) == sig:
+                digest = old['hash']
+            else:
+                digest = file_hash(os.path.join(BASE_DIR, rel))
+                dirty = True
+                if not old or old['jrv'] != jrv or old['hash'] != digest: changed.add(jrv)
+            rows.append((rel, sig[0], sig[1], digest))
+        if dirty: updates[jrv] = rows
 
-        yield f"data: Probando JRV {jrv}...\n\n"
-        
-    yield f"data: ACTUALIZACION COMPLETADA.\n\n"
\ No newline at end of file
+    for rel, old in manifest.items():
+        if rel in seen: continue
+        changed.add(old['jrv'])
+        if old['jrv'] not in updates:
+            files = inventory.get(old['jrv'])
+            updates[old['jrv']] = [] if files is None else [
+                (p, manifest[p]['size'], manifest[p]['mtime_ns'], manifest[p]['hash'])
+                for p in jrv_source_files(files) if p in manifest]
+    return changed, updates
+
+# Actas por transacción en la carga masiva
+BULK_BATCH_SIZE = 500
+
+def jrv_import_items(jrv, files, trep_pres_exists):
+    """
+    Actas a guardar para una JRV del inventario, en orden de importación:
+    lista de (origen, nivel, filepath, data_pkg).
+    """
+    items = []
+    # --- PROCESO PRESIDENTE (Legacy Logic) ---
+    if 'json_pres_oficial' in files:
+        data_pkg = load_json_data(files['json_pres_oficial'], 'PRESIDENTE_OFICIAL')
+        if data_pkg:
+            esc_path = f"data/ACTAS/OFICIAL/{files['esc']}" if 'esc' in files else ""
+            items.append(('ESCRUTINIO', 'PRESIDENTE', esc_path, data_pkg))
+
+            # TREP para Pres se inicializa con copia de Oficial si no existe
+            if not trep_pres_exists:
+                trep_path = f"data/ACTAS/FRENAEL/{files['trep']}" if 'trep' in files else ""
+                items.append(('TREP', 'PRESIDENTE', trep_path, data_pkg))
+
+    # --- PROCESO ALCALDE ---
+    if 'json_alc_oficial' in files:
+        data_pkg = load_json_data(files['json_alc_oficial'], 'ALCALDE_OFICIAL')
+        if data_pkg:
+            path = f"data/ACTAS/OFICIAL/{files['esc_alc']}" if 'esc_alc' in files else ""
+            items.append(('ESCRUTINIO', 'ALCALDE', path, data_pkg))
+
+    if 'json_alc_frenael' in files:
+        data_pkg = load_json_data(files['json_alc_frenael'], 'ALCALDE_FRENAEL')
+        if data_pkg:
+            path = f"data/ACTAS/FRENAEL/{files['trep_alc']}" if 'trep_alc' in files else ""
+            items.append(('TREP', 'ALCALDE', path, data_pkg))
+
+    # --- PROCESO DIPUTADOS ---
+    if 'json_dip_oficial' in files:
+        data_pkg = load_json_data(files['json_dip_oficial'], 'DIPUTADOS_OFICIAL')
+        if data_pkg:
+            path = f"data/ACTAS/OFICIAL/{files['esc_dip']}" if 'esc_dip' in files else ""
+            items.append(('ESCRUTINIO', 'DIPUTADOS', path, data_pkg))
+
+    if 'json_dip_frenael' in files:
+        data_pkg = load_json_data(files['json_dip_frenael'], 'DIPUTADOS_FRENAEL')
+        if data_pkg:
+            path = f"data/ACTAS/FRENAEL/{files['trep_dip']}" if 'trep_dip' in files else ""
+            items.append(('TREP', 'DIPUTADOS', path, data_pkg))
+    return items
+
+# Procesos que parsean los JSON en paralelo (1 = en el mismo proceso que escribe)
+PARSE_WORKERS = os.cpu_count() or 1
+# JRVs por tarea enviada al pool y tareas en vuelo como máximo (cola acotada hacia el escritor)
+PARSE_CHUNK_SIZE = 32
+PARSE_QUEUE_SIZE = 8
+
+def _parse_chunk(tasks):
+    return [(jrv, jrv_import_items(jrv, files, trep_pres_exists)) for jrv, files, trep_pres_exists in tasks]
+
+def _chunks(iterable, size):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk: yield chunk
+
+def iter_parsed_jrvs(tasks, workers=PARSE_WORKERS):
+    """
+    Etapa de parseo: recibe (jrv, files, trep_pres_exists) y devuelve (jrv, items) en el
+    mismo orden, con los JSON leídos por un pool de `workers` procesos. Como mucho
+    PARSE_QUEUE_SIZE tareas esperan al escritor, así la memoria no crece con el inventario.
+    """
+    if workers <= 1:
+        for chunk in _chunks(tasks, PARSE_CHUNK_SIZE):
+            yield from _parse_chunk(chunk)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for chunk in _chunks(tasks, PARSE_CHUNK_SIZE):
+            pending.append(pool.submit(_parse_chunk, chunk))
+            if len(pending) >= PARSE_QUEUE_SIZE:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+def plan_import(conn, full=False, jrvs=None):
+    """
+    JRVs a importar según el manifiesto source_files: (inventory, changed, updates) como en
+    diff_source_files. full=True conserva todo el inventario; jrvs limita la carga a esas JRVs.
+    """
+    stats = {}
+    inventory = scan_folders(stats)
+    changed, updates = diff_source_files(inventory, get_source_manifest(conn=conn), stats)
+    if jrvs is not None:
+        jrvs = {str(j) for j in jrvs}
+        inventory = {jrv: files for jrv, files in inventory.items() if jrv in jrvs}
+        changed &= jrvs
+        updates = {jrv: rows for jrv, rows in updates.items() if jrv in jrvs}
+    if not full:
+        inventory = {jrv: files for jrv, files in inventory.items() if jrv in changed}
+    return inventory, changed, updates
+
+def trep_presidente_jrvs(conn):
+    """ JRVs que ya tienen acta TREP de PRESIDENTE (no se vuelve a copiar la oficial). """
+    return {r['jrv'] for r in conn.execute("SELECT jrv FROM actas WHERE origen = 'TREP' AND nivel = 'PRESIDENTE'")}
+
+def dry_run_import(report_path, full=False, workers=PARSE_WORKERS, jrvs=None):
+    """
+    Lo que haría process_batch_generator con las mismas opciones, sin escribir nada en la BD:
+    guarda en report_path (CSV, o JSON si termina en .json) el diff de resultados por
+    (jrv, nivel, origen, candidato) de db.diff_resultados y devuelve los cambios.
+    """
+    conn = get_db_connection()
+    try:
+        inventory, _, _ = plan_import(conn, full, jrvs)
+        trep_pres = trep_presidente_jrvs(conn)
+        new_results = {}
+        tasks = ((jrv, files, jrv in trep_pres) for jrv, files in inventory.items())
+        for jrv, items in iter_parsed_jrvs(tasks, workers):
+            for origen, nivel, path, data_pkg in items:
+                new_results[(jrv, nivel, origen)] = list(data_pkg.get('resultados', {}).items())
+        changes = diff_resultados(new_results, conn=conn)
+    finally:
+        conn.close()
+    write_diff_report(changes, report_path)
+    return changes
+
+def process_batch_generator(dummy1, dummy2, bulk=True, batch_size=BULK_BATCH_SIZE, workers=PARSE_WORKERS, full=False, jrvs=None, imported=None):
+    """
+    Importa las fuentes emitiendo mensajes SSE de progreso.
+    Sólo reimporta las JRVs cuyos archivos cambiaron según source_files; full=True las reimporta todas.
+    jrvs: limita la carga a esas JRVs (modo watcher).
+    imported: lista opcional a la que se agregan las JRVs reimportadas (para los ajustes posteriores).
+    bulk=True: los JSON se parsean en `workers` procesos (iter_parsed_jrvs) y este generador,
+    único escritor, guarda con una sola conexión una transacción cada `batch_size` actas.
+    bulk=False: guarda acta por acta con save_acta_result (modo anterior).
+    """
+    yield "data: Iniciando Carga MultNivel...\n\n"
+    start = time.perf_counter()
+
+    conn = get_db_connection()
+    try:
+        inventory, changed, updates = plan_import(conn, full, jrvs)
+        yield f"data: {len(inventory)} JRVs a importar ({len(changed)} con cambios en sus archivos)\n\n"
+        if imported is not None: imported.extend(inventory)
+
+        total = 0
+        if not bulk:
+            for jrv, files in inventory.items():
+                with transaction(conn):
+                    for origen, nivel, path, data_pkg in jrv_import_items(jrv, files, check_acta_exists(jrv, 'TREP', nivel='PRESIDENTE', conn=conn)):
+                        save_acta_result(jrv, origen, path, data_pkg, nivel=nivel, conn=conn)
+                        total += 1
+                    save_source_files({jrv: updates.pop(jrv)} if jrv in updates else {}, conn=conn)
+                yield f"data: Probando JRV {jrv}...\n\n"
+        else:
+            trep_pres = trep_presidente_jrvs(conn)
+            pending, pending_jrvs = [], []
+
+            def flush():
+                # Actas y manifiesto de sus archivos en la misma transacción
+                with transaction(conn):
+                    saved = save_actas_bulk(pending, conn=conn)
+                    save_source_files({jrv: updates.pop(jrv) for jrv in pending_jrvs if jrv in updates}, conn=conn)
+                pending.clear()
+                pending_jrvs.clear()
+                return saved
+
+            tasks = ((jrv, files, jrv in trep_pres) for jrv, files in inventory.items())
+            for jrv, items in iter_parsed_jrvs(tasks, workers):
+                pending.extend((jrv, origen, nivel, path, data_pkg) for origen, nivel, path, data_pkg in items)
+                pending_jrvs.append(jrv)
+                yield f"data: Probando JRV {jrv}...\n\n"
+
+                if len(pending) >= batch_size:
+                    total += flush()
+                    yield f"data: {total} actas guardadas ({total / (time.perf_counter() - start):.0f} actas/s)\n\n"
+            if pending_jrvs:
+                total += flush()
+
+        # Archivos que sólo cambiaron de mtime o que desaparecieron
+        save_source_files(updates, conn=conn)
+    finally:
+        conn.close()
+
+    elapsed = time.perf_counter() - start
+    yield f"data: ACTUALIZACION COMPLETADA. {total} actas en {elapsed:.1f}s ({total / elapsed if elapsed else 0:.0f} actas/s)\n\n"
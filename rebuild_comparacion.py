@@ -0,0 +1,19 @@
+import sys
+import time
+import db
+
+def rebuild_comparacion():
+    """
+    Recalcula las tablas derivadas jrv_comparacion / jrv_comparacion_partidos
+    a partir de actas, resultados y resumenes.
+    Usar en bases existentes o después de modificar resultados fuera de la app.
+    """
+    print("Rebuilding jrv_comparacion...")
+    db.init_db()
+    t0 = time.perf_counter()
+    count = db.rebuild_comparaciones()
+    print(f"Done. {count} (jrv, nivel) comparisons in {time.perf_counter() - t0:.1f}s.")
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1: db.DB_NAME = sys.argv[1]
+    rebuild_comparacion()
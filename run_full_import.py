@@ -1,8 +1,20 @@
 import processor
-import sqlite3
+import db
 import os
+import argparse
+import time
+
+def run_full_import(workers=processor.PARSE_WORKERS, full=False, dry_run=None):
+    # Schema migrations (source_files manifest, derived tables) before planning the import
+    db.init_db()
+    if dry_run:
+        # Nothing is written: report what the import would change in resultados
+        t0 = time.perf_counter()
+        changes = processor.dry_run_import(dry_run, full=full, workers=workers)
+        print(f"Dry run: {len(changes)} changes in {len({c['jrv'] for c in changes})} JRVs -> {dry_run} "
+              f"({time.perf_counter() - t0:.1f}s).")
+        return changes
 
-def run_full_import():
     print("Starting Full Database Import from Sources...")
     
     # Optional: Clear tables first to be absolutely sure?
@@ -16,14 +28,17 @@ def run_full_import():
     # "reescribir en la base de datos todos los valores obtenidos de las fuentes"
     # I will rely on overwrite.
     
-    gen = processor.process_batch_generator(None, None)
+    imported = []
+    gen = processor.process_batch_generator(None, None, workers=workers, full=full, imported=imported)
     
     count = 0
     for msg in gen:
         count += 1
         if count % 100 == 0:
             print(f"Processed batch {count}...")
-            
+
+    # Last SSE message carries the totals and actas/s
+    print(msg[len("data: "):].strip())
     print("Import finished.")
     
     # Run fixes after import (Just in case)
@@ -36,32 +51,19 @@ def run_full_import():
     # Recalculate totals for Diputados (since JSONs might not have summary)
     # Re-run the logic from recalc_diputados_totals.py
     
-    conn = sqlite3.connect('auditoria.db')
-    conn.row_factory = sqlite3.Row
-    c = conn.cursor()
-    
-    # Recalc Diputados Totals
-    level = 'DIPUTADOS'
-    actas = c.execute("SELECT id FROM actas WHERE nivel=?", (level,)).fetchall()
-    for a in actas:
-        acta_id = a['id']
-        rows = c.execute("SELECT SUM(votos) as total FROM resultados WHERE acta_id=?", (acta_id,)).fetchone()
-        validos = rows['total'] if rows and rows['total'] else 0
-        
-        # Check existing res
-        res = c.execute("SELECT * FROM resumenes WHERE acta_id=?", (acta_id,)).fetchone()
-        blancos = res['votos_blancos'] if res else 0
-        nulos = res['votos_nulos'] if res else 0
-        gran_total = validos + blancos + nulos
-        
-        if res:
-             c.execute("UPDATE resumenes SET votos_validos=?, gran_total=? WHERE acta_id=?", (validos, gran_total, acta_id))
-        else:
-             c.execute("INSERT INTO resumenes (acta_id, votos_validos, votos_blancos, votos_nulos, gran_total) VALUES (?, ?, ?, ?, ?)", (acta_id, validos, blancos, nulos, gran_total))
-             
-    conn.commit()
-    conn.close()
+    # Recalc Diputados Totals of the re-imported JRVs only: votos_validos = SUM(votos), missing
+    # resumenes inserted and their comparison refreshed (one transaction)
+    fixed = db.recalculate_diputados_totals(imported)
+    print(f"{fixed} DIPUTADOS resumenes recalculated.")
     print("Fixes applied.")
 
 if __name__ == "__main__":
-    run_full_import()
+    parser = argparse.ArgumentParser(description="Reimporta todas las fuentes a la BD")
+    parser.add_argument('--workers', type=int, default=processor.PARSE_WORKERS,
+                        help="procesos para parsear los JSON (1 = sin pool)")
+    parser.add_argument('--full', action='store_true',
+                        help="reimporta todas las JRVs aunque sus archivos no hayan cambiado")
+    parser.add_argument('--dry-run', metavar='REPORT',
+                        help="no escribe nada: guarda en REPORT (.csv/.json) los cambios en resultados")
+    args = parser.parse_args()
+    run_full_import(workers=args.workers, full=args.full, dry_run=args.dry_run)
@@ -0,0 +1,101 @@
+import time
+import argparse
+from collections import deque
+import db
+import processor
+
+# Segundos entre snapshots y segundos sin cambios antes de importar una JRV
+POLL_INTERVAL = 2.0
+DEBOUNCE_SECONDS = 3.0
+
+class IngestWatcher:
+    """
+    Ingesta continua por sondeo: cada `interval` segundos toma un snapshot (scandir + stat) de
+    data/JSON, data/json_diputados/processed y data/ACTAS/*, encola las JRVs con archivos nuevos,
+    modificados o eliminados, y las importa cuando llevan `debounce` segundos sin cambios
+    (archivos a medio copiar, ráfagas con varios niveles de la misma JRV).
+    """
+    def __init__(self, interval=POLL_INTERVAL, debounce=DEBOUNCE_SECONDS, workers=1):
+        self.interval = interval
+        self.debounce = debounce
+        self.workers = workers
+        self.stats = {}    # ruta -> (size, mtime_ns) del último snapshot
+        self.owners = {}   # ruta -> jrv
+        self.pending = {}  # jrv -> (primer cambio visto, último cambio visto)
+        self.imported_jrvs = 0
+        self.latencies = deque(maxlen=500)
+
+    def poll(self, now=None):
+        """ Toma un snapshot y encola las JRVs cuyos archivos cambiaron desde el anterior. """
+        now = time.monotonic() if now is None else now
+        stats = {}
+        inventory = processor.scan_folders(stats)
+        owners = {path: jrv for jrv, files in inventory.items() for path in processor.jrv_source_files(files)}
+
+        for path in stats.keys() | self.stats.keys():
+            if stats.get(path) == self.stats.get(path): continue
+            jrv = owners.get(path) or self.owners.get(path)
+            if jrv is None: continue
+            first = self.pending[jrv][0] if jrv in self.pending else now
+            self.pending[jrv] = (first, now)
+        self.stats, self.owners = stats, owners
+
+    def ingest_ready(self, now=None):
+        """ Importa las JRVs de la cola que ya no reciben cambios. Devuelve cuántas importó. """
+        now = time.monotonic() if now is None else now
+        ready = [jrv for jrv, (first, last) in self.pending.items() if now - last >= self.debounce]
+        if not ready: return 0
+
+        imported = []
+        for _ in processor.process_batch_generator(None, None, workers=self.workers, jrvs=ready, imported=imported): pass
+        # Same fix-up as run_full_import: DIPUTADOS JSONs have no summary
+        db.recalculate_diputados_totals(imported)
+        done = time.monotonic()
+        for jrv in ready:
+            first, _ = self.pending.pop(jrv)
+            self.latencies.append(done - first)
+        self.imported_jrvs += len(ready)
+        return len(ready)
+
+    def status(self):
+        """ Profundidad de la cola y latencia de ingesta (desde que se detectó el cambio hasta guardarlo). """
+        lat = list(self.latencies)
+        return {
+            'queue_depth': len(self.pending),
+            'imported_jrvs': self.imported_jrvs,
+            'last_latency_s': lat[-1] if lat else None,
+            'avg_latency_s': sum(lat) / len(lat) if lat else None,
+            'max_latency_s': max(lat) if lat else None,
+        }
+
+    def run(self, stop=None):
+        """ Bucle principal. stop: threading.Event opcional para terminarlo. """
+        # Snapshot base; lo que llegó con el watcher detenido entra con una importación incremental normal
+        self.poll()
+        self.pending.clear()
+        imported = []
+        for msg in processor.process_batch_generator(None, None, workers=self.workers, imported=imported): pass
+        db.recalculate_diputados_totals(imported)
+        print(msg[len("data: "):].strip())
+
+        while not (stop and stop.is_set()):
+            time.sleep(self.interval)
+            self.poll()
+            if self.ingest_ready() or self.pending:
+                s = self.status()
+                print(f"cola={s['queue_depth']} importadas={s['imported_jrvs']} "
+                      f"latencia última={s['last_latency_s'] or 0:.1f}s media={s['avg_latency_s'] or 0:.1f}s", flush=True)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Importa JSON e imágenes de actas a medida que llegan")
+    parser.add_argument('--interval', type=float, default=POLL_INTERVAL, help="segundos entre snapshots")
+    parser.add_argument('--debounce', type=float, default=DEBOUNCE_SECONDS, help="segundos sin cambios antes de importar una JRV")
+    parser.add_argument('--workers', type=int, default=1, help="procesos para parsear los JSON")
+    parser.add_argument('--db', help="ruta de la BD (por defecto la de db.py)")
+    args = parser.parse_args()
+    if args.db: db.DB_NAME = args.db
+    db.init_db()
+    try:
+        IngestWatcher(args.interval, args.debounce, args.workers).run()
+    except KeyboardInterrupt:
+        pass